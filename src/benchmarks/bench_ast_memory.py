@@ -0,0 +1,55 @@
+# Run from src/: python -m benchmarks.bench_ast_memory
+import tracemalloc
+
+from lexer.lexer import CharacterReader, Lexer
+from parser.models import Statement
+from parser.parser import Parser
+
+STATEMENTS = 100_000
+
+
+def synthetic_source():
+    templates = [
+        'value v{0} = a * {0} + b / 2 - c',
+        'total = total + v{0} * 3',
+        'print("step", v{0}, total.length)',
+        'if v{0} >= limit && !done {{ total = total - 1 }}',
+        'while count < {0} {{ count = count + 1 }}',
+    ]
+    return '\n'.join(templates[index % len(templates)].format(index) for index in range(STATEMENTS))
+
+
+def fields(node):
+    if hasattr(node, '__dict__'):
+        return list(vars(node).values())
+    return [getattr(node, name) for cls in type(node).__mro__ for name in getattr(cls, '__slots__', ())]
+
+
+def count_nodes(nodes):
+    count = 0
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, Statement):
+            count += 1
+            stack.extend(fields(node))
+    return count
+
+
+def main():
+    code = synthetic_source()
+    tracemalloc.start()
+    program = Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nodes = count_nodes(program.statements)
+    print(f'statements:     {len(program.statements):,}')
+    print(f'AST nodes:      {nodes:,}')
+    print(f'traced memory:  {size / 1024 / 1024:7.1f} MB (nodes, positions and lexeme strings)')
+    print(f'bytes per node: {size / nodes:7.1f}')
+
+
+if __name__ == '__main__':
+    main()
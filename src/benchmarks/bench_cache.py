@@ -0,0 +1,52 @@
+# Run from src/: python -m benchmarks.bench_cache
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+FUNCTIONS = 5_000
+RUNS = 5
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+
+def script_source():
+    # many definitions and little work, the shape of a cron script whose startup is mostly parsing
+    lines = []
+    for index in range(FUNCTIONS):
+        lines.append(f'function f{index}(a, b) {{\n    if a > b {{\n        return a * {index} - b\n    }}\n'
+                     f'    return (a + b) / 2\n}}')
+        lines.append(f'value v{index} = f{index}({index}, 3)')
+    lines.append('print(v1)')
+    return '\n'.join(lines) + '\n'
+
+
+def run(path, *options):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, MAIN, path, *options], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'script.xd')
+        with open(path, 'w') as file:
+            file.write(script_source())
+        cache_path = os.path.join(directory, 'script.xdc')
+        print(f'script: {os.path.getsize(path) / 1024:.0f} KB, {FUNCTIONS:,} functions')
+
+        no_cache = min(run(path, '--no-cache') for _ in range(RUNS))
+        cold = []
+        for _ in range(RUNS):
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            cold.append(run(path))
+        warm = min(run(path) for _ in range(RUNS))
+        print(f'cache entry: {os.path.getsize(cache_path) / 1024:.0f} KB')
+        print(f'no cache          {no_cache:6.2f} s')
+        print(f'cold (miss+store) {min(cold):6.2f} s')
+        print(f'warm (hit)        {warm:6.2f} s')
+
+
+if __name__ == '__main__':
+    main()
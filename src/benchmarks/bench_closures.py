@@ -0,0 +1,94 @@
+# Run from src/: python -m benchmarks.bench_closures
+import io
+import os
+import time
+from contextlib import redirect_stdout
+
+from compiler.compiler import compile_program
+from compiler.vm import VirtualMachine
+from interpreter.closures import ClosureInterpreter, ClosureCompiler
+from interpreter.interpreter import Interpreter
+from interpreter.resolver import UNDECLARED
+from lexer.lexer import CharacterReader, Lexer
+from parser.models import FunctionDefinition
+from parser.parser import Parser
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples_code')
+
+RUNS = 2000
+
+ENGINES = {'tree': Interpreter, 'closure': ClosureInterpreter, 'vm': VirtualMachine}
+
+
+def parse(code):
+    return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+
+def short_runs(engine, code):
+    # a new engine for every run, so compiling is part of each one
+    program = parse(code)
+    output = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(output):
+        for _ in range(RUNS):
+            engine(program).interpret()
+    return time.perf_counter() - start, output.getvalue()
+
+
+def long_run(engine, code):
+    # one engine runs the top-level statements again and again with fresh globals, as a long-running
+    # program would run its code; functions are compiled on their first call only
+    interpreter = engine(None)
+    statements = []
+    for statement in parse(code).statements:
+        if isinstance(statement, FunctionDefinition):
+            statement.accept(interpreter)
+        else:
+            statements.append(statement)
+            interpreter.resolve(statement)
+    if engine is ClosureInterpreter:
+        closures = ClosureCompiler(interpreter).compile_statements(statements)
+
+        def body():
+            for closure in closures:
+                closure(None)
+    elif engine is VirtualMachine:
+        code = compile_program(statements)
+
+        def body():
+            interpreter.execute(code, None)
+    else:
+        def body():
+            for statement in statements:
+                statement.accept(interpreter)
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(output):
+        for _ in range(RUNS):
+            interpreter.globals[:] = [UNDECLARED] * len(interpreter.globals)
+            body()
+    return time.perf_counter() - start, output.getvalue()
+
+
+def main():
+    for label, measure in (('short runs', short_runs), ('long run', long_run)):
+        print(f'{label}: each example {RUNS} times')
+        for name in sorted(os.listdir(EXAMPLES_DIR)):
+            if not name.endswith('.xd'):
+                continue
+            with open(os.path.join(EXAMPLES_DIR, name)) as file:
+                code = file.read()
+            times = {}
+            outputs = set()
+            for engine_name, engine in ENGINES.items():
+                times[engine_name], output = min(measure(engine, code) for _ in range(5))
+                outputs.add(output)
+            assert len(outputs) == 1
+            print(f'  {name:<18}' + '   '.join(f'{engine_name} {seconds * 1000:7.1f} ms'
+                                               for engine_name, seconds in times.items())
+                  + f'   closure {times["tree"] / times["closure"]:.2f}x, vm {times["tree"] / times["vm"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# Run from src/: python -m benchmarks.bench_comments
+import sys
+import time
+from io import StringIO
+
+from lexer.lexer import CharacterReader, Lexer, TokenType
+from parser.parser import Parser
+
+STATEMENTS = 20_000
+COMMENTS_PER_STATEMENT = 4
+
+
+class RecursiveCommentParser(Parser):
+    # how comments were handled before: a COMMENT token per comment, skipped by recursion
+    def __init__(self, lexer):
+        self.lexer = lexer
+        super().__init__([])
+
+    def advance(self):
+        self.token = self.lexer.get_next_token()
+        if self.token.type == TokenType.COMMENT:
+            self.advance()
+
+
+def commented_source():
+    lines = []
+    for index in range(STATEMENTS):
+        lines.extend(f'# step {index}: update the running total and log it' for _ in range(COMMENTS_PER_STATEMENT))
+        lines.append(f'value v{index} = {index} * 2  # trailing note')
+    return '\n'.join(lines)
+
+
+def measure(label, parse):
+    start = time.perf_counter()
+    parse()
+    print(f'{label:<36} {time.perf_counter() - start:6.2f} s')
+
+
+def main():
+    code = commented_source()
+    print(f'input: {STATEMENTS:,} statements, {STATEMENTS * (COMMENTS_PER_STATEMENT + 1):,} comments')
+    sys.setrecursionlimit(10_000)
+    measure('COMMENT tokens, recursive advance',
+            lambda: RecursiveCommentParser(Lexer(CharacterReader(StringIO(code)))).parse_program())
+    measure('comments skipped by tokens()', lambda: Parser(Lexer(CharacterReader(StringIO(code)))).parse_program())
+    measure('comments collected as trivia',
+            lambda: Parser(Lexer(CharacterReader(StringIO(code)), trivia=[])).parse_program())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# Run from src/: python -m benchmarks.bench_expressions
+import random
+import time
+
+from lexer.lexer import CharacterReader, Lexer, TokenType
+from parser.models import BinaryOperation, UnaryOperation, IntLiteral, FloatLiteral, BoolLiteral, \
+    NullLiteral, StringLiteral
+from parser.parser import Parser, OPERATORS
+from errors.parser_errors import ExpectedExpressionError
+
+STATEMENTS = 20_000
+
+
+class DescentParser(Parser):
+    # the expression grammar as one method per precedence level, as it was before precedence climbing
+    def parse_expression(self):
+        return self.parse_logical_or()
+
+    def parse_logical_or(self):
+        # expression = conjuction, { logical_or , conjuction } ;
+        if not (left_expr := self.parse_logical_and()):
+            return None
+        position = self.token.position
+        while operator := self.maybe(TokenType.OR_OPERATOR):
+            if not (right_expr := self.parse_logical_and()):
+                raise ExpectedExpressionError(self.token.position)
+
+            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+
+        return left_expr
+
+    def parse_logical_and(self):
+        #  conjuction = equality, { logical_and , equality} ;
+        if not (left_expr := self.parse_equality()):
+            return None
+        position = self.token.position
+        while operator := self.maybe(TokenType.AND_OPERATOR):
+            if not (right_expr := self.parse_equality()):
+                raise ExpectedExpressionError(self.token.position)
+            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+
+        return left_expr
+
+    def parse_equality(self):
+        if not (left_expr := self.parse_relational()):
+            return None
+        position = self.token.position
+        if operator := self.maybe(TokenType.EQUALS) or self.maybe(TokenType.NOT_EQUALS):
+
+            if not (right_expr := self.parse_relational()):
+                raise ExpectedExpressionError(self.token.position)
+            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+
+        return left_expr
+
+    def parse_relational(self):
+        if not (left_expr := self.parse_additive()):
+            return None
+        position = self.token.position
+        while operator := self.maybe(TokenType.LESS) or \
+                          self.maybe(TokenType.GREATER) or \
+                          self.maybe(TokenType.LESS_THAN_OR_EQUAL) or \
+                          self.maybe(TokenType.GREATER_THAN_OR_EQUAL):
+
+            if not (right_expr := self.parse_additive()):
+                raise ExpectedExpressionError(self.token.position)
+            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+
+        return left_expr
+
+    def parse_additive(self):
+        # additive_expression = term , { add_sub_operator , term } ;
+        if not (left_expr := self.parse_multiplicative()):
+            return None
+        position = self.token.position
+        while operator := self.maybe(TokenType.ADD_OPERATOR) or \
+                          self.maybe(TokenType.MINUS_OPERATOR):
+
+            if not (right_expr := self.parse_multiplicative()):
+                raise ExpectedExpressionError(self.token.position)
+            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+
+        return left_expr
+
+    def parse_multiplicative(self):
+        # term = factor , { mul_div_operator , factor } ;
+        if not (left_expr := self.parse_unary()):
+            return None
+        position = self.token.position
+        while operator := self.maybe(TokenType.MULT_OPERATOR) or \
+                          self.maybe(TokenType.DIV_OPERATOR):
+            if not (right_expr := self.parse_unary()):
+                raise ExpectedExpressionError(self.token.position)
+            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+
+        return left_expr
+
+    def parse_unary(self):
+        # factor = ["!" | "-"], (number | string | bool | attr_method | "(", expression, ")");
+        position = self.token.position
+        if operator := self.maybe(TokenType.MINUS_OPERATOR) or \
+                       self.maybe(TokenType.NEG):
+            right = self.parse_primary()
+            if not right:
+                raise ExpectedExpressionError(self.token.position)
+
+            return UnaryOperation(OPERATORS[operator.type], right, position)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        return (
+            self.parse_identifier_or_fun_call() or self.parse_literal() or self.parse_parenthesized_expression()
+        )
+
+    def parse_literal(self):
+        value = self.token.value
+        position = self.token.position
+
+        if self.maybe(TokenType.INT_CONST):
+            return IntLiteral(value, position)
+        if self.maybe(TokenType.FLOAT_CONST):
+            return FloatLiteral(value, position)
+        if self.maybe(TokenType.TRUE_CONST):
+            return BoolLiteral(value, position)
+        if self.maybe(TokenType.FALSE_CONST):
+            return BoolLiteral(value, position)
+        if self.maybe(TokenType.NULL):
+            return NullLiteral(value, position)
+        if self.maybe(TokenType.STRING):
+            literal = StringLiteral(value, position)
+            return self.parse_dot_chain(literal)
+        return None
+
+
+def expression(rng, depth=0):
+    if depth > 3 or rng.random() < 0.25:
+        return rng.choice(['x', 'count', '42', '1.5', '"text"', 'size(x)', '-y', '!done'])
+    if rng.random() < 0.15:
+        return '(' + expression(rng, depth + 1) + ')'
+    operator = rng.choice(['+', '-', '*', '/', '<', '>=', '==', '&&', '||'])
+    if operator == '==':
+        return f'({expression(rng, depth + 1)} == {expression(rng, depth + 1)})'
+    return f'{expression(rng, depth + 1)} {operator} {expression(rng, depth + 1)}'
+
+
+def expression_source():
+    rng = random.Random(0)
+    return '\n'.join(f'value v{index} = {expression(rng)}' for index in range(STATEMENTS))
+
+
+def measure(label, parser_class, tokens):
+    best = min(timed(parser_class, tokens) for _ in range(5))
+    print(f'{label:<24} {best:6.2f} s')
+    return best
+
+
+def timed(parser_class, tokens):
+    start = time.perf_counter()
+    parser_class(tokens).parse_program()
+    return time.perf_counter() - start
+
+
+def main():
+    tokens = list(Lexer(CharacterReader.from_string(expression_source())).tokens())
+    print(f'input: {STATEMENTS:,} expression statements, {len(tokens):,} tokens (pre-lexed)')
+    descent = measure('one method per level', DescentParser, tokens)
+    climbing = measure('precedence climbing', Parser, tokens)
+    print(f'speedup: {descent / climbing:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# Run from src/: python -m benchmarks.bench_flat_ast
+import time
+import tracemalloc
+
+from benchmarks.bench_ast_memory import synthetic_source, count_nodes
+from lexer.lexer import CharacterReader, Lexer
+from parser.flat import lower_program, parse_flat
+from parser.parser import Parser
+
+
+def parser_for(code):
+    return Parser(Lexer(CharacterReader.from_string(code)))
+
+
+def object_ast(code):
+    return parser_for(code).parse_program()
+
+
+def lowered_ast(code):
+    return lower_program(parser_for(code).parse_program())
+
+
+def streamed_flat_ast(code):
+    return parse_flat(parser_for(code))
+
+
+def measure(label, build, code):
+    start = time.perf_counter()
+    build(code)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = build(code)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<34} {elapsed:6.2f} s {peak / 1024 / 1024:9.1f} MB peak {retained / 1024 / 1024:9.1f} MB retained')
+    return result
+
+
+def main():
+    code = synthetic_source()
+    program = measure('object AST (parse_program)', object_ast, code)
+    measure('parse_program, then lower', lowered_ast, code)
+    flat = measure('flat AST lowered while parsing', streamed_flat_ast, code)
+    print(f'{count_nodes(program.statements):,} object nodes, {len(flat):,} flat rows, '
+          f'{flat.nbytes() / 1024 / 1024:.1f} MB of columns, {len(flat.constants):,} pooled constants')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# Run from src/: python -m benchmarks.bench_folding
+import io
+import time
+from contextlib import redirect_stdout
+
+from interpreter.folding import ConstantFolder
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+ITERATIONS = 20_000
+
+
+def loop_source():
+    # foreach is the loop without an iteration limit; string literals are capped at 10000 characters
+    return f'''
+value total = 0
+value label = ""
+foreach c in "{'x' * (ITERATIONS // 2)}" + "{'x' * (ITERATIONS // 2)}" {{
+    total = total + 4 * 3 / (2 + 1) + "shoes".length * 2
+    label = "TeSt".toLower() + "-" + (60 * 60 * 24)
+    if total > 1000000 - 1 {{ total = 0 }}
+}}
+print(total, label)
+'''
+
+
+def run(code, fold):
+    program = Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+    folder = ConstantFolder()
+    start = time.perf_counter()
+    if fold:
+        folder.fold_program(program)
+    folded = time.perf_counter() - start
+    with redirect_stdout(io.StringIO()):
+        Interpreter(program).interpret()
+    return folded, time.perf_counter() - start, folder.folded
+
+
+def main():
+    code = loop_source()
+    for label, fold in (('as parsed', False), ('folded', True)):
+        folded, total, count = min(run(code, fold) for _ in range(3))
+        print(f'{label:<10} {ITERATIONS:,} iterations: {total * 1000:8.1f} ms '
+              f'(folding {folded * 1000:.2f} ms, {count} expressions)')
+
+
+if __name__ == '__main__':
+    main()
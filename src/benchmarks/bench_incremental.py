@@ -0,0 +1,52 @@
+# Run from src/: python -m benchmarks.bench_incremental
+import random
+import time
+
+from benchmarks.sources import scaled_source
+from lexer.incremental import IncrementalLexer
+from lexer.lexer import CharacterReader, Lexer
+
+LINES = 100_000
+EDITS = 200
+
+
+def hundred_thousand_lines():
+    code = scaled_source(LINES * 40)
+    return '\n'.join(code.split('\n')[:LINES]) + '\n'
+
+
+def line_edit(code, rng):
+    # (start, end, text) touching one line: retype it, append a space, or drop leading indentation
+    line_start = code.rfind('\n', 0, rng.randrange(len(code))) + 1
+    line_end = code.index('\n', line_start)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return line_start, line_end, code[line_start:line_end].replace('x', 'y')
+    if kind == 1 or code[line_start] != ' ':
+        return line_end, line_end, ' '
+    return line_start, line_start + 1, ''
+
+
+def main():
+    code = hundred_thousand_lines()
+    print(f'input: {LINES:,} lines, {len(code) / 1024 / 1024:.1f} MB')
+
+    start = time.perf_counter()
+    full = list(Lexer(CharacterReader.from_string(code)).tokens())
+    full_time = time.perf_counter() - start
+    print(f'full lex:          {full_time * 1000:10.1f} ms  ({len(full):,} tokens)')
+
+    incremental = IncrementalLexer(code)
+    rng = random.Random(0)
+    edit_time = 0
+    for _ in range(EDITS):
+        edit = line_edit(incremental.source, rng)
+        start = time.perf_counter()
+        incremental.edit(*edit)
+        edit_time += (time.perf_counter() - start) / EDITS
+    print(f'incremental edit:  {edit_time * 1000:10.2f} ms  (mean of {EDITS} single-line edits)')
+    print(f'speedup:           {full_time / edit_time:10.0f}x')
+
+
+if __name__ == '__main__':
+    main()
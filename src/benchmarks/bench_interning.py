@@ -0,0 +1,71 @@
+# Run from src/: python -m benchmarks.bench_interning
+import os
+import time
+import tracemalloc
+
+from benchmarks.bench_ast_memory import count_nodes, fields, synthetic_source
+from benchmarks.sources import EXAMPLES_DIR
+from lexer.lexer import CharacterReader, Lexer
+from parser.interning import ExpressionTable, intern_program
+from parser.models import Statement
+from parser.parser import Parser
+
+
+def distinct_nodes(nodes):
+    seen = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, Statement) and id(node) not in seen:
+            seen.add(id(node))
+            stack.extend(fields(node))
+    return len(seen)
+
+
+def parse(code):
+    return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+
+def report(label, code):
+    program = parse(code)
+    before = count_nodes(program.statements)
+    table = ExpressionTable()
+    table.intern_program(program)
+    after = distinct_nodes(program.statements)
+    print(f'{label:<20} {before:>9,} nodes -> {after:>9,}  ({1 - after / before:6.1%} fewer, '
+          f'{len(table):,} distinct expressions of {table.occurrences:,})')
+
+
+def retained(code, interned):
+    tracemalloc.start()
+    program = parse(code)
+    if interned:
+        intern_program(program)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / 1024 / 1024, program
+
+
+def main():
+    corpus = []
+    for name in sorted(os.listdir(EXAMPLES_DIR)):
+        with open(os.path.join(EXAMPLES_DIR, name)) as file:
+            corpus.append(file.read())
+        report(name, corpus[-1])
+    report('examples together', '\n'.join(corpus))
+
+    code = synthetic_source()
+    report('synthetic 100k', code)
+    plain, _ = retained(code, False)
+    interned, _ = retained(code, True)
+    program = parse(code)
+    start = time.perf_counter()
+    ExpressionTable().intern_program(program)
+    print(f'synthetic 100k retained {plain:.1f} MB -> {interned:.1f} MB, '
+          f'interning takes {(time.perf_counter() - start) * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# Run from src/: python -m benchmarks.bench_lazy
+import io
+import time
+from contextlib import redirect_stdout
+
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+FUNCTIONS = 2000
+CALLED = 5
+
+
+def library_source():
+    # a large helper library of which the script calls only a handful of functions
+    lines = []
+    for index in range(FUNCTIONS):
+        lines.append(f'function helper{index}(a, b) {{')
+        lines.append(f'    value total = a * {index} + b')
+        lines.append('    while total > 100 {')
+        lines.append('        total = total / 2 - (a + b)')
+        lines.append('        if total < 0 { return -total }')
+        lines.append('    }')
+        lines.append(f'    print("helper{index}", total)')
+        lines.append('    return total')
+        lines.append('}')
+    for index in range(0, FUNCTIONS, FUNCTIONS // CALLED):
+        lines.append(f'helper{index}(3, 4)')
+    return '\n'.join(lines) + '\n'
+
+
+def run(code, lazy):
+    start = time.perf_counter()
+    parser = Parser(Lexer(CharacterReader.from_string(code)), lazy_source=code if lazy else None)
+    program = parser.parse_program()
+    parsed = time.perf_counter() - start
+    with redirect_stdout(io.StringIO()):
+        Interpreter(program).interpret()
+    return parsed, time.perf_counter() - start
+
+
+def main():
+    code = library_source()
+    print(f'library: {len(code) / 1024:.0f} KB, {FUNCTIONS} functions, {CALLED} called')
+    for label, lazy in (('eager', False), ('lazy', True)):
+        parsed, total = min(run(code, lazy) for _ in range(5))
+        print(f'{label:<6} parse {parsed * 1000:7.1f} ms, parse and run {total * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Run from src/: python -m benchmarks.bench_lexer
+import time
+from io import StringIO
+
+from benchmarks.sources import scaled_source
+from errors.lexer_errors import LexerError
+from lexer.lexer import CharacterReader, Lexer, TokenType
+
+SIZE = 2 * 1024 * 1024
+
+
+class ChainedLexer(Lexer):
+    # the try_build_* chain Lexer.get_next_token used before the dispatch table
+    def get_next_token(self):
+        self.skip_whitespace()
+        self.start_offset = self.reader.offset
+
+        token = self.try_build_etx() \
+            or self.try_build_comment() \
+            or self.try_build_keyword_or_identifier() \
+            or self.try_build_number() \
+            or self.try_build_string() \
+            or self.try_build_logical_operator('&&', TokenType.AND_OPERATOR) \
+            or self.try_build_logical_operator('||', TokenType.OR_OPERATOR) \
+            or self.try_build_one_or_two_char_operator('==', TokenType.EQUAL, TokenType.EQUALS) \
+            or self.try_build_one_or_two_char_operator('!=', TokenType.NEG, TokenType.NOT_EQUALS) \
+            or self.try_build_one_or_two_char_operator('<=', TokenType.LESS, TokenType.LESS_THAN_OR_EQUAL) \
+            or self.try_build_one_or_two_char_operator('>=', TokenType.GREATER, TokenType.GREATER_THAN_OR_EQUAL) \
+            or self.try_build_one_char_operator()
+        if token:
+            return token
+        raise LexerError('Unknown token', self.start_position)
+
+
+def lex(lexer_class, code):
+    lexer = lexer_class(CharacterReader(StringIO(code)))
+    tokens = []
+    while (token := lexer.get_next_token()).type != TokenType.ETX:
+        tokens.append(token)
+    return tokens
+
+
+def measure(label, lexer_class, code):
+    start = time.perf_counter()
+    tokens = lex(lexer_class, code)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<20} {len(tokens) / elapsed:12,.0f} tokens/s')
+    return tokens
+
+
+def main():
+    code = scaled_source(SIZE)
+    print(f'input: {len(code) / 1024 / 1024:.1f} MB of src/examples_code')
+    chained = measure('try_build_* chain', ChainedLexer, code)
+    table = measure('dispatch table', Lexer, code)
+    assert [(t.type, t.value) for t in chained] == [(t.type, t.value) for t in table]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Run from src/: python -m benchmarks.bench_nesting
+import time
+
+from benchmarks.bench_expressions import expression_source
+from benchmarks.bench_statements import statement_source
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+DEPTH = 100_000
+
+
+class RecursiveParser(Parser):
+    # the nesting points without their depth threshold, always on the Python stack
+    parse_block = Parser.parse_block.__wrapped__
+    parse_arguments = Parser.parse_arguments.__wrapped__
+    parse_parenthesized_expression = Parser.parse_parenthesized_expression.__wrapped__
+
+
+def best_time(parser_class, tokens):
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        parser_class(tokens).parse_program()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def lex(code):
+    return list(Lexer(CharacterReader.from_string(code)).tokens())
+
+
+def main():
+    for label, code in (('expressions', expression_source()), ('statements', statement_source())):
+        tokens = lex(code)
+        recursive = best_time(RecursiveParser, tokens)
+        current = best_time(Parser, tokens)
+        print(f'shallow {label:<12} recursive {recursive:6.2f} s   with threshold {current:6.2f} s   '
+              f'ratio {current / recursive:4.2f}')
+
+    tokens = lex('value x = ' + '(' * DEPTH + 'a' + ')' * DEPTH + '\n' + 'if x {\n' * DEPTH + '}\n' * DEPTH)
+    start = time.perf_counter()
+    Parser(tokens).parse_program()
+    print(f'depth {DEPTH:,} parentheses and blocks: {time.perf_counter() - start:.2f} s '
+          f'({len(tokens):,} tokens)')
+    try:
+        RecursiveParser(tokens).parse_program()
+    except RecursionError:
+        print('recursive parser: RecursionError')
+
+
+if __name__ == '__main__':
+    main()
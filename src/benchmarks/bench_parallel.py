@@ -0,0 +1,37 @@
+# Run from src/: python -m benchmarks.bench_parallel
+import os
+import time
+
+from parser.parallel import parse_parallel, parse_serial
+
+FUNCTIONS = 4_000
+
+
+def library_source():
+    return '\n'.join(
+        f'function f{index}(a, b, c) {{\n'
+        f'    value total = a * {index} + b / 2 - c\n'
+        f'    while total > 100 {{\n        total = total - b * 3\n    }}\n'
+        f'    if total == {index} || a < b && !c {{\n        print("f{index}", total)\n    }}\n'
+        f'    return total\n}}'
+        for index in range(FUNCTIONS)) + '\n'
+
+
+def timed(parse):
+    start = time.perf_counter()
+    parse()
+    return time.perf_counter() - start
+
+
+def main():
+    code = library_source()
+    print(f'library: {len(code) / 1024:.0f} KB, {FUNCTIONS:,} functions, {os.cpu_count()} cores available')
+    serial = min(timed(lambda: parse_serial(code)) for _ in range(3))
+    print(f'serial parser         {serial:6.2f} s')
+    for workers in (1, 2, 4, 8):
+        elapsed = min(timed(lambda: parse_parallel(code, workers)) for _ in range(3))
+        print(f'{workers} worker process(es) {elapsed:6.2f} s  speedup {serial / elapsed:4.2f}x')
+
+
+if __name__ == '__main__':
+    main()
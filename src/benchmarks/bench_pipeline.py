@@ -0,0 +1,30 @@
+# Run from src/: python -m benchmarks.bench_pipeline
+import time
+from io import StringIO
+
+from benchmarks.sources import scaled_source
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+SIZE = 2 * 1024 * 1024
+
+
+def measure(label, parse):
+    start = time.perf_counter()
+    program = parse()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<32} {elapsed:6.2f} s  ({len(program.statements):,} statements)')
+
+
+def main():
+    code = scaled_source(SIZE)
+    print(f'input: {len(code) / 1024 / 1024:.1f} MB')
+    measure('lexer.tokens()', lambda: Parser(Lexer(CharacterReader(StringIO(code)))).parse_program())
+    measure('pipelined_tokens()',
+            lambda: Parser(Lexer(CharacterReader(StringIO(code))).pipelined_tokens()).parse_program())
+    tokens = list(Lexer(CharacterReader(StringIO(code))).tokens())
+    measure('replayed token list', lambda: Parser(tokens).parse_program())
+
+
+if __name__ == '__main__':
+    main()
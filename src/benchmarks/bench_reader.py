@@ -0,0 +1,55 @@
+# Run from src/: python -m benchmarks.bench_reader
+import os
+import tempfile
+import time
+from io import StringIO
+
+from benchmarks.sources import scaled_source
+from lexer.lexer import CharacterReader, Lexer, MmapSource, TokenType
+
+SIZE = 10 * 1024 * 1024
+
+
+def read_all(reader):
+    while reader.get_next_character() != '\x03':
+        pass
+
+
+def lex_all(reader):
+    lexer = Lexer(reader)
+    while lexer.get_next_token().type != TokenType.ETX:
+        pass
+
+
+def measure(label, run, size):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {size / elapsed / 1024 / 1024:8.2f} MB/s')
+
+
+def main():
+    code = scaled_source(SIZE)
+    size = len(code.encode())
+    with tempfile.NamedTemporaryFile('w', suffix='.xd', delete=False) as file:
+        file.write(code)
+    try:
+        print(f'input: {size / 1024 / 1024:.1f} MB')
+        measure('read, StringIO, read(1) per char', lambda: read_all(CharacterReader(StringIO(code), 1)), size)
+        measure('read, StringIO, chunked', lambda: read_all(CharacterReader(StringIO(code))), size)
+        with open(file.name, 'rb') as binary:
+            source = MmapSource(binary)
+            measure('read, mmap, chunked', lambda: read_all(CharacterReader(source)), size)
+            source.close()
+        measure('lex, StringIO, read(1) per char', lambda: lex_all(CharacterReader(StringIO(code), 1)), size)
+        measure('lex, StringIO, chunked', lambda: lex_all(CharacterReader(StringIO(code))), size)
+        with open(file.name, 'rb') as binary:
+            source = MmapSource(binary)
+            measure('lex, mmap, chunked', lambda: lex_all(CharacterReader(source)), size)
+            source.close()
+    finally:
+        os.unlink(file.name)
+
+
+if __name__ == '__main__':
+    main()
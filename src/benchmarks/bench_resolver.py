@@ -0,0 +1,58 @@
+# Run from src/: python -m benchmarks.bench_resolver
+import io
+import time
+from contextlib import redirect_stdout
+
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+ITERATIONS = 20_000
+
+# foreach is the loop without an iteration limit; string literals are capped at 10000 characters
+LOOP = f'"{"x" * (ITERATIONS // 2)}" + "{"x" * (ITERATIONS // 2)}"'
+
+SOURCES = {
+    'globals': f'''
+value a = 1
+value b = 2
+value c = 0
+value total = 0
+foreach ch in {LOOP} {{
+    c = a + b * c - a
+    total = total + c + a - b
+    if total > 1000000 {{ total = 0 }}
+}}
+print(total)
+''',
+    'function calls': f'''
+function step(x, y) {{
+    value z = x * 2 + y
+    value w = z - x - y
+    return w + z - x
+}}
+value total = 0
+foreach ch in {LOOP} {{
+    total = step(total, 3) - total - total
+}}
+print(total)
+''',
+}
+
+
+def run(code):
+    program = Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        Interpreter(program).interpret()
+    return time.perf_counter() - start
+
+
+def main():
+    for label, code in SOURCES.items():
+        elapsed = min(run(code) for _ in range(3))
+        print(f'{label:<15} {ITERATIONS:,} iterations: {elapsed * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Run from src/: python -m benchmarks.bench_specialization
+import io
+import time
+from contextlib import redirect_stdout
+
+from compiler.transpiler import TranspiledInterpreter
+from compiler.vm import VirtualMachine
+from interpreter.closures import ClosureInterpreter
+from interpreter.interpreter import Interpreter
+from interpreter.specialization import TypeSpecializer
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+# a while loop stops after 80 iterations, so numeric while loops run again and again from a foreach
+LOOP = f'"{"x" * 2000}"'
+
+SOURCES = {
+    'top-level while': f'''
+value total = 0
+value x = 1
+value i = 0
+foreach c in {LOOP} {{
+    i = 0
+    while i < 50 {{
+        total = total + i * 2 - 1
+        x = x * 1.5 / 2
+        i = i + 1
+    }}
+}}
+print(total, x, i)
+''',
+    'while in function': f'''
+function sum(n) {{
+    value i = 0
+    value total = 0
+    while i <= 50 {{
+        if i * i > total - n {{
+            total = total + i
+        }}
+        i = i + 1
+    }}
+    return total
+}}
+value all = 0
+foreach c in {LOOP} {{
+    all = all + sum(all / 1000)
+}}
+print(all)
+''',
+}
+
+ENGINES = {'tree': Interpreter, 'closure': ClosureInterpreter, 'vm': VirtualMachine,
+           'python': TranspiledInterpreter}
+
+
+def run(engine, code, specialize):
+    program = Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+    specializer = TypeSpecializer()
+    if specialize:
+        specializer.specialize_program(program)
+    output = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(output):
+        engine(program).interpret()
+    return time.perf_counter() - start, output.getvalue(), specializer.specialized
+
+
+def main():
+    for label, code in SOURCES.items():
+        print(label)
+        for name, engine in ENGINES.items():
+            general, expected, _ = min(run(engine, code, False) for _ in range(5))
+            specialized, output, count = min(run(engine, code, True) for _ in range(5))
+            assert output == expected, (output, expected)
+            print(f'  {name:<8} general {general * 1000:8.1f} ms   specialized {specialized * 1000:8.1f} ms   '
+                  f'{general / specialized:.2f}x   ({count} operations)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Run from src/: python -m benchmarks.bench_statements
+import time
+
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+STATEMENTS = 40_000
+
+
+class SequentialParser(Parser):
+    # how statements were recognized before: every parse_* is tried in turn until one matches
+    def parse_block_statement(self):
+        return (
+                self.parse_variable_declaration() or self.parse_if_statement()
+                or self.parse_while_statement() or self.parse_foreach_statement()
+                or self.parse_return_statement() or self.parse_assignment_or_function_call()
+        )
+
+    def parse_statement(self):
+        return (
+                self.parse_function_definition() or self.parse_variable_declaration() or
+                self.parse_if_statement() or self.parse_while_statement() or
+                self.parse_foreach_statement() or self.parse_return_statement() or
+                self.parse_assignment_or_function_call()
+        )
+
+
+def statement_source():
+    # short statements so that recognizing them dominates; assignments and calls come last in the old chain
+    templates = [
+        'x = x + 1',
+        'print(x)',
+        'value y{0} = {0}',
+        'total = total - y{0}',
+        'if x {{ x = 0 }}',
+        'while x {{ x = x - 1 }}',
+        'foreach c in "ab" {{ print(c) }}',
+        'function f{0}(a) {{ return a }}',
+    ]
+    return '\n'.join(templates[index % len(templates)].format(index) for index in range(STATEMENTS))
+
+
+def measure(label, parser_class, tokens):
+    best = min(timed(parser_class, tokens) for _ in range(5))
+    print(f'{label:<24} {best:6.2f} s')
+    return best
+
+
+def timed(parser_class, tokens):
+    start = time.perf_counter()
+    parser_class(tokens).parse_program()
+    return time.perf_counter() - start
+
+
+def main():
+    tokens = list(Lexer(CharacterReader.from_string(statement_source())).tokens())
+    print(f'input: {STATEMENTS:,} statements, {len(tokens):,} tokens (pre-lexed)')
+    sequential = measure('parse_* in sequence', SequentialParser, tokens)
+    dispatched = measure('dispatch on token type', Parser, tokens)
+    print(f'speedup: {sequential / dispatched:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# Run from src/: python -m benchmarks.bench_streaming
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+STATEMENTS = 50_000
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+
+def script_source(function_last):
+    # output from the first line on; with function_last the first call of scale() has to parse ahead to the end
+    function = 'function scale(a) {\n    return a / 2\n}'
+    lines = ['print("started")'] + ([] if function_last else [function])
+    for index in range(STATEMENTS):
+        lines.append(f'value v{index} = {index} * 2 + 1')
+        if index % 1000 == 999:
+            lines.append(f'print(scale(v{index}))')
+    if function_last:
+        lines.append(function)
+    return '\n'.join(lines) + '\n'
+
+
+def first_output(path, *options):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN, path, *options], stdout=subprocess.PIPE)
+    process.stdout.readline()
+    first = time.perf_counter() - start
+    process.stdout.read()
+    process.wait()
+    return first, time.perf_counter() - start
+
+
+def peak_memory(run, code):
+    tracemalloc.start()
+    with redirect_stdout(io.StringIO()):
+        run(Parser(Lexer(CharacterReader.from_string(code))))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def batch(parser):
+    Interpreter(parser.parse_program()).interpret()
+
+
+def stream(parser):
+    Interpreter(None).interpret_stream(parser)
+
+
+def main():
+    for function_last in (False, True):
+        code = script_source(function_last)
+        print(f'script: {len(code) / 1024:.0f} KB, {STATEMENTS:,} declarations, '
+              f'function defined {"last" if function_last else "first"}')
+        measure(code)
+
+
+def measure(code):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'script.xd')
+        with open(path, 'w') as file:
+            file.write(code)
+        for label, options, run in (('parse_program', ('--no-cache',), batch), ('--stream', ('--stream',), stream)):
+            first, total = first_output(path, *options)
+            print(f'{label:<14} first output {first:6.2f} s, total {total:6.2f} s, '
+                  f'peak {peak_memory(run, code):6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Run from src/: python -m benchmarks.bench_token_memory
+import tracemalloc
+from io import StringIO
+
+from benchmarks.sources import scaled_source
+from lexer.lexer import CharacterReader, Lexer, Token, TokenType, KEYWORDS
+
+TOKENS = 1_000_000
+INTERNED = {TokenType.IDENTIFIER, TokenType.STRING, *KEYWORDS.values()}
+
+
+class DictToken:
+    # Token as it was before __slots__, with a per-instance __dict__
+    def __init__(self, token_type, offset, lines, value=None):
+        self.type = token_type
+        self.offset = offset
+        self.lines = lines
+        self.value = value
+        self._position = None
+
+
+def lex(code):
+    lexer = Lexer(CharacterReader(StringIO(code)))
+    tokens = []
+    while len(tokens) < TOKENS and (token := lexer.get_next_token()).type != TokenType.ETX:
+        tokens.append(token)
+    return tokens
+
+
+def traced_size(token_class, tokens):
+    tracemalloc.start()
+    copies = [token_class(t.type, t.offset, t.lines, t.value) for t in tokens]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copies
+    return size
+
+
+def megabytes(size, count):
+    return size * 1_000_000 / count / 1024 / 1024
+
+
+def main():
+    tokens = lex(scaled_source(TOKENS * 4))
+    count = len(tokens)
+    dict_size = traced_size(DictToken, tokens)
+    slot_size = traced_size(Token, tokens)
+
+    values = [t.value for t in tokens if t.type in INTERNED]
+    distinct = {id(value): value for value in values}
+    all_bytes = sum(value.__sizeof__() for value in values)
+    distinct_bytes = sum(value.__sizeof__() for value in distinct.values())
+
+    print(f'tokens lexed:            {count:,}')
+    print(f'tokens with __dict__:    {megabytes(dict_size, count):7.1f} MB per million tokens')
+    print(f'slotted tokens:          {megabytes(slot_size, count):7.1f} MB per million tokens')
+    print(f'identifiers/keywords/strings: {len(values):,} values, {len(distinct):,} distinct objects')
+    print(f'saved by interning:      {megabytes(all_bytes - distinct_bytes, count):7.1f} MB per million tokens')
+
+
+if __name__ == '__main__':
+    main()
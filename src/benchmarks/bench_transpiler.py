@@ -0,0 +1,41 @@
+# Run from src/: python -m benchmarks.bench_transpiler
+import io
+import time
+from contextlib import redirect_stdout
+
+from benchmarks.bench_vm import SOURCES
+from compiler.transpiler import TranspiledInterpreter
+from compiler.vm import VirtualMachine
+from interpreter.closures import ClosureInterpreter
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+ENGINES = {'tree': Interpreter, 'closure': ClosureInterpreter, 'vm': VirtualMachine,
+           'python': TranspiledInterpreter}
+
+
+def run(engine, code):
+    # transpiling and compile() are part of the run
+    program = Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+    output = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(output):
+        engine(program).interpret()
+    return time.perf_counter() - start, output.getvalue()
+
+
+def main():
+    for label, code in SOURCES.items():
+        times = {}
+        outputs = set()
+        for name, engine in ENGINES.items():
+            times[name], output = min(run(engine, code) for _ in range(5))
+            outputs.add(output)
+        assert len(outputs) == 1, outputs
+        print(f'{label:<16}' + '   '.join(f'{name} {seconds * 1000:7.1f} ms' for name, seconds in times.items())
+              + f'   python {times["tree"] / times["python"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Run from src/: python -m benchmarks.bench_vm
+import io
+import time
+from contextlib import redirect_stdout
+
+from compiler.vm import VirtualMachine
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+
+ITERATIONS = 20_000
+
+# foreach is the loop without an iteration limit; string literals are capped at 10000 characters
+LOOP = f'"{"x" * (ITERATIONS // 2)}" + "{"x" * (ITERATIONS // 2)}"'
+
+SOURCES = {
+    'loops': f'''
+value total = 0
+value count = 0
+foreach c in {LOOP} {{
+    count = count + 1
+    if count * 3 > total / 2 {{
+        total = total + count - 1
+    }}
+}}
+print(total, count)
+''',
+    'recursion': '''
+function fib(n) {
+    if n < 2 {
+        return n
+    }
+    return fib(n - 1) + fib(n - 2)
+}
+print(fib(20))
+''',
+    'string building': f'''
+function wrap(text) {{
+    return "[" + text + "]"
+}}
+value line = ""
+value lines = 0
+foreach c in {LOOP} {{
+    line = line + c.toUpper()
+    if line.length == 40 {{
+        line = wrap(line)
+        lines = lines + 1
+        line = ""
+    }}
+}}
+print(lines, line.length)
+''',
+}
+
+ENGINES = {'tree': Interpreter, 'vm': VirtualMachine}
+
+
+def run(engine, code):
+    program = Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+    output = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(output):
+        engine(program).interpret()
+    return time.perf_counter() - start, output.getvalue()
+
+
+def main():
+    for label, code in SOURCES.items():
+        times = {}
+        outputs = set()
+        for name, engine in ENGINES.items():
+            times[name], output = min(run(engine, code) for _ in range(5))
+            outputs.add(output)
+        assert len(outputs) == 1, outputs
+        print(f'{label:<16} tree {times["tree"] * 1000:8.1f} ms   vm {times["vm"] * 1000:8.1f} ms   '
+              f'{times["tree"] / times["vm"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# Run from src/: python -m benchmarks.bench_watch
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.incremental import IncrementalParser
+from parser.parser import Parser
+
+FUNCTIONS = 5000
+EDITS = 20
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+
+def script_source(version=0, edited=0):
+    # 50k lines: ten-line helper functions, a top-level declaration after each, and a few calls at the end;
+    # `version` is the constant in helper number `edited`, the function an edit touches
+    lines = []
+    for index in range(FUNCTIONS):
+        constant = version if index == edited else index
+        lines.append(f'function helper{index}(a, b) {{')
+        lines.append(f'    value total = a * {constant} + b')
+        lines.append('    value step = a + b')
+        lines.append('    while total > 100 {')
+        lines.append('        total = total / 2 - step')
+        lines.append('        if total < 0 { return -total }')
+        lines.append('    }')
+        lines.append('    return total')
+        lines.append('}')
+        lines.append(f'value v{index} = {index} * 2 + 1')
+    lines.append(f'print("result", helper{edited}(3, 4), v{FUNCTIONS - 1})')
+    return '\n'.join(lines) + '\n'
+
+
+def run(program):
+    with redirect_stdout(io.StringIO()):
+        Interpreter(program).interpret()
+
+
+def in_process():
+    edited = FUNCTIONS // 2
+    start = time.perf_counter()
+    run(Parser(Lexer(CharacterReader.from_string(script_source(0, edited)))).parse_program())
+    full = time.perf_counter() - start
+
+    incremental = IncrementalParser(script_source(0, edited))
+    parse_time = total_time = 0
+    for version in range(1, EDITS + 1):
+        code = script_source(version, edited)
+        start = time.perf_counter()
+        program = incremental.update(code)
+        parsed = time.perf_counter()
+        run(program)
+        parse_time += (parsed - start) / EDITS
+        total_time += (time.perf_counter() - start) / EDITS
+    print(f'full parse and run:         {full * 1000:8.1f} ms')
+    print(f'incremental parse:          {parse_time * 1000:8.1f} ms  ({incremental.reparsed} statement reparsed)')
+    print(f'incremental parse and run:  {total_time * 1000:8.1f} ms  (mean of {EDITS} one-function edits)')
+
+
+def save_to_output():
+    # a real --watch process: time from writing the file to the line its new run prints
+    edited = FUNCTIONS // 2
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'script.xd')
+        with open(path, 'w') as file:
+            file.write(script_source(0, edited))
+        process = subprocess.Popen([sys.executable, MAIN, path, '--watch'], stdout=subprocess.PIPE, text=True)
+        try:
+            process.stdout.readline()
+            latencies = []
+            for version in range(1, EDITS + 1):
+                code = script_source(version, edited)
+                start = time.perf_counter()
+                # saved the way editors do, so the watcher never reads a half-written file
+                with open(path + '.tmp', 'w') as file:
+                    file.write(code)
+                os.replace(path + '.tmp', path)
+                process.stdout.readline()
+                latencies.append(time.perf_counter() - start)
+                # the watcher compares modification times, which may be coarser than the edit rate
+                time.sleep(0.05)
+        finally:
+            process.terminate()
+            process.wait()
+    latencies.sort()
+    print(f'--watch save to output:     {latencies[len(latencies) // 2] * 1000:8.1f} ms median, '
+          f'{latencies[-1] * 1000:.1f} ms max')
+
+
+def main():
+    code = script_source()
+    print(f'script: {code.count(chr(10)):,} lines, {len(code) / 1024:.0f} KB')
+    in_process()
+    save_to_output()
+
+
+if __name__ == '__main__':
+    main()
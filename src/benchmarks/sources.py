@@ -0,0 +1,18 @@
+import os
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples_code')
+
+
+def example_sources():
+    sources = []
+    for name in sorted(os.listdir(EXAMPLES_DIR)):
+        if name.endswith('.xd'):
+            with open(os.path.join(EXAMPLES_DIR, name)) as file:
+                sources.append(file.read())
+    return sources
+
+
+def scaled_source(size):
+    # concatenates the example programs until the text is at least `size` characters long
+    unit = '\n'.join(example_sources()) + '\n'
+    return unit * (size // len(unit) + 1)
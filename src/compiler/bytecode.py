@@ -0,0 +1,120 @@
+from array import array
+from enum import IntEnum, auto
+
+from lexer.lexer import SourcePosition
+
+NONE = -1
+
+
+class Opcode(IntEnum):
+    # operands; a slot is a frame slot from interpreter.resolver, and the variable's name is in Code.names
+    LOAD_CONST = auto()  # constant index
+    LOAD_GLOBAL = auto()  # slot
+    LOAD_LOCAL = auto()  # slot; a name declared later in the function reads the global until then
+    STORE_GLOBAL = auto()  # slot
+    STORE_LOCAL = auto()  # slot
+    STORE_UNDECLARED = auto()  # assignment to a name the function does not declare
+    DECLARE_GLOBAL = auto()  # slot
+    DECLARE_LOCAL = auto()  # slot
+    ADD = auto()  # binary operations: the Operators member, for the general case
+    SUBTRACT = auto()
+    MULTIPLY = auto()
+    DIVIDE = auto()
+    EQUALS = auto()
+    NOT_EQUALS = auto()
+    LESS = auto()
+    GREATER = auto()
+    LESS_OR_EQUAL = auto()
+    GREATER_OR_EQUAL = auto()
+    AND = auto()
+    OR = auto()
+    NOT = auto()
+    NEGATE = auto()
+    GET_ATTRIBUTE = auto()  # attribute name
+    CALL = auto()  # (function name, argument count, clears the return value)
+    TO_UPPER = auto()  # clears the return value
+    TO_LOWER = auto()
+    POP = auto()
+    JUMP = auto()  # target
+    JUMP_IF_FALSE = auto()  # target
+    START_WHILE = auto()
+    LOOP = auto()  # target; counts the iteration against the interpreter's limit
+    GET_ITER = auto()
+    FOR_ITER = auto()  # target once the iterator is exhausted
+    FOREACH_GLOBAL = auto()  # slot
+    FOREACH_LOCAL = auto()  # slot
+    RETURN = auto()
+    RETURN_NONE = auto()
+    RETURN_LAST = auto()  # falls off the end of a function
+
+
+class Code:
+    # a compiled top-level statement list or function body: (opcode, operand) instructions, the constant pool
+    # that LOAD_CONST indexes, a line table with the source offset of every instruction, and the names of
+    # the variables instructions use, which only errors need
+    __slots__ = ('name', 'instructions', 'constants', 'constant_indexes', 'offsets', 'lines', 'positions',
+                 'names', 'parameter_slots', 'frame_size')
+
+    def __init__(self, name):
+        self.name = name
+        self.instructions = []
+        self.constants = []
+        self.constant_indexes = {}
+        self.offsets = array('q')
+        self.lines = None
+        # positions that are not offsets into self.lines, e.g. of hand-built trees
+        self.positions = {}
+        self.names = {}
+        self.parameter_slots = ()
+        self.frame_size = 0
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def emit(self, opcode, operand=None, position=None, name=None):
+        pc = len(self.instructions)
+        # plain ints compare faster than IntEnum members in the virtual machine's dispatch
+        self.instructions.append((int(opcode), operand))
+        if name is not None:
+            self.names[pc] = name
+        # statements of an incrementally parsed program have lines of their own (parser.incremental)
+        if isinstance(position, SourcePosition) and (self.lines is None or position.lines is self.lines):
+            self.lines = position.lines
+            self.offsets.append(position.offset)
+        else:
+            self.offsets.append(NONE)
+            if position is not None:
+                self.positions[pc] = position
+        return pc
+
+    def patch(self, pc, operand):
+        self.instructions[pc] = (self.instructions[pc][0], operand)
+
+    def constant(self, value):
+        # 1, 1.0 and True are equal dict keys, so the pool is keyed on the type as well
+        key = (type(value), value)
+        if (index := self.constant_indexes.get(key)) is None:
+            index = self.constant_indexes[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def position(self, pc):
+        if (offset := self.offsets[pc]) != NONE:
+            return SourcePosition(offset, self.lines)
+        return self.positions.get(pc)
+
+
+def disassemble(code):
+    lines = []
+    for pc, (opcode, operand) in enumerate(code.instructions):
+        line = f'{pc:>5}  {Opcode(opcode).name:<18}'
+        if opcode == Opcode.LOAD_CONST:
+            line += f'{operand} ({code.constants[operand]!r})'
+        elif operand is not None:
+            line += str(getattr(operand, 'name', operand))
+        if (name := code.names.get(pc)) is not None:
+            line += f' ({name})'
+        if (position := code.position(pc)) is not None:
+            line = f'{line:<50}{position}'
+        lines.append(line.rstrip())
+    return '\n'.join(lines)
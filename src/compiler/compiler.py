@@ -0,0 +1,188 @@
+from compiler.bytecode import Code, Opcode
+from interpreter.resolver import LOCAL
+from interpreter.runtime import LITERALS
+from parser.interning import ExpressionPosition
+from parser.models import VariableDeclaration, FunctionCall, Assignment, Identifier, BinaryOperation, \
+    SpecializedBinaryOperation, UnaryOperation, ReturnStatement, IfStatement, WhileStatement, ForeachStatement
+from parser.parser import Operators
+
+BINARY_OPCODES = {
+    Operators.ADD_OPERATOR: Opcode.ADD,
+    Operators.MINUS_OPERATOR: Opcode.SUBTRACT,
+    Operators.MULT_OPERATOR: Opcode.MULTIPLY,
+    Operators.DIV_OPERATOR: Opcode.DIVIDE,
+    Operators.EQUALS: Opcode.EQUALS,
+    Operators.NOT_EQUALS: Opcode.NOT_EQUALS,
+    Operators.LESS: Opcode.LESS,
+    Operators.GREATER: Opcode.GREATER,
+    Operators.LESS_THAN_OR_EQUAL: Opcode.LESS_OR_EQUAL,
+    Operators.GREATER_THAN_OR_EQUAL: Opcode.GREATER_OR_EQUAL,
+    Operators.AND_OPERATOR: Opcode.AND,
+    Operators.OR_OPERATOR: Opcode.OR,
+}
+
+UNARY_OPCODES = {Operators.NEG: Opcode.NOT, Operators.MINUS_OPERATOR: Opcode.NEGATE}
+
+# builtins called on a value; no user function can take these names, the builtins are registered first
+METHOD_OPCODES = {'toUpper': Opcode.TO_UPPER, 'toLower': Opcode.TO_LOWER}
+
+CALL_OPCODES = {Opcode.CALL, Opcode.TO_UPPER, Opcode.TO_LOWER}
+
+
+class Compiler:
+    # lowers statements resolved by interpreter.resolver to Code with the semantics of the tree-walking
+    # Interpreter; expressions are compiled on an explicit stack, so only the parser limits their nesting
+    def __init__(self, name, function=False):
+        self.code = Code(name)
+        self.function = function
+        # the statement being compiled, where interned expressions are located
+        self.statement = None
+        # calls compiled so far: a call sets the return value (see CALL) unless its arguments make a call
+        self.calls = 0
+        self.compilers = {
+            VariableDeclaration: self.compile_variable_declaration,
+            Assignment: self.compile_assignment,
+            FunctionCall: self.compile_expression_statement,
+            ReturnStatement: self.compile_return_statement,
+            IfStatement: self.compile_if_statement,
+            WhileStatement: self.compile_while_statement,
+            ForeachStatement: self.compile_foreach_statement,
+        }
+
+    def emit(self, opcode, operand=None, node=None, name=None):
+        position = node.position if node is not None else None
+        if isinstance(position, ExpressionPosition):
+            position = position.locate(self.statement)
+        return self.code.emit(opcode, operand, position, name)
+
+    def compile_statements(self, statements):
+        for statement in statements:
+            self.statement = statement
+            self.compilers[type(statement)](statement)
+
+    def compile_block(self, block):
+        self.compile_statements(block.statements)
+
+    def compile_variable_declaration(self, statement):
+        if statement.value_expr:
+            self.compile_expression(statement.value_expr)
+        else:
+            self.emit(Opcode.LOAD_CONST, self.code.constant(None))
+        opcode = Opcode.DECLARE_LOCAL if statement.depth == LOCAL else Opcode.DECLARE_GLOBAL
+        self.emit(opcode, statement.slot, statement, statement.name)
+
+    def compile_assignment(self, statement):
+        self.compile_expression(statement.value_expr)
+        if statement.depth != LOCAL:
+            self.emit(Opcode.STORE_GLOBAL, statement.slot, statement, statement.name)
+        elif statement.slot == -1:
+            self.emit(Opcode.STORE_UNDECLARED, None, statement, statement.name)
+        else:
+            self.emit(Opcode.STORE_LOCAL, statement.slot, statement, statement.name)
+
+    def compile_expression_statement(self, statement):
+        self.compile_expression(statement)
+        self.emit(Opcode.POP)
+
+    def compile_return_statement(self, statement):
+        if statement.value_expr:
+            self.compile_expression(statement.value_expr)
+            if self.function:
+                self.emit(Opcode.RETURN)
+            else:
+                self.emit(Opcode.POP)
+        elif self.function:
+            self.emit(Opcode.RETURN_NONE)
+
+    def compile_if_statement(self, statement):
+        self.compile_expression(statement.condition)
+        jump = self.emit(Opcode.JUMP_IF_FALSE)
+        self.compile_block(statement.block)
+        self.code.patch(jump, len(self.code))
+
+    def compile_while_statement(self, statement):
+        self.emit(Opcode.START_WHILE)
+        start = len(self.code)
+        self.compile_expression(statement.condition)
+        jump = self.emit(Opcode.JUMP_IF_FALSE)
+        self.compile_block(statement.block)
+        self.emit(Opcode.LOOP, start)
+        self.code.patch(jump, len(self.code))
+
+    def compile_foreach_statement(self, statement):
+        self.compile_expression(statement.iterable)
+        self.emit(Opcode.GET_ITER, None, statement.iterable, statement.variable)
+        start = self.emit(Opcode.FOR_ITER)
+        opcode = Opcode.FOREACH_LOCAL if statement.depth == LOCAL else Opcode.FOREACH_GLOBAL
+        self.emit(opcode, statement.slot, statement, statement.variable)
+        self.compile_block(statement.block)
+        self.emit(Opcode.JUMP, start)
+        self.code.patch(start, len(self.code))
+
+    def compile_expression(self, expression):
+        # post-order: an instruction goes on the stack as (opcode, operand, node) below the operands it takes
+        stack = [expression]
+        while stack:
+            item = stack.pop()
+            if type(item) is tuple:
+                opcode, operand, node = item
+                if opcode in CALL_OPCODES:
+                    operand = self.call_operand(opcode, operand, node)
+                self.emit(opcode, operand, node, getattr(node, 'name', None))
+                continue
+
+            node_type = type(item)
+            if node_type in LITERALS:
+                self.emit(Opcode.LOAD_CONST, self.code.constant(item.value), item)
+            elif node_type is Identifier:
+                if item.parent is not None:
+                    stack.append((Opcode.GET_ATTRIBUTE, item.name, item))
+                    stack.append(item.parent)
+                else:
+                    opcode = Opcode.LOAD_LOCAL if item.depth == LOCAL else Opcode.LOAD_GLOBAL
+                    self.emit(opcode, item.slot, item, item.name)
+            elif node_type is BinaryOperation or node_type is SpecializedBinaryOperation:
+                stack.append((BINARY_OPCODES[item.operator], item.operator, item))
+                stack.append(item.right)
+                stack.append(item.left)
+            elif node_type is UnaryOperation:
+                stack.append((UNARY_OPCODES[item.operator], item.operator, item))
+                stack.append(item.right)
+            elif node_type is FunctionCall:
+                if item.parent is not None and item.name in METHOD_OPCODES:
+                    # the arguments are never evaluated
+                    stack.append((METHOD_OPCODES[item.name], self.calls, item))
+                    stack.append(item.parent)
+                    continue
+                stack.append((Opcode.CALL, self.calls, item))
+                stack.extend(reversed(item.args))
+                if item.parent is not None:
+                    # evaluated for its side effects only
+                    stack.append((Opcode.POP, None, None))
+                    stack.append(item.parent)
+
+    def call_operand(self, opcode, calls, node):
+        # the interpreter clears the return value when a call starts; a call made by the arguments sets it
+        # again before this one runs, so only a call without such calls has to clear it
+        clears = self.calls == calls
+        self.calls += 1
+        if opcode == Opcode.CALL:
+            return node.name, len(node.args), clears
+        return clears
+
+
+def compile_program(statements):
+    # top-level statements other than function definitions, resolved
+    compiler = Compiler('<program>')
+    compiler.compile_statements(statements)
+    compiler.emit(Opcode.RETURN_LAST)
+    return compiler.code
+
+
+def compile_function(function):
+    compiler = Compiler(function.name, function=True)
+    compiler.compile_statements(function.block.statements)
+    compiler.emit(Opcode.RETURN_LAST)
+    compiler.code.parameter_slots = tuple(parameter.slot for parameter in function.parameters)
+    compiler.code.frame_size = function.frame_size
+    return compiler.code
@@ -0,0 +1,395 @@
+import math
+
+from errors.interpreter_errors import UndefinedVarError, DuplicateVarDeclarationError, UnexpectedTypeError, \
+    RecursionLimitError
+from interpreter.closures import ClosureInterpreter
+from interpreter.resolver import UNDECLARED, LOCAL, declared_names
+from interpreter.runtime import LITERALS, BINARY_OPERATIONS, CompilingInterpreter
+from parser.interning import ExpressionPosition
+from parser.models import VariableDeclaration, FunctionCall, Assignment, Identifier, BinaryOperation, \
+    SpecializedBinaryOperation, UnaryOperation, ReturnStatement, IfStatement, WhileStatement, ForeachStatement
+from parser.parser import Operators
+
+# the Python operator of an operation on operands of known types (SpecializedBinaryOperation); on two
+# booleans, & and | give what `and` and `or` do
+OPERATOR_SYMBOLS = {
+    Operators.ADD_OPERATOR: '+',
+    Operators.MINUS_OPERATOR: '-',
+    Operators.MULT_OPERATOR: '*',
+    Operators.DIV_OPERATOR: '/',
+    Operators.EQUALS: '==',
+    Operators.NOT_EQUALS: '!=',
+    Operators.LESS: '<',
+    Operators.GREATER: '>',
+    Operators.LESS_THAN_OR_EQUAL: '<=',
+    Operators.GREATER_THAN_OR_EQUAL: '>=',
+    Operators.AND_OPERATOR: '&',
+    Operators.OR_OPERATOR: '|',
+}
+
+# how deeply an expression nests before its operands are computed into temporaries first: CPython's parser
+# gives up at 200 nested parentheses
+MAX_NESTING = 50
+
+INDENT = '    '
+
+
+def runtime(interpreter):
+    # the names generated code runs with: the global frame, the interpreter, the errors it raises and the
+    # operations of interpreter.runtime for values of unknown types
+    def undefined(name, position):
+        raise UndefinedVarError(name, position)
+
+    def load_undeclared(name, global_slot, position):
+        # a local read before its declaration has run falls back to the global of the same name
+        value = interpreter.globals[global_slot]
+        if value is UNDECLARED:
+            raise UndefinedVarError(name, position)
+        return value
+
+    return {
+        **interpreter.operations,
+        'G': interpreter.globals,
+        'U': UNDECLARED,
+        'interpreter': interpreter,
+        'UndefinedVarError': UndefinedVarError,
+        'DuplicateVarDeclarationError': DuplicateVarDeclarationError,
+        'UnexpectedTypeError': UnexpectedTypeError,
+        'RecursionLimitError': RecursionLimitError,
+        'undefined': undefined, 'load_undeclared': load_undeclared,
+    }
+
+
+class Unit:
+    # a program or a function as Python source, compiled; source_map holds the .xd position of the
+    # statement each line of the source came from (see annotated), positions those the generated code
+    # raises errors with
+    __slots__ = ('name', 'filename', 'source', 'source_map', 'positions', 'code')
+
+    def __init__(self, name, filename, lines, source_map, positions):
+        # the name of the def in the source
+        self.name = name
+        self.filename = filename
+        self.source = '\n'.join(lines) + '\n'
+        self.source_map = source_map
+        self.positions = positions
+        self.code = compile(self.source, filename, 'exec')
+
+    def annotated(self):
+        # the source with the .xd line of each line in front of it
+        return ''.join(f'{position.line if position is not None else "":>5} | {line}\n'
+                       for line, position in zip(self.source.splitlines(), self.source_map))
+
+
+class Transpiler:
+    # writes a program or a function as Python source: a def whose statements are Python control flow over
+    # Python locals for the function's frame slots and G, the global frame, for the rest. Expressions call
+    # the helpers of runtime() for anything that depends on the types of values
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.function = False
+        self.lines = []
+        self.source_map = []
+        self.positions = []
+        self.depth = 1
+        self.statement = None
+        self.temps = 0
+        # names of the Python locals of the function's frame slots; parameters are never undeclared
+        self.locals = {}
+        self.parameters = set()
+
+    def transpile_program(self, statements, filename):
+        self.line('def program():')
+        self.statements(statements)
+        return Unit('program', filename, self.lines, self.source_map, self.positions)
+
+    def transpile_function(self, definition, filename):
+        self.function = True
+        names = {}
+        for name in [parameter.name for parameter in definition.parameters] \
+                + declared_names(definition.block.statements):
+            names.setdefault(name, local_name(name, len(names)))
+        self.locals = names
+        parameters = []
+        for index, parameter in enumerate(definition.parameters):
+            # the last of two parameters of the same name is the one set
+            parameters.append(names[parameter.name] if parameter.name not in self.parameters else f'p{index}')
+            self.parameters.add(parameter.name)
+        self.statement = definition
+        self.line(f'def {function_name(definition.name)}({", ".join(parameters)}):')
+        self.depth += 1
+        for index, parameter in enumerate(parameters):
+            if parameter == f'p{index}':
+                self.line(f'{names[definition.parameters[index].name]} = {parameter}')
+        if undeclared := [name for declared, name in names.items() if declared not in self.parameters]:
+            self.line(f'{" = ".join(undeclared)} = U')
+        self.depth -= 1
+        self.statements(definition.block.statements)
+        self.depth += 1
+        # set by a return statement, or else by the last call the function made
+        self.line('return interpreter.return_value')
+        self.depth -= 1
+        return Unit(function_name(definition.name), filename, self.lines, self.source_map, self.positions)
+
+    def line(self, text):
+        self.lines.append(INDENT * (self.depth - 1) + text)
+        self.source_map.append(self.position(self.statement) if self.statement is not None else None)
+
+    def position(self, node):
+        position = node.position
+        if isinstance(position, ExpressionPosition):
+            position = position.locate(self.statement)
+        return position
+
+    def position_code(self, node):
+        self.positions.append(self.position(node))
+        return f'P[{len(self.positions) - 1}]'
+
+    def statements(self, statements):
+        self.depth += 1
+        start = len(self.lines)
+        for statement in statements:
+            outer = self.statement
+            self.statement = statement
+            self.statement_writers[type(statement)](self, statement)
+            self.statement = outer
+        # no statements, or only ones that write nothing, like a top-level return
+        if len(self.lines) == start:
+            self.line('pass')
+        self.depth -= 1
+
+    def target(self, statement):
+        # the Python name or subscript of the slot a statement sets
+        return self.locals[statement.name] if statement.depth == LOCAL else f'G[{statement.slot}]'
+
+    def variable_declaration(self, statement):
+        value = self.expression(statement.value_expr) if statement.value_expr else 'None'
+        target = self.target(statement)
+        self.line(f'value = {value}')
+        self.line(f'if {target} is not U: raise DuplicateVarDeclarationError({statement.name!r}, None)')
+        self.line(f'{target} = value')
+
+    def assignment(self, statement):
+        value = self.expression(statement.value_expr)
+        if statement.depth == LOCAL and statement.slot == -1:
+            # a name the function never declares, which assignment does not look up outside of it
+            self.line(value)
+            self.line(f'raise UndefinedVarError({statement.name!r}, None)')
+            return
+        target = self.target(statement)
+        if statement.depth == LOCAL and statement.name in self.parameters:
+            self.line(f'{target} = {value}')
+            return
+        self.line(f'value = {value}')
+        self.line(f'if {target} is U: raise UndefinedVarError({statement.name!r}, None)')
+        self.line(f'{target} = value')
+
+    def expression_statement(self, statement):
+        self.line(self.expression(statement))
+
+    def return_statement(self, statement):
+        value = self.expression(statement.value_expr) if statement.value_expr else None
+        if not self.function:
+            # at the top level only the value is evaluated
+            if value is not None:
+                self.line(value)
+            return
+        self.line(f'interpreter.return_value = value = {value or "None"}')
+        self.line('return value')
+
+    def if_statement(self, statement):
+        self.line(f'if {self.expression(statement.condition)}:')
+        self.statements(statement.block.statements)
+
+    def while_statement(self, statement):
+        # iterations count against the same limit as calls (Interpreter.visit_while_statement)
+        self.line('interpreter.recursion_depth = 0')
+        self.line('while True:')
+        self.depth += 1
+        self.line('if interpreter.recursion_depth > interpreter.max_recursion_depth: raise RecursionLimitError()')
+        self.line(f'if not {self.expression(statement.condition)}: break')
+        self.depth -= 1
+        self.statements(statement.block.statements)
+        self.depth += 1
+        self.line('interpreter.recursion_depth += 1')
+        self.depth -= 1
+
+    def foreach_statement(self, statement):
+        self.line(f'iterable = {self.expression(statement.iterable)}')
+        self.line(f'if type(iterable) is not str: raise UnexpectedTypeError({statement.variable!r}, '
+                  f'{self.position_code(statement.iterable)})')
+        if statement.depth != LOCAL:
+            self.line(f'for G[{statement.slot}] in iterable:')
+            self.statements(statement.block.statements)
+            return
+        variable = self.locals[statement.variable]
+        self.line('for item in iterable:')
+        self.depth += 1
+        if statement.variable not in self.parameters:
+            # found by lookup, but only the current frame can be set
+            self.line(f'if {variable} is U and G[{statement.global_slot}] is not U: '
+                      f'raise UndefinedVarError({statement.variable!r}, None)')
+        self.line(f'{variable} = item')
+        self.depth -= 1
+        self.statements(statement.block.statements)
+
+    def expression(self, expression):
+        # post-order, as Compiler.compile_expression: a node goes on the stack as (writer, node, operands)
+        # below its operands, and their code goes on `values` as (code, nesting, makes a call)
+        stack = [expression]
+        values = []
+        while stack:
+            item = stack.pop()
+            if type(item) is tuple:
+                writer, node, count = item
+                operands = values[len(values) - count:]
+                del values[len(values) - count:]
+                calls = any(operand[2] for operand in operands)
+                code = writer(self, node, [operand[0] for operand in operands], calls)
+                nesting = max((operand[1] for operand in operands), default=0) + 1
+                if nesting > MAX_NESTING:
+                    code, nesting = self.spill(values, code), 0
+                values.append((code, nesting, calls or type(node) is FunctionCall))
+                continue
+
+            node_type = type(item)
+            if node_type in LITERALS:
+                values.append((literal(item.value), 0, False))
+            elif node_type is Identifier:
+                if item.parent is not None:
+                    stack.append((Transpiler.attribute, item, 1))
+                    stack.append(item.parent)
+                else:
+                    values.append((self.identifier(item), 1, False))
+            elif node_type is BinaryOperation or node_type is SpecializedBinaryOperation:
+                stack.append((Transpiler.binary_operation, item, 2))
+                stack.append(item.right)
+                stack.append(item.left)
+            elif node_type is UnaryOperation:
+                stack.append((Transpiler.unary_operation, item, 1))
+                stack.append(item.right)
+            elif node_type is FunctionCall:
+                if item.parent is not None and item.name in ('toUpper', 'toLower'):
+                    stack.append((Transpiler.method, item, 1))
+                    stack.append(item.parent)
+                    continue
+                stack.append((Transpiler.function_call, item, len(item.args) + (item.parent is not None)))
+                stack.extend(reversed(item.args))
+                if item.parent is not None:
+                    stack.append(item.parent)
+        return values[0][0]
+
+    def spill(self, values, code):
+        # computes the expression into a temporary ahead of the statement, and so before it everything
+        # that comes earlier in the statement and has not run yet
+        for index, (value, nesting, calls) in enumerate(values):
+            if nesting:
+                values[index] = (self.temporary(value), 0, calls)
+        return self.temporary(code)
+
+    def temporary(self, code):
+        self.temps += 1
+        self.line(f't{self.temps} = {code}')
+        return f't{self.temps}'
+
+    def identifier(self, identifier):
+        if identifier.depth == LOCAL:
+            variable = self.locals[identifier.name]
+            if identifier.name in self.parameters:
+                return variable
+            # declared later in the function: the global of the same name until then
+            return f'({variable} if {variable} is not U else load_undeclared({identifier.name!r}, ' \
+                   f'{identifier.global_slot}, {self.position_code(identifier)}))'
+        return f'(t if (t := G[{identifier.slot}]) is not U ' \
+               f'else undefined({identifier.name!r}, {self.position_code(identifier)}))'
+
+    def attribute(self, identifier, operands, calls):
+        return f'attribute({operands[0]}, {identifier.name!r}, {self.position_code(identifier)})'
+
+    def binary_operation(self, expr, operands, calls):
+        if type(expr) is SpecializedBinaryOperation:
+            return f'({operands[0]} {OPERATOR_SYMBOLS[expr.operator]} {operands[1]})'
+        return f'{BINARY_OPERATIONS[expr.operator]}({operands[0]}, {operands[1]})'
+
+    def unary_operation(self, expr, operands, calls):
+        if expr.operator == Operators.NEG:
+            return f'negation({operands[0]})'
+        return f'minus({operands[0]}, {self.position_code(expr)})'
+
+    def method(self, call, operands, calls):
+        return f'method({operands[0]}, {call.name == "toUpper"}, {not calls})'
+
+    def function_call(self, call, operands, calls):
+        args = operands[1:] if call.parent is not None else operands
+        code = f'call({call.name!r}, [{", ".join(args)}], {self.position_code(call)}, {not calls})'
+        if call.parent is not None:
+            # the parent is evaluated for its side effects only
+            return f'({operands[0]}, {code})[1]'
+        return code
+
+    statement_writers = {
+        VariableDeclaration: variable_declaration,
+        Assignment: assignment,
+        FunctionCall: expression_statement,
+        ReturnStatement: return_statement,
+        IfStatement: if_statement,
+        WhileStatement: while_statement,
+        ForeachStatement: foreach_statement,
+    }
+
+
+def literal(value):
+    if type(value) is float and not math.isfinite(value):
+        # folding can make these, and their repr is no Python expression
+        return f"float('{value}')"
+    return repr(value)
+
+
+def local_name(name, slot):
+    # prefixed, so that no name of the language can be a keyword or a name of the runtime
+    return f'l_{name}' if name.isidentifier() else f'l{slot}'
+
+
+def function_name(name):
+    return f'f_{name}' if name.isidentifier() else 'function'
+
+
+class TranspiledInterpreter(CompilingInterpreter):
+    # the Interpreter with every program and function written as Python source (Transpiler) and compiled
+    # with compile(), so that CPython runs it; anything off the helpers' fast paths goes through the
+    # Interpreter's own methods, so the semantics are the same
+    def __init__(self, program, dump=None):
+        super().__init__(program)
+        self.runtime = runtime(self)
+        # how many units were compiled, to give each its own file name
+        self.unit_count = 0
+        # where to write the source of everything transpiled, if anywhere
+        self.dump = dump
+
+    def run(self, statements):
+        try:
+            program = self.load(Transpiler(self).transpile_program(statements, self.filename('program')))
+        except (SyntaxError, RecursionError):
+            # blocks nested past what compile() takes (20 loops, 100 levels of indentation) run as closures
+            ClosureInterpreter.run(self, statements)
+            return
+        program()
+
+    def filename(self, name):
+        return f'<xd {self.unit_count} {name}>'
+
+    def load(self, unit):
+        # runs the def of the unit, which gives the function to call
+        self.unit_count += 1
+        if self.dump is not None:
+            self.dump.write(f'# {unit.filename}\n{unit.annotated()}\n')
+        namespace = dict(self.runtime, P=unit.positions)
+        exec(unit.code, namespace)
+        return namespace[unit.name]
+
+    def compile_function(self, definition):
+        try:
+            unit = Transpiler(self).transpile_function(definition, self.filename(f'function {definition.name}'))
+        except (SyntaxError, RecursionError):
+            return ClosureInterpreter.compile_function(self, definition)
+        return self.load(unit)
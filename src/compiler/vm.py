@@ -0,0 +1,229 @@
+from compiler.bytecode import Opcode
+from compiler.compiler import compile_program, compile_function
+from errors.interpreter_errors import UndefinedVarError, DuplicateVarDeclarationError, UndefinedFunctionError, \
+    UnexpectedAttributeError, UnexpectedTypeError
+from interpreter.resolver import UNDECLARED
+from interpreter.runtime import NUMBERS, BOOLEAN_STRINGS, Function, CompilingInterpreter
+
+# as module-level ints, in the order of Opcode
+(LOAD_CONST, LOAD_GLOBAL, LOAD_LOCAL, STORE_GLOBAL, STORE_LOCAL, STORE_UNDECLARED, DECLARE_GLOBAL, DECLARE_LOCAL,
+ ADD, SUBTRACT, MULTIPLY, DIVIDE, EQUALS, NOT_EQUALS, LESS, GREATER, LESS_OR_EQUAL, GREATER_OR_EQUAL, AND, OR,
+ NOT, NEGATE, GET_ATTRIBUTE, CALL, TO_UPPER, TO_LOWER, POP, JUMP, JUMP_IF_FALSE, START_WHILE, LOOP, GET_ITER,
+ FOR_ITER, FOREACH_GLOBAL, FOREACH_LOCAL, RETURN, RETURN_NONE, RETURN_LAST) = [opcode.value for opcode in Opcode]
+
+
+class VirtualMachine(CompilingInterpreter):
+    # runs programs compiled to bytecode by compiler.compiler, with the semantics of the tree-walking
+    # Interpreter; operations on numbers and plain strings run inline, everything else goes through the
+    # Interpreter's own methods, so errors and weak typing stay exactly the same
+    def run(self, statements):
+        self.execute(compile_program(statements), None)
+
+    def compile_function(self, definition):
+        code = compile_function(definition)
+
+        def body(*args):
+            frame = [UNDECLARED] * code.frame_size
+            for slot, arg in zip(code.parameter_slots, args):
+                frame[slot] = arg
+            return self.execute(code, frame)
+        return body
+
+    def binary(self, operator, left, right):
+        self.binary_operation(operator, left, right)
+        return self.result
+
+    def unary(self, operator, right, code, pc):
+        self.unary_operation(operator, right, code.position(pc))
+        return self.result
+
+    def load_undeclared(self, code, pc):
+        # a local read before its declaration has run falls back to the global of the same name
+        name = code.names[pc]
+        value = self.globals[self.resolver.global_slots[name]]
+        if value is UNDECLARED:
+            raise UndefinedVarError(name, code.position(pc))
+        return value
+
+    def execute(self, code, frame):
+        instructions = code.instructions
+        constants = code.constants
+        # grow_globals extends this same list
+        globals_ = self.globals
+        functions = self.functions
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        while True:
+            opcode, operand = instructions[pc]
+            pc += 1
+            if opcode == LOAD_LOCAL:
+                value = frame[operand]
+                push(value if value is not UNDECLARED else self.load_undeclared(code, pc - 1))
+            elif opcode == LOAD_GLOBAL:
+                value = globals_[operand]
+                if value is UNDECLARED:
+                    raise UndefinedVarError(code.names[pc - 1], code.position(pc - 1))
+                push(value)
+            elif opcode == LOAD_CONST:
+                push(constants[operand])
+            elif opcode == STORE_LOCAL:
+                if frame[operand] is UNDECLARED:
+                    raise UndefinedVarError(code.names[pc - 1], None)
+                frame[operand] = pop()
+            elif opcode == STORE_GLOBAL:
+                if globals_[operand] is UNDECLARED:
+                    raise UndefinedVarError(code.names[pc - 1], None)
+                globals_[operand] = pop()
+            elif opcode == ADD:
+                right = pop()
+                left = stack[-1]
+                if type(left) in NUMBERS and type(right) in NUMBERS or type(left) is str and type(right) is str \
+                        and left not in BOOLEAN_STRINGS and right not in BOOLEAN_STRINGS:
+                    stack[-1] = left + right
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == SUBTRACT:
+                right = pop()
+                left = stack[-1]
+                if type(left) in NUMBERS and type(right) in NUMBERS:
+                    stack[-1] = left - right
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == LESS:
+                right = pop()
+                left = stack[-1]
+                if type(left) in NUMBERS and type(right) in NUMBERS:
+                    stack[-1] = left < right
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == GREATER:
+                right = pop()
+                left = stack[-1]
+                if type(left) in NUMBERS and type(right) in NUMBERS:
+                    stack[-1] = left > right
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == JUMP_IF_FALSE:
+                if not pop():
+                    pc = operand
+            elif opcode == JUMP:
+                pc = operand
+            elif opcode == FOR_ITER:
+                item = next(stack[-1], None)
+                if item is None:
+                    pop()
+                    pc = operand
+                else:
+                    push(item)
+            elif opcode == FOREACH_LOCAL:
+                if frame[operand] is UNDECLARED \
+                        and globals_[self.resolver.global_slots[code.names[pc - 1]]] is not UNDECLARED:
+                    # found by lookup, but only the current frame can be set
+                    raise UndefinedVarError(code.names[pc - 1], None)
+                frame[operand] = pop()
+            elif opcode == FOREACH_GLOBAL:
+                globals_[operand] = pop()
+            elif opcode == CALL:
+                name, count, clears = operand
+                if clears:
+                    self.return_value = None
+                if count:
+                    args = stack[-count:]
+                    del stack[-count:]
+                else:
+                    args = []
+                if (target := functions.get(name)) is None and (target := self.function(name)) is None:
+                    raise UndefinedFunctionError(name, code.position(pc - 1))
+                if type(target) is Function:
+                    push(self.call(target, args, code.position(pc - 1)))
+                else:
+                    push(self.call_builtin(target, args))
+            elif opcode == RETURN:
+                self.return_value = value = pop()
+                return value
+            elif opcode == POP:
+                pop()
+            elif opcode == MULTIPLY:
+                right = pop()
+                left = stack[-1]
+                if type(left) in NUMBERS and type(right) in NUMBERS:
+                    stack[-1] = left * right
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == DIVIDE:
+                right = pop()
+                left = stack[-1]
+                if type(left) in NUMBERS and type(right) in NUMBERS and right != 0:
+                    stack[-1] = left / right
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == EQUALS or opcode == NOT_EQUALS:
+                right = pop()
+                left = stack[-1]
+                if type(left) in NUMBERS and type(right) in NUMBERS or type(left) is str and type(right) is str \
+                        and left not in BOOLEAN_STRINGS and right not in BOOLEAN_STRINGS:
+                    stack[-1] = left == right if opcode == EQUALS else left != right
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == LESS_OR_EQUAL or opcode == GREATER_OR_EQUAL:
+                right = pop()
+                left = stack[-1]
+                if type(left) in NUMBERS and type(right) in NUMBERS:
+                    stack[-1] = left <= right if opcode == LESS_OR_EQUAL else left >= right
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == AND or opcode == OR:
+                # both sides are always evaluated
+                right = pop()
+                left = stack[-1]
+                if type(left) is not str and type(right) is not str:
+                    stack[-1] = (left and right) if opcode == AND else (left or right)
+                else:
+                    stack[-1] = self.binary(operand, left, right)
+            elif opcode == NOT:
+                value = stack[-1]
+                stack[-1] = not value if type(value) is not str else self.unary(operand, value, code, pc - 1)
+            elif opcode == NEGATE:
+                value = stack[-1]
+                stack[-1] = -value if type(value) in NUMBERS else self.unary(operand, value, code, pc - 1)
+            elif opcode == DECLARE_LOCAL:
+                if frame[operand] is not UNDECLARED:
+                    raise DuplicateVarDeclarationError(code.names[pc - 1], position=None)
+                frame[operand] = pop()
+            elif opcode == DECLARE_GLOBAL:
+                if globals_[operand] is not UNDECLARED:
+                    raise DuplicateVarDeclarationError(code.names[pc - 1], position=None)
+                globals_[operand] = pop()
+            elif opcode == LOOP:
+                self.recursion_depth += 1
+                self.check_recursion_depth()
+                pc = operand
+            elif opcode == START_WHILE:
+                self.recursion_depth = 0
+            elif opcode == GET_ITER:
+                if type(stack[-1]) is not str:
+                    raise UnexpectedTypeError(code.names[pc - 1], code.position(pc - 1))
+                stack[-1] = iter(stack[-1])
+            elif opcode == GET_ATTRIBUTE:
+                if operand != 'length' or type(stack[-1]) is not str:
+                    raise UnexpectedAttributeError(operand, code.position(pc - 1))
+                stack[-1] = len(stack[-1])
+            elif opcode == TO_UPPER or opcode == TO_LOWER:
+                if operand:
+                    self.return_value = None
+                value = stack[-1]
+                if type(value) is str:
+                    stack[-1] = value.upper() if opcode == TO_UPPER else value.lower()
+                elif opcode == TO_UPPER:
+                    self.visit_to_upper(None, value)
+                else:
+                    self.visit_to_lower(None, value)
+            elif opcode == RETURN_NONE:
+                self.return_value = None
+                return None
+            elif opcode == RETURN_LAST:
+                return self.return_value
+            elif opcode == STORE_UNDECLARED:
+                raise UndefinedVarError(code.names[pc - 1], None)
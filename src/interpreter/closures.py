@@ -0,0 +1,305 @@
+from errors.interpreter_errors import UndefinedVarError, DuplicateVarDeclarationError, UnexpectedTypeError, \
+    RecursionLimitError
+from interpreter.resolver import UNDECLARED, LOCAL
+from interpreter.runtime import LITERALS, BINARY_OPERATIONS, CompilingInterpreter
+from parser.interning import ExpressionPosition
+from parser.models import VariableDeclaration, FunctionCall, Assignment, Identifier, BinaryOperation, \
+    SpecializedBinaryOperation, UnaryOperation, ReturnStatement, IfStatement, WhileStatement, ForeachStatement
+from parser.parser import Operators
+
+
+class ClosureCompiler:
+    # turns each node into a Python closure once, choosing the operation, the frame and the fast path for
+    # it then. Expressions take the frame of the running function (None at the top level) and return their
+    # value; statements take the frame and return True when a return statement has run
+    def __init__(self, interpreter, function=False):
+        self.interpreter = interpreter
+        self.function = function
+        self.statement = None
+        # calls compiled so far: a call clears the return value unless its arguments make a call
+        self.calls = 0
+
+    def position(self, node):
+        position = node.position
+        if isinstance(position, ExpressionPosition):
+            position = position.locate(self.statement)
+        return position
+
+    def compile_statements(self, statements):
+        closures = []
+        for statement in statements:
+            self.statement = statement
+            closures.append(self.statement_compilers[type(statement)](self, statement))
+        return closures
+
+    def compile_block(self, statements):
+        closures = self.compile_statements(statements)
+        if len(closures) == 1:
+            return closures[0]
+
+        def block(frame):
+            for statement in closures:
+                if statement(frame):
+                    return True
+        return block
+
+    def compile_variable_declaration(self, statement):
+        value_expr = self.compile_expression(statement.value_expr) if statement.value_expr else None
+        slot = statement.slot
+        name = statement.name
+        if statement.depth == LOCAL:
+            def declare_local(frame):
+                value = value_expr(frame) if value_expr else None
+                if frame[slot] is not UNDECLARED:
+                    raise DuplicateVarDeclarationError(name, position=None)
+                frame[slot] = value
+            return declare_local
+
+        globals_ = self.interpreter.globals
+
+        def declare_global(frame):
+            value = value_expr(frame) if value_expr else None
+            if globals_[slot] is not UNDECLARED:
+                raise DuplicateVarDeclarationError(name, position=None)
+            globals_[slot] = value
+        return declare_global
+
+    def compile_assignment(self, statement):
+        value_expr = self.compile_expression(statement.value_expr)
+        slot = statement.slot
+        name = statement.name
+        if statement.depth == LOCAL:
+            if slot == -1:
+                def assign_undeclared(frame):
+                    value_expr(frame)
+                    raise UndefinedVarError(name, None)
+                return assign_undeclared
+
+            def assign_local(frame):
+                value = value_expr(frame)
+                if frame[slot] is UNDECLARED:
+                    raise UndefinedVarError(name, None)
+                frame[slot] = value
+            return assign_local
+
+        globals_ = self.interpreter.globals
+
+        def assign_global(frame):
+            value = value_expr(frame)
+            if globals_[slot] is UNDECLARED:
+                raise UndefinedVarError(name, None)
+            globals_[slot] = value
+        return assign_global
+
+    def compile_expression_statement(self, statement):
+        expression = self.compile_expression(statement)
+
+        def expression_statement(frame):
+            expression(frame)
+        return expression_statement
+
+    def compile_return_statement(self, statement):
+        value_expr = self.compile_expression(statement.value_expr) if statement.value_expr else None
+        interpreter = self.interpreter
+        if not self.function:
+            # at the top level only the value is evaluated
+            def top_level_return(frame):
+                if value_expr:
+                    value_expr(frame)
+            return top_level_return
+
+        def return_statement(frame):
+            interpreter.return_value = value_expr(frame) if value_expr else None
+            return True
+        return return_statement
+
+    def compile_if_statement(self, statement):
+        condition = self.compile_expression(statement.condition)
+        block = self.compile_block(statement.block.statements)
+
+        def if_statement(frame):
+            if condition(frame):
+                return block(frame)
+        return if_statement
+
+    def compile_while_statement(self, statement):
+        condition = self.compile_expression(statement.condition)
+        block = self.compile_block(statement.block.statements)
+        interpreter = self.interpreter
+
+        def while_statement(frame):
+            # iterations count against the same limit as calls (Interpreter.visit_while_statement)
+            interpreter.recursion_depth = 0
+            while True:
+                if interpreter.recursion_depth > interpreter.max_recursion_depth:
+                    raise RecursionLimitError()
+                if not condition(frame):
+                    return
+                if block(frame):
+                    return True
+                interpreter.recursion_depth += 1
+        return while_statement
+
+    def compile_foreach_statement(self, statement):
+        iterable = self.compile_expression(statement.iterable)
+        iterable_position = self.position(statement.iterable)
+        block = self.compile_block(statement.block.statements)
+        slot = statement.slot
+        name = statement.variable
+        globals_ = self.interpreter.globals
+        if statement.depth == LOCAL:
+            global_slot = statement.global_slot
+
+            def foreach_local(frame):
+                value = iterable(frame)
+                if type(value) is not str:
+                    raise UnexpectedTypeError(name, iterable_position)
+                for item in value:
+                    if frame[slot] is UNDECLARED and globals_[global_slot] is not UNDECLARED:
+                        # found by lookup, but only the current frame can be set
+                        raise UndefinedVarError(name, None)
+                    frame[slot] = item
+                    if block(frame):
+                        return True
+            return foreach_local
+
+        def foreach_global(frame):
+            value = iterable(frame)
+            if type(value) is not str:
+                raise UnexpectedTypeError(name, iterable_position)
+            for item in value:
+                globals_[slot] = item
+                if block(frame):
+                    return True
+        return foreach_global
+
+    def compile_expression(self, expression):
+        return self.expression_compilers[type(expression)](self, expression)
+
+    def compile_literal(self, literal):
+        value = literal.value
+        return lambda frame: value
+
+    def compile_identifier(self, identifier):
+        name = identifier.name
+        position = self.position(identifier)
+        if identifier.parent is not None:
+            parent = self.compile_expression(identifier.parent)
+            attribute = self.interpreter.operations['attribute']
+            return lambda frame: attribute(parent(frame), name, position)
+
+        slot = identifier.slot
+        globals_ = self.interpreter.globals
+        if identifier.depth == LOCAL:
+            global_slot = identifier.global_slot
+
+            def load_local(frame):
+                value = frame[slot]
+                if value is UNDECLARED:
+                    # declared later in the function: the global of the same name until then
+                    value = globals_[global_slot]
+                    if value is UNDECLARED:
+                        raise UndefinedVarError(name, position)
+                return value
+            return load_local
+
+        def load_global(frame):
+            value = globals_[slot]
+            if value is UNDECLARED:
+                raise UndefinedVarError(name, position)
+            return value
+        return load_global
+
+    def compile_binary_operation(self, expr):
+        left = self.compile_expression(expr.left)
+        right = self.compile_expression(expr.right)
+        operation = self.interpreter.operations[BINARY_OPERATIONS[expr.operator]]
+
+        def binary(frame):
+            return operation(left(frame), right(frame))
+        return binary
+
+    def compile_specialized_binary_operation(self, expr):
+        left = self.compile_expression(expr.left)
+        right = self.compile_expression(expr.right)
+        operation = expr.operation
+
+        def specialized(frame):
+            return operation(left(frame), right(frame))
+        return specialized
+
+    def compile_unary_operation(self, expr):
+        right = self.compile_expression(expr.right)
+        if expr.operator == Operators.NEG:
+            negation = self.interpreter.operations['negation']
+            return lambda frame: negation(right(frame))
+        position = self.position(expr)
+        minus = self.interpreter.operations['minus']
+        return lambda frame: minus(right(frame), position)
+
+    def compile_function_call(self, call):
+        name = call.name
+        calls = self.calls
+        parent = self.compile_expression(call.parent) if call.parent is not None else None
+        if parent is not None and name in ('toUpper', 'toLower'):
+            # a builtin method: the arguments are never evaluated
+            clears = self.calls == calls
+            self.calls += 1
+            upper = name == 'toUpper'
+            method = self.interpreter.operations['method']
+            return lambda frame: method(parent(frame), upper, clears)
+
+        args = [self.compile_expression(arg) for arg in call.args]
+        position = self.position(call)
+        # a call clears the return value unless its arguments make a call (see operations() call)
+        clears = self.calls == calls
+        self.calls += 1
+        call_ = self.interpreter.operations['call']
+
+        def function_call(frame):
+            if parent is not None:
+                # evaluated for its side effects only
+                parent(frame)
+            return call_(name, [arg(frame) for arg in args], position, clears)
+        return function_call
+
+    # per class rather than per compiler: a function body gets a compiler of its own when first called
+    statement_compilers = {
+        VariableDeclaration: compile_variable_declaration,
+        Assignment: compile_assignment,
+        FunctionCall: compile_expression_statement,
+        ReturnStatement: compile_return_statement,
+        IfStatement: compile_if_statement,
+        WhileStatement: compile_while_statement,
+        ForeachStatement: compile_foreach_statement,
+    }
+    expression_compilers = {
+        Identifier: compile_identifier,
+        BinaryOperation: compile_binary_operation,
+        SpecializedBinaryOperation: compile_specialized_binary_operation,
+        UnaryOperation: compile_unary_operation,
+        FunctionCall: compile_function_call,
+        **dict.fromkeys(LITERALS, compile_literal),
+    }
+
+
+class ClosureInterpreter(CompilingInterpreter):
+    # the Interpreter with every statement compiled to closures (ClosureCompiler) before it runs; anything
+    # off the closures' fast paths goes through the Interpreter's own methods, so the semantics are the same
+    def run(self, statements):
+        for statement in ClosureCompiler(self).compile_statements(statements):
+            statement(None)
+
+    def compile_function(self, definition):
+        parameter_slots = tuple(parameter.slot for parameter in definition.parameters)
+        frame_size = definition.frame_size
+        block = ClosureCompiler(self, function=True).compile_block(definition.block.statements)
+
+        def body(*args):
+            frame = [UNDECLARED] * frame_size
+            for slot, arg in zip(parameter_slots, args):
+                frame[slot] = arg
+            block(frame)
+            # set by a return statement, or else by the last call the function made
+            return self.return_value
+        return body
@@ -0,0 +1,198 @@
+from errors.interpreter_errors import UnexpectedTypeError, UndefinedVarError, UnexpectedAttributeError, \
+    InvalidArgsCountError, UndefinedFunctionError
+from interpreter.builtin_functions import PrintFun, Int, Float, Bool, Str, ToUpper, ToLower
+from interpreter.environment import Scope
+from interpreter.interpreter import Interpreter
+from parser.flat import NodeKind, CODE_OPERATORS, NONE
+
+
+class FlatFunction:
+    # what the global scope keeps for a function defined in a FlatProgram
+    __slots__ = ('name', 'parameters', 'block')
+
+    def __init__(self, name, parameters, block):
+        self.name = name
+        self.parameters = parameters
+        self.block = block
+
+
+class FlatInterpreter(Interpreter):
+    # runs a FlatProgram row by row with the same semantics as the tree-walking Interpreter
+    def __init__(self, flat):
+        super().__init__(None)
+        self.flat = flat
+        executors = {
+            NodeKind.FUNCTION_DEFINITION: self.execute_function_definition,
+            NodeKind.BLOCK: self.execute_block,
+            NodeKind.VARIABLE_DECLARATION: self.execute_variable_declaration,
+            NodeKind.FUNCTION_CALL: self.execute_function_call,
+            NodeKind.ASSIGNMENT: self.execute_assignment,
+            NodeKind.IDENTIFIER: self.execute_identifier,
+            NodeKind.BINARY_OPERATION: self.execute_binary_operation,
+            NodeKind.UNARY_OPERATION: self.execute_unary_operation,
+            NodeKind.INT_LITERAL: self.execute_literal,
+            NodeKind.FLOAT_LITERAL: self.execute_literal,
+            NodeKind.BOOL_LITERAL: self.execute_literal,
+            NodeKind.STRING_LITERAL: self.execute_literal,
+            NodeKind.NULL_LITERAL: self.execute_literal,
+            NodeKind.RETURN_STATEMENT: self.execute_return_statement,
+            NodeKind.IF_STATEMENT: self.execute_if_statement,
+            NodeKind.WHILE_STATEMENT: self.execute_while_statement,
+            NodeKind.FOREACH_STATEMENT: self.execute_foreach_statement,
+        }
+        # indexed by the kind code, so that execute is a single list lookup
+        self.dispatch = [None] * (max(NodeKind) + 1)
+        for kind, executor in executors.items():
+            self.dispatch[kind] = executor
+
+    def interpret(self):
+        statements = self.flat.list_at(self.flat.statements)
+        kinds = self.flat.kinds
+        for row in statements:
+            if kinds[row] == NodeKind.FUNCTION_DEFINITION:
+                self.execute(row)
+
+        for row in statements:
+            if kinds[row] != NodeKind.FUNCTION_DEFINITION:
+                self.execute(row)
+
+    def execute(self, row):
+        self.dispatch[self.flat.kinds[row]](row)
+
+    def name(self, row):
+        return self.flat.constants[self.flat.values[row]]
+
+    def execute_block(self, row):
+        for statement in self.flat.list_at(self.flat.lefts[row]):
+            self.execute(statement)
+            if self.return_encountered:
+                break
+
+    def execute_function_definition(self, row):
+        parameters = [self.name(parameter) for parameter in self.flat.list_at(self.flat.lefts[row])]
+        self.env.set_function(FlatFunction(self.name(row), parameters, self.flat.rights[row]))
+
+    def execute_variable_declaration(self, row):
+        if (value_expr := self.flat.lefts[row]) != NONE:
+            self.execute(value_expr)
+            value = self.result
+        else:
+            value = None
+        self.env.declare_variable(self.name(row), value)
+
+    def execute_assignment(self, row):
+        self.execute(self.flat.lefts[row])
+        self.env.set_variable(self.name(row), self.result)
+
+    def execute_function_call(self, row):
+        name = self.name(row)
+        func = self.get_function(name)
+        self.return_value = None
+
+        if (parent := self.flat.rights[row]) != NONE:
+            self.execute(parent)
+            val = self.result
+            if isinstance(func, (ToUpper, ToLower)):
+                func.accept(self, val)
+                return
+
+        args = []
+        for arg in self.flat.list_at(self.flat.lefts[row]):
+            self.execute(arg)
+            args.append(self.result)
+
+        if isinstance(func, (PrintFun, Int, Float, Str, Bool)):
+            func.accept(self, *args)
+        elif isinstance(func, FlatFunction):
+            self.check_recursion_depth()
+            self.recursion_depth += 1
+            try:
+                if len(args) != len(func.parameters):
+                    raise InvalidArgsCountError(name, self.flat.position(row))
+
+                # Environment.new_scope, for parameters that are names rather than Identifier nodes
+                self.env.stack.append(self.env.current_scope)
+                self.env.current_scope = Scope(self.env.global_scope)
+                self.env.current_scope.variables.update(zip(func.parameters, args))
+                self.execute(func.block)
+                self.result = self.return_value
+                self.env.del_scope()
+                self.return_encountered = False
+            finally:
+                self.recursion_depth -= 1
+
+        else:
+            raise UndefinedFunctionError(name, self.flat.position(row))
+
+    def execute_if_statement(self, row):
+        self.execute(self.flat.lefts[row])
+        if self.result:
+            self.execute(self.flat.rights[row])
+
+    def execute_while_statement(self, row):
+        condition = self.flat.lefts[row]
+        block = self.flat.rights[row]
+        self.recursion_depth = 0
+        while True:
+            self.check_recursion_depth()
+            self.execute(condition)
+            if not self.result:
+                break
+            self.execute(block)
+            if self.return_encountered:
+                break
+
+            self.recursion_depth += 1
+
+    def execute_foreach_statement(self, row):
+        self.execute(self.flat.lefts[row])
+        iterable = self.result
+        variable = self.name(row)
+        if isinstance(iterable, str):
+            for item in iterable:
+                if self.env.get_variable(variable):
+                    self.env.set_variable(variable, item)
+                else:
+                    self.env.declare_variable(variable, item)
+                self.execute(self.flat.rights[row])
+                if self.return_encountered:
+                    return
+        else:
+            raise UnexpectedTypeError(variable, self.flat.position(self.flat.lefts[row]))
+
+    def execute_return_statement(self, row):
+        if (value_expr := self.flat.lefts[row]) != NONE:
+            self.execute(value_expr)
+            self.return_value = self.result
+        else:
+            self.return_value = None
+        # at the top level only the value is evaluated
+        if self.env.stack:
+            self.return_encountered = True
+
+    def execute_binary_operation(self, row):
+        self.execute(self.flat.lefts[row])
+        left = self.result
+        self.execute(self.flat.rights[row])
+        self.binary_operation(CODE_OPERATORS[self.flat.operators[row]], left, self.result)
+
+    def execute_unary_operation(self, row):
+        self.execute(self.flat.rights[row])
+        self.unary_operation(CODE_OPERATORS[self.flat.operators[row]], self.result, self.flat.position(row))
+
+    def execute_identifier(self, row):
+        name = self.name(row)
+        if (parent := self.flat.rights[row]) != NONE:
+            self.execute(parent)
+            val = self.result
+            if name == 'length' and isinstance(val, str):
+                self.result = len(val)
+            else:
+                raise UnexpectedAttributeError(name, self.flat.position(row))
+        elif self.env.get_variable(name):
+            self.result = self.env.get_variable(name)[0]
+        else:
+            raise UndefinedVarError(name, self.flat.position(row))
+
+    def execute_literal(self, row):
+        self.result = self.flat.constants[self.flat.values[row]]
@@ -0,0 +1,83 @@
+from interpreter.interpreter import Interpreter
+from parser.models import Block, BinaryOperation, UnaryOperation, Identifier, FunctionCall, IntLiteral, \
+    FloatLiteral, BoolLiteral, StringLiteral, NullLiteral
+from parser.parser import Operators
+from parser.walk import is_node, child_names, rewrite
+
+LITERALS = {IntLiteral, FloatLiteral, BoolLiteral, StringLiteral, NullLiteral}
+
+# what a folded value becomes; booleans and null are left alone, since the literals for them hold the
+# strings "true", "false" and "null", which the runtime does not treat the same as the values
+FOLDED_LITERALS = {int: IntLiteral, float: FloatLiteral, str: StringLiteral}
+
+# builtins that can run before the program does: methods on a literal, and conversions of literals
+FOLDED_METHODS = {'toUpper', 'toLower'}
+FOLDED_CONVERSIONS = {'int', 'float', 'str'}
+
+# a longer string is not worth building before it is known to be needed, e.g. "-" * 1000000
+MAX_FOLDED_STRING = 4096
+
+
+class ConstantFolder:
+    # replaces expressions whose operands are all literals with the literal of their value; the value comes
+    # from running the expression through an Interpreter, so it follows the runtime's weak typing exactly,
+    # and an expression that fails there (1 / 0, 1 - "a", ...) is kept to fail when it runs
+    def __init__(self):
+        self.evaluator = Interpreter(None)
+        self.folded = 0
+
+    def fold_program(self, program):
+        # statements stay where they are, only the expressions in them are replaced
+        stack = [program.statements]
+        while stack:
+            for statement in stack.pop():
+                for name in child_names(type(statement)):
+                    value = getattr(statement, name)
+                    if type(value) is Block:
+                        stack.append(value.statements)
+                    elif type(value) is list:
+                        setattr(statement, name, [rewrite(item, self.fold) if is_node(type(item)) else item
+                                                  for item in value])
+                    elif is_node(type(value)):
+                        setattr(statement, name, rewrite(value, self.fold))
+        return program
+
+    def fold(self, node):
+        if not self.foldable(node):
+            return node
+        try:
+            node.accept(self.evaluator)
+        except Exception:
+            return node
+        value = self.evaluator.result
+        literal = FOLDED_LITERALS.get(type(value))
+        if literal is None or type(value) is str and len(value) > MAX_FOLDED_STRING:
+            return node
+        self.folded += 1
+        return literal(value, node.position)
+
+    @staticmethod
+    def foldable(node):
+        node_type = type(node)
+        if node_type is BinaryOperation:
+            if type(node.left) not in LITERALS or type(node.right) not in LITERALS:
+                return False
+            if node.operator == Operators.MULT_OPERATOR:
+                return not any(type(text) is str and type(count) is int and len(text) * count > MAX_FOLDED_STRING
+                               for text, count in ((node.left.value, node.right.value),
+                                                   (node.right.value, node.left.value)))
+            return True
+        if node_type is UnaryOperation:
+            return type(node.right) in LITERALS
+        if node_type is Identifier:
+            return type(node.parent) in LITERALS
+        if node_type is FunctionCall:
+            # user functions cannot take these names, the builtins are registered first
+            if node.parent is not None:
+                return node.name in FOLDED_METHODS and type(node.parent) in LITERALS
+            return node.name in FOLDED_CONVERSIONS and all(type(arg) in LITERALS for arg in node.args)
+        return False
+
+
+def fold_constants(program):
+    return ConstantFolder().fold_program(program)
@@ -1,3 +1,4 @@
+from collections import deque
 from io import StringIO
 
 from errors.parser_errors import ParserError
@@ -6,9 +7,11 @@ from lexer.lexer import CharacterReader, Lexer
 from parser.models import FunctionDefinition, ReturnStatement, Visitor
 from errors.interpreter_errors import DivisionByZeroError, TypeBinaryError, TypeUnaryError, \
     UnexpectedTypeError, UndefinedVarError, UnexpectedMethodError, UnexpectedAttributeError, InterpreterError, \
-    InvalidArgsCountError, RecursionLimitError, UndefinedFunctionError
+    InvalidArgsCountError, RecursionLimitError, UndefinedFunctionError, DuplicateVarDeclarationError
 from interpreter.environment import Environment
-from parser.parser import Operators, Parser
+from interpreter.resolver import Resolver, UNDECLARED, LOCAL
+from parser.interning import ExpressionPosition
+from parser.parser import Operators, Parser, LazyBlock
 
 
 class Interpreter(Visitor):
@@ -21,6 +24,14 @@ class Interpreter(Visitor):
         self.recursion_depth = 0
         self.result = None
         self.return_value = None
+        # streaming mode: top-level statements still to be parsed, and those parsed ahead but not run yet
+        self.statements = None
+        self.parsed_ahead = deque()
+        # variables live in frames, lists indexed by the slots the resolver gives them; self.frame is the
+        # frame of the running function, None at the top level. Environment still keeps the functions
+        self.resolver = Resolver()
+        self.globals = []
+        self.frame = None
 
     def check_recursion_depth(self):
         if self.recursion_depth > self.max_recursion_depth:
@@ -33,6 +44,42 @@ class Interpreter(Visitor):
     def interpret(self):
         self.program.accept(self)
 
+    def interpret_stream(self, parser):
+        # runs every top-level statement as soon as it is parsed; functions are registered when parsed,
+        # and a call to one that is not known yet parses ahead until it shows up (see get_function)
+        self.statements = parser.parse_statements()
+        while (statement := self.next_statement()) is not None:
+            self.resolve(statement)
+            statement.accept(self)
+
+    def resolve(self, statement):
+        self.resolver.resolve_statement(statement)
+        self.grow_globals()
+
+    def grow_globals(self):
+        if len(self.globals) < len(self.resolver.global_slots):
+            self.globals.extend([UNDECLARED] * (len(self.resolver.global_slots) - len(self.globals)))
+
+    def next_statement(self):
+        if self.parsed_ahead:
+            return self.parsed_ahead.popleft()
+        for statement in self.statements:
+            if not isinstance(statement, FunctionDefinition):
+                return statement
+            statement.accept(self)
+        return None
+
+    def get_function(self, name):
+        func = self.env.get_function(name)
+        if func is None and self.statements is not None:
+            while func is None and (statement := next(self.statements, None)) is not None:
+                if isinstance(statement, FunctionDefinition):
+                    statement.accept(self)
+                    func = self.env.get_function(name)
+                else:
+                    self.parsed_ahead.append(statement)
+        return func
+
     def visit_program(self, program):
         function_definitions = []
         statements = []
@@ -45,17 +92,40 @@ class Interpreter(Visitor):
         for func_def in function_definitions:
             func_def.accept(self)
 
-        for stmt in statements:
-            stmt.accept(self)
+        try:
+            for stmt in statements:
+                self.resolve(stmt)
+                stmt.accept(self)
+        except InterpreterError as error:
+            self.locate_error(error, stmt)
+            raise
 
     def visit_block(self, block):
-        for statement in block.statements:
-            statement.accept(self)
-            if self.return_encountered:
-                break
+        try:
+            for statement in block.statements:
+                statement.accept(self)
+                if self.return_encountered:
+                    break
+        except InterpreterError as error:
+            self.locate_error(error, statement)
+            raise
+
+    @staticmethod
+    def locate_error(error, statement):
+        # an interned expression is shared between statements; the innermost statement running it knows which
+        # occurrence failed
+        if isinstance(error.position, ExpressionPosition):
+            error.position = error.position.locate(statement)
 
     def visit_function_definition(self, func_def):
         self.env.set_function(func_def)
+        # a lazily parsed body is resolved on the first call, when it is parsed
+        if not isinstance(func_def.block, LazyBlock):
+            self.resolve_function(func_def)
+
+    def resolve_function(self, func_def):
+        self.resolver.resolve_function(func_def)
+        self.grow_globals()
 
     def visit_variable_declaration(self, var):
         if var.value_expr:
@@ -63,15 +133,28 @@ class Interpreter(Visitor):
             value = self.result
         else:
             value = None
-        self.env.declare_variable(var.name, value)
+        if var.slot is None:
+            self.env.declare_variable(var.name, value)
+            return
+        frame = self.frame if var.depth == LOCAL else self.globals
+        if frame[var.slot] is not UNDECLARED:
+            raise DuplicateVarDeclarationError(var.name, position=None)
+        frame[var.slot] = value
 
     def visit_assignment(self, expr):
         expr.value_expr.accept(self)
         value = self.result
-        self.env.set_variable(expr.name, value)
+        if expr.slot is None:
+            self.env.set_variable(expr.name, value)
+            return
+        frame = self.frame if expr.depth == LOCAL else self.globals
+        # -1: a name the function never declares, which assignment does not look up outside of it
+        if expr.slot == -1 or frame[expr.slot] is UNDECLARED:
+            raise UndefinedVarError(expr.name, None)
+        frame[expr.slot] = value
 
     def visit_function_call(self, func_call):
-        func = self.env.get_function(func_call.name)
+        func = self.get_function(func_call.name)
         self.return_value = None
 
         if func_call.parent:
@@ -95,10 +178,19 @@ class Interpreter(Visitor):
                 if len(args) != len(func.parameters):
                     raise InvalidArgsCountError(func_call.name, func_call.position)
 
-                self.env.new_scope(func.parameters, args)
-                func.block.accept(self)
+                if isinstance(func.block, LazyBlock):
+                    func.block = func.block.parse()
+                    self.resolve_function(func)
+                frame = [UNDECLARED] * func.frame_size
+                for parameter, arg in zip(func.parameters, args):
+                    frame[parameter.slot] = arg
+                caller_frame = self.frame
+                self.frame = frame
+                try:
+                    func.block.accept(self)
+                finally:
+                    self.frame = caller_frame
                 self.result = self.return_value
-                self.env.del_scope()
                 self.return_encountered = False
             finally:
                 self.recursion_depth -= 1
@@ -130,35 +222,65 @@ class Interpreter(Visitor):
         statement.iterable.accept(self)
         iterable = self.result
         if isinstance(iterable, str):
+            if statement.slot is None:
+                self.env_foreach(statement, iterable)
+                return
+            frame = self.frame if statement.depth == LOCAL else self.globals
             for item in iterable:
-                if self.env.get_variable(statement.variable):
-                    self.env.set_variable(statement.variable, item)
+                # like get_variable and then set_variable or declare_variable: a variable found only in the
+                # global frame from inside a function cannot be set
+                if frame[statement.slot] is not UNDECLARED:
+                    frame[statement.slot] = item
+                elif statement.depth == LOCAL and self.globals[statement.global_slot] is not UNDECLARED:
+                    raise UndefinedVarError(statement.variable, None)
                 else:
-                    self.env.declare_variable(statement.variable, item)
+                    frame[statement.slot] = item
                 statement.block.accept(self)
                 if self.return_encountered:
                     return
         else:
             raise UnexpectedTypeError(statement.variable, statement.iterable.position)
 
+    def env_foreach(self, statement, iterable):
+        for item in iterable:
+            if self.env.get_variable(statement.variable):
+                self.env.set_variable(statement.variable, item)
+            else:
+                self.env.declare_variable(statement.variable, item)
+            statement.block.accept(self)
+            if self.return_encountered:
+                return
+
     def visit_return_statement(self, statement):
-        self.return_encountered = True
+        # set after the value, whose calls would otherwise see it and stop their own bodies
         if statement.value_expr:
             statement.value_expr.accept(self)
             self.return_value = self.result
         else:
             self.return_value = None
+        # at the top level only the value is evaluated
+        if self.frame is not None:
+            self.return_encountered = True
 
     def visit_binary_operation(self, expr):
         expr.left.accept(self)
         left = self.result
         expr.right.accept(self)
         right = self.result
+        self.binary_operation(expr.operator, left, right)
 
+    def visit_specialized_binary_operation(self, expr):
+        # the operand types are known (interpreter.specialization), so none of the conversions and checks
+        expr.left.accept(self)
+        left = self.result
+        expr.right.accept(self)
+        self.result = expr.operation(left, self.result)
+
+    def binary_operation(self, operator, left, right):
         if self.is_boolean(left): left = self.to_bool(left)
         if self.is_boolean(right): right = self.to_bool(right)
 
-        match expr.operator:
+        match operator:
             case Operators.ADD_OPERATOR:
                 self.result = self.binary_plus(left, right)
             case Operators.MINUS_OPERATOR:
@@ -170,7 +292,7 @@ class Interpreter(Visitor):
             case (Operators.EQUALS | Operators.NOT_EQUALS | Operators.LESS
                   | Operators.GREATER | Operators.LESS_THAN_OR_EQUAL
                   | Operators.GREATER_THAN_OR_EQUAL):
-                self.result = self.comparison(expr.operator, left, right)
+                self.result = self.comparison(operator, left, right)
             case Operators.AND_OPERATOR:
                 self.result = self.logical_and(left, right)
             case Operators.OR_OPERATOR:
@@ -230,8 +352,10 @@ class Interpreter(Visitor):
 
     def visit_unary_operation(self, expr):
         expr.right.accept(self)
-        right = self.result
-        match expr.operator:
+        self.unary_operation(expr.operator, self.result, expr.position)
+
+    def unary_operation(self, operator, right, position):
+        match operator:
             case Operators.NEG:
                 if self.is_boolean(right): right = self.to_bool(right)
                 self.result = not right
@@ -239,7 +363,7 @@ class Interpreter(Visitor):
                 if isinstance(right, (int, float)):
                     self.result = -right
                 else:
-                    raise TypeUnaryError(expr.position)
+                    raise TypeUnaryError(position)
 
     def logical_and(self, left, right):
         if not left:
@@ -259,6 +383,12 @@ class Interpreter(Visitor):
                 self.result = len(val)
             else:
                 raise UnexpectedAttributeError(identifier.name, identifier.position)
+        elif identifier.slot is not None:
+            value = (self.frame if identifier.depth == LOCAL else self.globals)[identifier.slot]
+            if value is UNDECLARED and (identifier.depth != LOCAL
+                                        or (value := self.globals[identifier.global_slot]) is UNDECLARED):
+                raise UndefinedVarError(identifier.name, identifier.position)
+            self.result = value
         elif self.env.get_variable(identifier.name):
             self.result = self.env.get_variable(identifier.name)[0]
         else:
@@ -280,6 +410,8 @@ class Interpreter(Visitor):
         self.result = null_literal.value
 
     def visit_print(self, fun, *args):
+        # used as a value, print gives its last argument
+        self.result = args[-1] if args else None
         args = [self.to_string(arg) for arg in args]
         print(*args)
 
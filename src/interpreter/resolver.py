@@ -0,0 +1,107 @@
+from parser.models import Block, VariableDeclaration, Assignment, Identifier, ForeachStatement, FunctionDefinition
+from parser.interning import ExpressionPosition
+from parser.walk import is_node, child_names, rewrite_shared
+
+# what a frame slot holds before its variable is declared
+UNDECLARED = object()
+
+GLOBAL = 1
+LOCAL = 0
+
+
+class Resolver:
+    # gives variables frame slots ahead of running them. The global frame has a slot for every name used
+    # anywhere; a function's frame has one for each name it declares (parameters, value declarations and
+    # foreach variables, in any block, as blocks open no scope). The interpreter keeps the lookup rules of
+    # Environment: a read inside a function tries its frame first and then the global one, an assignment
+    # or a declaration only touches the frame of the code it is in. The nodes of an interned program are
+    # shared by code that may resolve them differently, so they are left as they are: their statements get
+    # resolved copies, one for each node and resolution
+    def __init__(self):
+        self.global_slots = {}
+        self.copies = {}
+
+    def global_slot(self, name):
+        if (slot := self.global_slots.get(name)) is None:
+            slot = self.global_slots[name] = len(self.global_slots)
+        return slot
+
+    def resolve_statement(self, statement):
+        # a top-level statement other than a function definition
+        self.resolve_statements([statement], None)
+
+    def resolve_function(self, function):
+        local_slots = {}
+        for parameter in function.parameters:
+            slot = local_slots.setdefault(parameter.name, len(local_slots))
+            parameter.depth, parameter.slot, parameter.global_slot = LOCAL, slot, self.global_slot(parameter.name)
+        # every name the function declares is local everywhere in it, also where it is read before the
+        # declaration has run, e.g. in an earlier loop iteration
+        for name in declared_names(function.block.statements):
+            local_slots.setdefault(name, len(local_slots))
+        self.resolve_statements(function.block.statements, local_slots)
+        function.frame_size = len(local_slots)
+
+    def resolve_statements(self, statements, local_slots):
+        stack = [statements]
+        while stack:
+            for statement in stack.pop():
+                statement_type = type(statement)
+                if statement_type is FunctionDefinition:
+                    continue
+                if statement_type is VariableDeclaration:
+                    statement.depth, statement.slot = self.declaration(statement.name, local_slots)
+                elif statement_type is Assignment:
+                    statement.depth, statement.slot = (LOCAL, local_slots.get(statement.name, -1)) \
+                        if local_slots is not None else (GLOBAL, self.global_slot(statement.name))
+                elif statement_type is ForeachStatement:
+                    statement.depth, statement.slot = self.declaration(statement.variable, local_slots)
+                    statement.global_slot = self.global_slot(statement.variable)
+                for name in child_names(statement_type):
+                    value = getattr(statement, name)
+                    if type(value) is Block:
+                        stack.append(value.statements)
+                    elif type(value) is list:
+                        setattr(statement, name, [self.resolve_expression(item, local_slots)
+                                                  if is_node(type(item)) else item for item in value])
+                    elif is_node(type(value)):
+                        setattr(statement, name, self.resolve_expression(value, local_slots))
+
+    def declaration(self, name, local_slots):
+        if local_slots is not None:
+            return LOCAL, local_slots[name]
+        return GLOBAL, self.global_slot(name)
+
+    def resolve_expression(self, expression, local_slots):
+        def resolve(node):
+            if type(node) is not Identifier or node.parent is not None:
+                return node
+            global_slot = self.global_slot(node.name)
+            slot = local_slots.get(node.name) if local_slots is not None else None
+            resolution = (LOCAL, slot, global_slot) if slot is not None else (GLOBAL, global_slot, global_slot)
+            if isinstance(node.position, ExpressionPosition) or \
+                    node.slot is not None and (node.depth, node.slot, node.global_slot) != resolution:
+                key = (node, resolution)
+                if (resolved := self.copies.get(key)) is None:
+                    resolved = self.copies[key] = Identifier(node.name, node.position, None)
+                    resolved.depth, resolved.slot, resolved.global_slot = resolution
+                return resolved
+            node.depth, node.slot, node.global_slot = resolution
+            return node
+
+        return rewrite_shared(expression, resolve, self.copies)
+
+
+def declared_names(statements):
+    names = []
+    stack = [statements]
+    while stack:
+        for statement in stack.pop():
+            if type(statement) is VariableDeclaration:
+                names.append(statement.name)
+            elif type(statement) is ForeachStatement:
+                names.append(statement.variable)
+            for name in child_names(type(statement)):
+                if type(value := getattr(statement, name)) is Block:
+                    stack.append(value.statements)
+    return names
@@ -0,0 +1,226 @@
+from abc import abstractmethod
+
+from errors.interpreter_errors import UndefinedFunctionError, UnexpectedAttributeError, InvalidArgsCountError
+from interpreter.builtin_functions import PrintFun, Int, Float, Bool, Str
+from interpreter.interpreter import Interpreter
+from parser.models import FunctionDefinition, IntLiteral, FloatLiteral, BoolLiteral, StringLiteral, NullLiteral
+from parser.parser import Operators, LazyBlock
+
+NUMBERS = {int, float}
+
+# strings the interpreter turns into booleans before any binary operation (Interpreter.is_boolean)
+BOOLEAN_STRINGS = {'true', 'false'}
+
+LITERALS = {IntLiteral, FloatLiteral, BoolLiteral, StringLiteral, NullLiteral}
+
+# the operation each operator runs, by its name in operations()
+BINARY_OPERATIONS = {
+    Operators.ADD_OPERATOR: 'add',
+    Operators.MINUS_OPERATOR: 'subtract',
+    Operators.MULT_OPERATOR: 'multiply',
+    Operators.DIV_OPERATOR: 'divide',
+    Operators.EQUALS: 'equals',
+    Operators.NOT_EQUALS: 'not_equals',
+    Operators.LESS: 'less',
+    Operators.GREATER: 'greater',
+    Operators.LESS_THAN_OR_EQUAL: 'less_or_equal',
+    Operators.GREATER_THAN_OR_EQUAL: 'greater_or_equal',
+    Operators.AND_OPERATOR: 'logical_and',
+    Operators.OR_OPERATOR: 'logical_or',
+}
+
+
+class Function:
+    # a user function as a compiling engine calls it; the body is compiled on the first call
+    __slots__ = ('definition', 'body')
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.body = None
+
+
+def operations(interpreter):
+    # the operations compiled code runs on values of unknown types, by name. Each one does numbers and plain
+    # strings itself and leaves everything else to the Interpreter's binary_operation (is_boolean and
+    # to_bool, then binary_plus, binary_mult, comparison...), so weak typing and errors stay exactly the same
+    functions = interpreter.functions
+
+    def general(operator, left, right):
+        interpreter.binary_operation(operator, left, right)
+        return interpreter.result
+
+    def add(left, right):
+        if type(left) in NUMBERS and type(right) in NUMBERS or type(left) is str and type(right) is str \
+                and left not in BOOLEAN_STRINGS and right not in BOOLEAN_STRINGS:
+            return left + right
+        return general(Operators.ADD_OPERATOR, left, right)
+
+    def subtract(left, right):
+        if type(left) in NUMBERS and type(right) in NUMBERS:
+            return left - right
+        return general(Operators.MINUS_OPERATOR, left, right)
+
+    def multiply(left, right):
+        if type(left) in NUMBERS and type(right) in NUMBERS:
+            return left * right
+        return general(Operators.MULT_OPERATOR, left, right)
+
+    def divide(left, right):
+        if type(left) in NUMBERS and type(right) in NUMBERS and right != 0:
+            return left / right
+        return general(Operators.DIV_OPERATOR, left, right)
+
+    def equals(left, right):
+        if type(left) in NUMBERS and type(right) in NUMBERS or type(left) is str and type(right) is str \
+                and left not in BOOLEAN_STRINGS and right not in BOOLEAN_STRINGS:
+            return left == right
+        return general(Operators.EQUALS, left, right)
+
+    def not_equals(left, right):
+        if type(left) in NUMBERS and type(right) in NUMBERS or type(left) is str and type(right) is str \
+                and left not in BOOLEAN_STRINGS and right not in BOOLEAN_STRINGS:
+            return left != right
+        return general(Operators.NOT_EQUALS, left, right)
+
+    def less(left, right):
+        return left < right if type(left) in NUMBERS and type(right) in NUMBERS \
+            else general(Operators.LESS, left, right)
+
+    def greater(left, right):
+        return left > right if type(left) in NUMBERS and type(right) in NUMBERS \
+            else general(Operators.GREATER, left, right)
+
+    def less_or_equal(left, right):
+        return left <= right if type(left) in NUMBERS and type(right) in NUMBERS \
+            else general(Operators.LESS_THAN_OR_EQUAL, left, right)
+
+    def greater_or_equal(left, right):
+        return left >= right if type(left) in NUMBERS and type(right) in NUMBERS \
+            else general(Operators.GREATER_THAN_OR_EQUAL, left, right)
+
+    def logical_and(left, right):
+        # both sides are always evaluated
+        return (left and right) if type(left) is not str and type(right) is not str \
+            else general(Operators.AND_OPERATOR, left, right)
+
+    def logical_or(left, right):
+        return (left or right) if type(left) is not str and type(right) is not str \
+            else general(Operators.OR_OPERATOR, left, right)
+
+    def negation(value):
+        if type(value) is not str:
+            return not value
+        interpreter.unary_operation(Operators.NEG, value, None)
+        return interpreter.result
+
+    def minus(value, position):
+        if type(value) in NUMBERS:
+            return -value
+        interpreter.unary_operation(Operators.MINUS_OPERATOR, value, position)
+        return interpreter.result
+
+    def attribute(value, name, position):
+        if name == 'length' and type(value) is str:
+            return len(value)
+        raise UnexpectedAttributeError(name, position)
+
+    def call(name, args, position, clears):
+        # the interpreter clears the return value when a call starts; a call made by the arguments sets it
+        # again before this one runs, so only a call without such calls has to clear it
+        if clears:
+            interpreter.return_value = None
+        if (target := functions.get(name)) is None and (target := interpreter.function(name)) is None:
+            raise UndefinedFunctionError(name, position)
+        if type(target) is Function:
+            return interpreter.call(target, args, position)
+        return interpreter.call_builtin(target, args)
+
+    def method(value, upper, clears):
+        # toUpper and toLower: the arguments are never evaluated
+        if clears:
+            interpreter.return_value = None
+        if type(value) is str:
+            return value.upper() if upper else value.lower()
+        if upper:
+            interpreter.visit_to_upper(None, value)
+        else:
+            interpreter.visit_to_lower(None, value)
+
+    return {
+        'add': add, 'subtract': subtract, 'multiply': multiply, 'divide': divide,
+        'equals': equals, 'not_equals': not_equals, 'less': less, 'greater': greater,
+        'less_or_equal': less_or_equal, 'greater_or_equal': greater_or_equal,
+        'logical_and': logical_and, 'logical_or': logical_or, 'negation': negation, 'minus': minus,
+        'attribute': attribute, 'call': call, 'method': method,
+    }
+
+
+class CompilingInterpreter(Interpreter):
+    # the Interpreter for engines that compile resolved statements before running them (closures, bytecode,
+    # Python source). Subclasses give run(statements), which compiles and runs top-level statements, and
+    # compile_function(definition), which gives the body of a Function: called with the arguments, it runs
+    # the function and gives its value
+    def __init__(self, program):
+        super().__init__(program)
+        # what a call to each name runs, once looked up: a Function or a builtin
+        self.functions = {}
+        self.operations = operations(self)
+
+    def visit_program(self, program):
+        statements = []
+        for statement in program.statements:
+            if isinstance(statement, FunctionDefinition):
+                statement.accept(self)
+            else:
+                statements.append(statement)
+        for statement in statements:
+            self.resolve(statement)
+        self.run(statements)
+
+    def interpret_stream(self, parser):
+        self.statements = parser.parse_statements()
+        while (statement := self.next_statement()) is not None:
+            self.resolve(statement)
+            self.run([statement])
+
+    @abstractmethod
+    def run(self, statements):
+        pass
+
+    @abstractmethod
+    def compile_function(self, definition):
+        pass
+
+    def function(self, name):
+        func = self.get_function(name)
+        if isinstance(func, FunctionDefinition):
+            target = Function(func)
+        elif isinstance(func, (PrintFun, Int, Float, Bool, Str)):
+            target = func
+        else:
+            # toUpper and toLower only run on a value
+            return None
+        self.functions[name] = target
+        return target
+
+    def call(self, function, args, position):
+        self.check_recursion_depth()
+        self.recursion_depth += 1
+        try:
+            definition = function.definition
+            if len(args) != len(definition.parameters):
+                raise InvalidArgsCountError(definition.name, position)
+            if function.body is None:
+                if isinstance(definition.block, LazyBlock):
+                    definition.block = definition.block.parse()
+                    self.resolve_function(definition)
+                function.body = self.compile_function(definition)
+            return function.body(*args)
+        finally:
+            self.recursion_depth -= 1
+
+    def call_builtin(self, func, args):
+        # print leaves the result of its last argument
+        self.result = args[-1] if args else None
+        func.accept(self, *args)
+        return self.result
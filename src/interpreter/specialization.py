@@ -0,0 +1,245 @@
+import operator
+
+from interpreter.resolver import declared_names
+from interpreter.runtime import BOOLEAN_STRINGS
+from parser.interning import ExpressionPosition
+from parser.models import FunctionDefinition, VariableDeclaration, FunctionCall, Assignment, Identifier, \
+    BinaryOperation, SpecializedBinaryOperation, UnaryOperation, IntLiteral, FloatLiteral, StringLiteral, \
+    ReturnStatement, IfStatement, WhileStatement, ForeachStatement
+from parser.parser import Operators, LazyBlock
+from parser.walk import children
+
+# what an expression is known to give. TEXT is a str that binary operations take as it is; any other str
+# may be "true" or "false", which they turn into a boolean first (Interpreter.is_boolean)
+INT = 'int'
+FLOAT = 'float'
+NUMBER = 'number'
+TEXT = 'text'
+STRING = 'string'
+BOOL = 'bool'
+
+NUMERIC = {INT, FLOAT, NUMBER}
+
+ARITHMETIC = {
+    Operators.ADD_OPERATOR: operator.add,
+    Operators.MINUS_OPERATOR: operator.sub,
+    Operators.MULT_OPERATOR: operator.mul,
+}
+COMPARISONS = {
+    Operators.EQUALS: operator.eq,
+    Operators.NOT_EQUALS: operator.ne,
+    Operators.LESS: operator.lt,
+    Operators.GREATER: operator.gt,
+    Operators.LESS_THAN_OR_EQUAL: operator.le,
+    Operators.GREATER_THAN_OR_EQUAL: operator.ge,
+}
+# on two booleans, & and | give what `and` and `or` do
+LOGICAL = {
+    Operators.AND_OPERATOR: operator.and_,
+    Operators.OR_OPERATOR: operator.or_,
+}
+
+# builtins whose result has a known type; user functions cannot take these names
+CONVERSIONS = {'int': INT, 'float': FLOAT, 'str': STRING, 'bool': BOOL}
+METHODS = {'toUpper', 'toLower'}
+
+
+def join(first, second):
+    # what a variable holds where two paths meet
+    if first == second:
+        return first
+    if first in NUMERIC and second in NUMERIC:
+        return NUMBER
+    if first in (TEXT, STRING) and second in (TEXT, STRING):
+        return STRING
+    return None
+
+
+def join_into(types, other):
+    # only variables declared on both paths are still known to be declared
+    for name in list(types):
+        if name in other:
+            types[name] = join(types[name], other[name])
+        else:
+            del types[name]
+
+
+class TypeSpecializer:
+    # infers, statement by statement, the type of what each variable holds, and replaces binary operations
+    # whose operands are then known to be numbers, booleans or plain strings with a
+    # SpecializedBinaryOperation that skips the interpreter's conversions and type checks. Operations on
+    # anything else stay as they are. A variable's type is only tracked where it is surely declared, as
+    # inside a function a variable read before its declaration is the global of the same name, and
+    # functions only ever see unknown globals, since they may be called at any time. A call cannot change
+    # the variables of the code making it: a function can only set variables of its own frame
+    def __init__(self):
+        self.specialized = 0
+        # the types at the top of each loop, by the loop and the types before it
+        self.heads = {}
+
+    def specialize_program(self, program):
+        statements = []
+        for statement in program.statements:
+            if isinstance(statement, FunctionDefinition):
+                self.specialize_function(statement)
+            else:
+                statements.append(statement)
+        self.statements(statements, {}, None, True)
+        return program
+
+    def specialize_function(self, function):
+        # a lazily parsed body is left to run as it is
+        if isinstance(function.block, LazyBlock):
+            return
+        parameters = [parameter.name for parameter in function.parameters]
+        local_names = set(parameters) | set(declared_names(function.block.statements))
+        self.statements(function.block.statements, dict.fromkeys(parameters), local_names, True)
+
+    def statements(self, statements, types, local_names, specialize):
+        # types maps each variable surely declared here to its type (None if unknown); local_names is None
+        # at the top level, where every variable is global
+        for statement in statements:
+            statement_type = type(statement)
+            if statement_type is VariableDeclaration or statement_type is Assignment:
+                value_type = None
+                if statement.value_expr is not None:
+                    statement.value_expr, value_type = self.expression(statement.value_expr, types, local_names,
+                                                                       specialize)
+                if local_names is None or statement.name in local_names:
+                    types[statement.name] = value_type
+            elif statement_type is FunctionCall:
+                self.expression(statement, types, local_names, specialize)
+            elif statement_type is ReturnStatement:
+                if statement.value_expr is not None:
+                    statement.value_expr, _ = self.expression(statement.value_expr, types, local_names, specialize)
+            elif statement_type is IfStatement:
+                statement.condition, _ = self.expression(statement.condition, types, local_names, specialize)
+                branch = dict(types)
+                self.statements(statement.block.statements, branch, local_names, specialize)
+                join_into(types, branch)
+            elif statement_type is WhileStatement or statement_type is ForeachStatement:
+                self.loop(statement, types, local_names, specialize)
+
+    def loop(self, statement, types, local_names, specialize):
+        foreach = type(statement) is ForeachStatement
+        if foreach:
+            statement.iterable, _ = self.expression(statement.iterable, types, local_names, specialize)
+        # the types at the top of the loop are those before it joined with those at the end of its body,
+        # until that changes nothing; only then is the loop specialized, with the types that hold in every
+        # iteration. The passes over an enclosing loop meet this one again, so its fixpoint is kept for the
+        # types before it, and a loop body is specialized in a single pass
+        key = (statement, frozenset(types.items()))
+        if (head := self.heads.get(key)) is None:
+            head = dict(types)
+            while True:
+                body = self.iteration(statement, head, local_names, foreach, False)
+                joined = dict(types)
+                join_into(joined, body)
+                if joined == head:
+                    break
+                head = joined
+            self.heads[key] = head
+        if specialize:
+            self.iteration(statement, head, local_names, foreach, True)
+        # the loop is left at its top
+        types.clear()
+        types.update(head)
+
+    def iteration(self, statement, head, local_names, foreach, specialize):
+        body = dict(head)
+        if foreach:
+            if local_names is None or statement.variable in local_names:
+                # one character, never "true" or "false"
+                body[statement.variable] = TEXT
+        else:
+            statement.condition, _ = self.expression(statement.condition, body, local_names, specialize)
+        self.statements(statement.block.statements, body, local_names, specialize)
+        return body
+
+    def expression(self, expression, types, local_names, specialize):
+        # post-order, giving the expression, specialized if asked to, and its type
+        stack = [(expression, False)]
+        results = []
+        while stack:
+            node, children_done = stack.pop()
+            if isinstance(node.position, ExpressionPosition):
+                # an interned node is shared with other code, where the types may differ
+                results.append((node, None))
+                continue
+            if not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children(node)))
+                continue
+            count = len(children(node))
+            operands = results[len(results) - count:]
+            del results[len(results) - count:]
+            results.append(self.node(node, operands, types, local_names, specialize))
+        return results[0]
+
+    def node(self, node, operands, types, local_names, specialize):
+        node_type = type(node)
+        if node_type is IntLiteral:
+            return node, INT
+        if node_type is FloatLiteral:
+            return node, FLOAT
+        if node_type is StringLiteral:
+            return node, TEXT if node.value not in BOOLEAN_STRINGS else None
+        if node_type is Identifier:
+            if node.parent is not None:
+                node.parent, parent_type = operands[0]
+                return node, INT if node.name == 'length' and parent_type in (TEXT, STRING) else None
+            if local_names is not None and node.name not in local_names:
+                return node, None
+            return node, types.get(node.name)
+        if node_type is BinaryOperation or node_type is SpecializedBinaryOperation:
+            (node.left, left), (node.right, right) = operands
+            result, operation = self.binary(node, left, right)
+            if specialize and operation is not None and node_type is BinaryOperation:
+                self.specialized += 1
+                node = SpecializedBinaryOperation(node.operator, node.left, node.right, node.position, operation)
+            return node, result
+        if node_type is UnaryOperation:
+            node.right, right = operands[0]
+            if node.operator == Operators.NEG:
+                return node, BOOL if right in NUMERIC or right == BOOL else None
+            return node, right if right in NUMERIC else None
+        if node_type is FunctionCall:
+            # the arguments come first, as in parser.walk.children
+            if node.parent is not None:
+                node.parent = operands[-1][0]
+                operands = operands[:-1]
+            node.args = [arg for arg, _ in operands]
+            if node.parent is not None:
+                return node, STRING if node.name in METHODS else None
+            return node, CONVERSIONS.get(node.name)
+        return node, None
+
+    @staticmethod
+    def binary(node, left, right):
+        # the type of the result and the operation that gives it without checks, if the types allow one
+        operator_ = node.operator
+        if left in NUMERIC and right in NUMERIC:
+            if operator_ in ARITHMETIC:
+                return INT if left == right == INT else FLOAT if FLOAT in (left, right) else NUMBER, \
+                    ARITHMETIC[operator_]
+            if operator_ == Operators.DIV_OPERATOR and type(node.right) in (IntLiteral, FloatLiteral) \
+                    and node.right.value != 0:
+                return FLOAT, operator.truediv
+            if operator_ in COMPARISONS:
+                return BOOL, COMPARISONS[operator_]
+        elif left == right == TEXT:
+            if operator_ == Operators.ADD_OPERATOR:
+                # may make "true" or "false"
+                return STRING, operator.add
+            if operator_ in (Operators.EQUALS, Operators.NOT_EQUALS):
+                return BOOL, COMPARISONS[operator_]
+        elif left == right == BOOL:
+            if operator_ in LOGICAL:
+                return BOOL, LOGICAL[operator_]
+            if operator_ in (Operators.EQUALS, Operators.NOT_EQUALS):
+                return BOOL, COMPARISONS[operator_]
+        return None, None
+
+
+def specialize_types(program):
+    return TypeSpecializer().specialize_program(program)
@@ -0,0 +1,91 @@
+from bisect import bisect_left
+
+from lexer.lexer import CharacterReader, Lexer, LineIndex
+
+
+class LexerCheckpoint:
+    # lexer state at a token boundary; the lexer has a single mode, so the offset is all of it
+    __slots__ = ('token_index', 'offset')
+
+    def __init__(self, token_index, offset):
+        self.token_index = token_index
+        self.offset = offset
+
+
+class IncrementalLexer:
+    def __init__(self, source, checkpoint_interval=64, **lexer_options):
+        self.source = source
+        self.checkpoint_interval = checkpoint_interval
+        self.lexer_options = lexer_options
+        self.lines = LineIndex()
+        self.lines.reset(source)
+        self.tokens = list(self.lexer_at(0).tokens())
+        self.checkpoints = []
+        self.take_checkpoints(0, len(self.tokens))
+
+    def lexer_at(self, offset):
+        return Lexer(CharacterReader.from_string(self.source, offset, self.lines), **self.lexer_options)
+
+    def take_checkpoints(self, first, last):
+        interval = self.checkpoint_interval
+        for index in range(-(-first // interval) * interval, last, interval):
+            self.checkpoints.append(LexerCheckpoint(index, self.tokens[index].offset))
+
+    def restart_checkpoint(self, offset):
+        # the last checkpoint strictly before offset: the token there cannot overlap or look ahead into the edit
+        found = bisect_left(self.checkpoints, offset, key=lambda checkpoint: checkpoint.offset)
+        return found - 1 if found else None
+
+    def edit(self, start, end, text):
+        # replaces source[start:end] with text and returns the token list, re-lexing only what changed;
+        # on a LexerError the previous source and tokens are kept
+        old_source = self.source
+        self.source = old_source[:start] + text + old_source[end:]
+        self.lines.reset(self.source)
+        delta = len(text) - (end - start)
+        edit_end = start + len(text)
+
+        found = self.restart_checkpoint(start)
+        first, offset = (self.checkpoints[found].token_index, self.checkpoints[found].offset) \
+            if found is not None else (0, 0)
+
+        old = self.tokens
+        resync = first
+        relexed = []
+        try:
+            for token in self.lexer_at(offset).tokens():
+                if token.offset >= edit_end:
+                    # past the edit, a token boundary shared with the old stream means the rest is unchanged
+                    old_offset = token.offset - delta
+                    while resync < len(old) and old[resync].offset < old_offset:
+                        resync += 1
+                    if resync < len(old) and old[resync].offset == old_offset:
+                        break
+                relexed.append(token)
+            else:
+                resync = len(old)
+        except Exception:
+            self.source = old_source
+            self.lines.reset(old_source)
+            raise
+
+        if delta:
+            for index in range(resync, len(old)):
+                token = old[index]
+                token.offset += delta
+                token._position = None
+        old[first:resync] = relexed
+
+        shift = len(relexed) - (resync - first)
+        kept = found if found is not None else 0
+        moved = [checkpoint for checkpoint in self.checkpoints[kept:] if checkpoint.token_index >= resync]
+        del self.checkpoints[kept:]
+        self.take_checkpoints(first, first + len(relexed))
+        if shift % self.checkpoint_interval == 0:
+            for checkpoint in moved:
+                checkpoint.token_index += shift
+                checkpoint.offset += delta
+            self.checkpoints.extend(moved)
+        else:
+            self.take_checkpoints(first + len(relexed), len(old))
+        return self.tokens
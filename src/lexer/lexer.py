@@ -1,12 +1,22 @@
-from copy import copy
+import codecs
+import mmap
+import re
+import string
+from bisect import bisect_right
 from enum import Enum, auto
+from functools import partial
 import sys
-from io import StringIO
+from io import StringIO, IncrementalNewlineDecoder
+from queue import Queue, Full
+from threading import Thread, Event, Lock
 
 from errors.lexer_errors import LexerError
 
 
 class TokenType(Enum):
+    # members are singletons compared by identity; skips Enum's hash of the member name
+    __hash__ = object.__hash__
+
     IF = auto()
     WHILE = auto()
     FOREACH = auto()
@@ -88,11 +98,29 @@ RELATION_OPERATORS = {
 }
 
 
+IDENTIFIER_CHARACTERS = re.compile(r'\w*')
+DIGITS = re.compile(r'\d*')
+WHITESPACE = re.compile(r'\s*')
+COMMENT_CHARACTERS = re.compile(r'[^\n\x03]*')
+STRING_CHARACTERS = re.compile(r'[^"\\\n\x03]*')
+MAX_INT_DIGITS = len(str(sys.maxsize))
+
+
 class Token:
-    def __init__(self, token_type, position, value=None):
+    __slots__ = ('type', 'offset', 'lines', 'value', '_position')
+
+    def __init__(self, token_type, offset, lines, value=None):
         self.type = token_type
-        self.position = position
+        self.offset = offset
+        self.lines = lines
         self.value = value
+        self._position = None
+
+    @property
+    def position(self):
+        if self._position is None:
+            self._position = SourcePosition(self.offset, self.lines)
+        return self._position
 
     def __str__(self):
         return f'Token({self.type}, Value: {repr(self.value)}, Position: Line {self.position.line}, ' \
@@ -103,6 +131,8 @@ class Token:
 
 
 class Position:
+    __slots__ = ('line', 'column')
+
     def __init__(self, line=1, column=1):
         self.line = line
         self.column = column
@@ -111,77 +141,347 @@ class Position:
         return f"Line: {self.line}, Column: {self.column}"
 
 
+class SourcePosition:
+    # a Position kept as an offset into the shared LineIndex; AST nodes hold one per leading token,
+    # so it carries no line/column slots of its own and works them out when someone asks for them
+    __slots__ = ('offset', 'lines')
+
+    def __init__(self, offset, lines):
+        self.offset = offset
+        self.lines = lines
+
+    def __reduce__(self):
+        return SourcePosition, (self.offset, self.lines)
+
+    @property
+    def line(self):
+        return self.lines.line_of(self.offset)
+
+    @property
+    def column(self):
+        return self.lines.column_of(self.offset)
+
+    __str__ = Position.__str__
+
+
+class LineIndex:
+    # fed by the thread reading the source (Lexer.pipelined_tokens) while the one parsing asks for positions,
+    # so the source text waiting to be scanned is only touched under the lock
+    def __init__(self):
+        self.line_starts = [0]
+        self.pending = []
+        self.lock = Lock()
+
+    def reset(self, text):
+        with self.lock:
+            self.line_starts = [0]
+            self.pending = [(0, text)]
+
+    def feed(self, offset, text):
+        with self.lock:
+            self.pending.append((offset, text))
+
+    def scan_pending(self):
+        with self.lock:
+            for offset, text in self.pending:
+                index = text.find('\n')
+                while index != -1:
+                    self.line_starts.append(offset + index + 1)
+                    index = text.find('\n', index + 1)
+            self.pending = []
+
+    def __getstate__(self):
+        # pickled with the program cache: keep the line starts, not the source text still waiting to be scanned
+        self.scan_pending()
+        return {'line_starts': self.line_starts}
+
+    def __setstate__(self, state):
+        self.line_starts = state['line_starts']
+        self.pending = []
+        self.lock = Lock()
+
+    def line_of(self, offset):
+        if self.pending:
+            self.scan_pending()
+        return bisect_right(self.line_starts, offset)
+
+    def column_of(self, offset):
+        return offset - self.line_starts[self.line_of(offset) - 1] + 1
+
+    def position(self, offset):
+        line = self.line_of(offset)
+        return Position(line, offset - self.line_starts[line - 1] + 1)
+
+
 class CharacterReader:
-    def __init__(self, source):
+    def __init__(self, source, chunk_size=65536):
         self.source = source
-        self.position = Position()
+        self.chunk_size = chunk_size
+        self.lines = LineIndex()
         self.current_char = ''
+        self.buffer = ''
+        self.buffer_start = 0
+        self.buffer_length = 0
+        self.index = 0
+
+    @classmethod
+    def from_string(cls, text, offset=0, lines=None, source_offset=0):
+        # reads an in-memory string in place, starting at offset; lines must cover the whole text.
+        # source_offset is where text starts in a larger source, for positions relative to all of it
+        reader = cls(StringIO())
+        reader.buffer = text
+        reader.buffer_start = source_offset
+        reader.buffer_length = len(text)
+        reader.index = offset
+        if lines is None:
+            reader.lines.feed(source_offset, text)
+        else:
+            reader.lines = lines
+        return reader
+
+    @property
+    def offset(self):
+        # offset of current_char in the whole source
+        return self.buffer_start + self.index - (1 if self.current_char else 0)
+
+    @property
+    def position(self):
+        return SourcePosition(self.offset, self.lines)
 
     def get_next_character(self):
-        if self.current_char == '':
-            pass
-        elif self.current_char == '\n':
-            self.position.column = 1
-            self.position.line += 1
+        if self.index == self.buffer_length and not self.fill_buffer():
+            self.current_char = ''
+            return '\x03'
+        self.current_char = self.buffer[self.index]
+        self.index += 1
+        return self.current_char
+
+    def fill_buffer(self):
+        self.buffer_start += self.buffer_length
+        self.buffer = self.source.read(self.chunk_size)
+        self.buffer_length = len(self.buffer)
+        self.index = 0
+        if self.buffer:
+            self.lines.feed(self.buffer_start, self.buffer)
+        return self.buffer_length > 0
+
+    def extend_buffer(self, keep_from):
+        # appends the next chunk, dropping only the characters before keep_from
+        chunk = self.source.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.lines.feed(self.buffer_start + self.buffer_length, chunk)
+        self.buffer_start += keep_from
+        self.buffer = self.buffer[keep_from:] + chunk
+        self.buffer_length = len(self.buffer)
+        self.index -= keep_from
+        return True
+
+    def span_across_chunks(self, pattern, start, keep):
+        # continues a match that reached the end of the buffer into the next chunks
+        end = self.buffer_length
+        while end == self.buffer_length:
+            if keep:
+                if not self.extend_buffer(start):
+                    break
+                start = 0
+            elif not self.fill_buffer():
+                return 0, 0
+            end = pattern.match(self.buffer, 0).end()
+        return start, end
+
+    def move_to(self, index):
+        if index < self.buffer_length:
+            self.current_char = self.buffer[index]
+            self.index = index + 1
         else:
-            self.position.column += 1
-        self.current_char = self.source.read(1)
-        # if self.current_char == '\r':
-        #     pass
-        return self.current_char if self.current_char else '\x03'
+            self.index = index
+            self.get_next_character()
+
+    def take(self, pattern):
+        # one slice of the buffer instead of a character at a time
+        if not self.current_char:
+            return ''
+        start = self.index - 1
+        end = pattern.match(self.buffer, start).end()
+        if end == self.buffer_length:
+            start, end = self.span_across_chunks(pattern, start, keep=True)
+        text = self.buffer[start:end]
+        self.move_to(end)
+        return text
+
+    def skip(self, pattern):
+        if self.current_char:
+            end = pattern.match(self.buffer, self.index - 1).end()
+            if end == self.buffer_length:
+                end = self.span_across_chunks(pattern, self.index - 1, keep=False)[1]
+            self.move_to(end)
+
+
+class MmapSource:
+    # read()-compatible view of a memory-mapped file, decoded like a file opened in text mode
+    def __init__(self, file, encoding='utf-8'):
+        self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if self.file_size(file) else None
+        self.decoder = IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+
+    @staticmethod
+    def file_size(file):
+        file.seek(0, 2)
+        size = file.tell()
+        file.seek(0)
+        return size
+
+    def read(self, size=-1):
+        # the decoder holds back a chunk that ends in part of a character or in a \r that may start \r\n;
+        # reading goes on until it gives text, as '' is the end of the file to CharacterReader
+        while True:
+            data = self.map.read(size) if self.map else b''
+            if (text := self.decoder.decode(data, final=not data)) or not data:
+                return text
+
+    def close(self):
+        if self.map:
+            self.map.close()
 
 
 class Lexer:
-    def __init__(self, reader, identifier_max_length=100, string_max_length=10000):
+    def __init__(self, reader, identifier_max_length=100, string_max_length=10000, trivia=None):
         self.STRING_MAX_LENGTH = string_max_length
         self.IDENTIFIER_MAX_LENGTH = identifier_max_length
+        # list that collects COMMENT tokens skipped by tokens(); None drops them without building tokens
+        self.trivia = trivia
         self.reader = reader
+        self.lines = reader.lines
         self.current_char = self.reader.get_next_character()
-        self.start_position = Position()
+        self.start_offset = 0
+        self.builders = self.build_dispatch_table()
+
+    def build_dispatch_table(self):
+        # first character -> the only try_build_* that can match it
+        table = {
+            '\x03': self.try_build_etx,
+            '#': self.try_build_comment,
+            '"': self.try_build_string,
+            '&': partial(self.try_build_logical_operator, '&&', TokenType.AND_OPERATOR),
+            '|': partial(self.try_build_logical_operator, '||', TokenType.OR_OPERATOR),
+            '=': partial(self.try_build_one_or_two_char_operator, '==', TokenType.EQUAL, TokenType.EQUALS),
+            '!': partial(self.try_build_one_or_two_char_operator, '!=', TokenType.NEG, TokenType.NOT_EQUALS),
+            '<': partial(self.try_build_one_or_two_char_operator, '<=', TokenType.LESS,
+                         TokenType.LESS_THAN_OR_EQUAL),
+            '>': partial(self.try_build_one_or_two_char_operator, '>=', TokenType.GREATER,
+                         TokenType.GREATER_THAN_OR_EQUAL),
+        }
+        for char in string.ascii_letters + '_':
+            table[char] = self.try_build_keyword_or_identifier
+        for char in string.digits:
+            table[char] = self.try_build_number
+        for char in OPERATORS:
+            table[char] = self.try_build_one_char_operator
+        return table
+
+    def try_build_non_ascii(self):
+        # letters and decimal digits outside ASCII are not in the dispatch table
+        return self.try_build_keyword_or_identifier() or self.try_build_number()
+
+    @property
+    def start_position(self):
+        return SourcePosition(self.start_offset, self.lines)
 
     def advance(self):
         self.current_char = self.reader.get_next_character()
 
+    def take(self, pattern):
+        text = self.reader.take(pattern)
+        self.current_char = self.reader.current_char or '\x03'
+        return text
+
     def skip_whitespace(self):
-        while self.current_char.isspace():
-            self.advance()
+        if self.current_char.isspace():
+            self.reader.skip(WHITESPACE)
+            self.current_char = self.reader.current_char or '\x03'
+
+    def skip_trivia(self):
+        self.skip_whitespace()
+        while self.current_char == '#':
+            if self.trivia is None:
+                self.advance()
+                self.reader.skip(COMMENT_CHARACTERS)
+                self.current_char = self.reader.current_char or '\x03'
+            else:
+                self.start_offset = self.reader.offset
+                self.trivia.append(self.try_build_comment())
+            self.skip_whitespace()
 
     def try_build_comment(self):
         if self.current_char == '#':
             self.advance()
-            builder = []
-            while self.current_char != '\n' and self.current_char != '\x03':  # ETX
-                builder.append(self.current_char)
-                self.advance()
-            return Token(TokenType.COMMENT, self.start_position, ''.join(builder))
+            return Token(TokenType.COMMENT, self.start_offset, self.lines, self.take(COMMENT_CHARACTERS))
         return None
 
     def try_build_etx(self):
         if self.current_char == '\x03':
-            return Token(TokenType.ETX, self.reader.position)
+            return Token(TokenType.ETX, self.start_offset, self.lines)
         return None
 
     def get_next_token(self):
         self.skip_whitespace()
-        self.start_position = copy(self.reader.position)
-
-        token = self.try_build_etx() \
-            or self.try_build_comment() \
-            or self.try_build_keyword_or_identifier() \
-            or self.try_build_number() \
-            or self.try_build_string() \
-            or self.try_build_logical_operator('&&', TokenType.AND_OPERATOR) \
-            or self.try_build_logical_operator('||', TokenType.OR_OPERATOR) \
-            or self.try_build_one_or_two_char_operator('==', TokenType.EQUAL, TokenType.EQUALS) \
-            or self.try_build_one_or_two_char_operator('!=', TokenType.NEG, TokenType.NOT_EQUALS) \
-            or self.try_build_one_or_two_char_operator('<=', TokenType.LESS, TokenType.LESS_THAN_OR_EQUAL) \
-            or self.try_build_one_or_two_char_operator('>=', TokenType.GREATER, TokenType.GREATER_THAN_OR_EQUAL) \
-            or self.try_build_one_char_operator()
+        self.start_offset = self.reader.offset
+
+        token = self.builders.get(self.current_char, self.try_build_non_ascii)()
         if token:
             return token
         else:
             raise LexerError('Unknown token', self.start_position)
 
+    def tokens(self):
+        # significant tokens only; comments are routed to self.trivia
+        while True:
+            self.skip_trivia()
+            token = self.get_next_token()
+            yield token
+            if token.type == TokenType.ETX:
+                return
+
+    def pipelined_tokens(self, batch_size=2048, max_batches=16):
+        # a producer thread lexes ahead into a bounded queue of token batches
+        batches = Queue(max_batches)
+        stop = Event()
+        producer = Thread(target=self.produce_batches, args=(batches, batch_size, stop), daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = batches.get()
+                if isinstance(batch, Exception):
+                    raise batch
+                yield from batch
+                if batch and batch[-1].type == TokenType.ETX:
+                    return
+        finally:
+            stop.set()
+
+    def produce_batches(self, batches, batch_size, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        batch = []
+        try:
+            for token in self.tokens():
+                batch.append(token)
+                if len(batch) == batch_size:
+                    if not put(batch):
+                        return
+                    batch = []
+            put(batch)
+        except Exception as error:
+            if put(batch):
+                put(error)
+
     def try_build_logical_operator(self, value, token_type):
         if self.current_char != value[0]:
             return None
@@ -189,14 +489,14 @@ class Lexer:
         self.advance()
         if self.current_char == value[1]:
             self.advance()
-            return Token(token_type, self.start_position)
+            return Token(token_type, self.start_offset, self.lines)
         raise LexerError('Unknown token', self.start_position)
 
     def try_build_one_char_operator(self):
         if self.current_char in OPERATORS:
             token_type = OPERATORS[self.current_char]
             self.advance()
-            return Token(token_type, self.start_position)
+            return Token(token_type, self.start_offset, self.lines)
         return None
 
     def try_build_one_or_two_char_operator(self, value, one_token_char, two_token_char):
@@ -206,76 +506,70 @@ class Lexer:
         self.advance()
         if self.current_char == value[1]:
             self.advance()
-            return Token(two_token_char, self.start_position)
+            return Token(two_token_char, self.start_offset, self.lines)
         else:
-            return Token(one_token_char, self.start_position)
+            return Token(one_token_char, self.start_offset, self.lines)
 
     def try_build_keyword_or_identifier(self):
         if self.current_char.isalpha() or self.current_char == "_":
-            builder = []
-            while self.current_char.isalnum() or self.current_char == "_":
-                if len(builder) == self.IDENTIFIER_MAX_LENGTH:
-                    raise LexerError(f"Identifier length have the maximum limit of {self.IDENTIFIER_MAX_LENGTH}",
-                                     self.start_position)
-                builder.append(self.current_char)
-                self.advance()
-            value = ''.join(builder)
+            value = self.take(IDENTIFIER_CHARACTERS)
+            if len(value) > self.IDENTIFIER_MAX_LENGTH:
+                raise LexerError(f"Identifier length have the maximum limit of {self.IDENTIFIER_MAX_LENGTH}",
+                                 self.start_position)
+            value = sys.intern(value)
             token_type = KEYWORDS.get(value, TokenType.IDENTIFIER)
 
-            return Token(token_type, self.start_position, value)
+            return Token(token_type, self.start_offset, self.lines, value)
         return None
 
     def try_build_number(self):
         if not self.current_char.isdecimal():
             return None
 
-        value = int(self.current_char)
-        self.advance()
-
-        while self.current_char.isdecimal():
-            if (sys.maxsize - int(self.current_char)) // 10 >= value:
-                value = value * 10 + int(self.current_char)
-            else:
-                raise LexerError(f"Integer overflow", self.start_position)
-
-            self.advance()
+        digits = self.take(DIGITS).lstrip('0') or '0'
+        if len(digits) > MAX_INT_DIGITS or (value := int(digits)) > sys.maxsize:
+            raise LexerError(f"Integer overflow", self.start_position)
 
         if self.current_char != '.':
-            return Token(TokenType.INT_CONST, self.start_position, value)
+            return Token(TokenType.INT_CONST, self.start_offset, self.lines, value)
 
         self.advance()
 
-        decimal_part = 0
-        decimal_length = 0
-        while self.current_char.isdecimal():
-            if decimal_length > sys.float_info.dig:
-                raise LexerError(f"Float overflow", self.start_position)
-
-            decimal_part = decimal_part * 10 + int(self.current_char)
-            decimal_length += 1
-            self.advance()
+        decimals = self.take(DIGITS)
+        if len(decimals) > sys.float_info.dig + 1:
+            raise LexerError(f"Float overflow", self.start_position)
 
-        value += decimal_part / 10 ** decimal_length
-        return Token(TokenType.FLOAT_CONST, self.start_position, value)
+        value += (int(decimals) if decimals else 0) / 10 ** len(decimals)
+        return Token(TokenType.FLOAT_CONST, self.start_offset, self.lines, value)
 
     def try_build_string(self):
         if self.current_char == '"':
-            builder = []
             self.advance()
-
-            while self.current_char != '"':
+            parts = []
+            length = 0
+
+            while True:
+                part = self.take(STRING_CHARACTERS)
+                parts.append(part)
+                length += len(part)
+                if length > self.STRING_MAX_LENGTH:
+                    raise ValueError(f"String length exceeds the maximum limit of {self.STRING_MAX_LENGTH} characters")
+                if self.current_char == '"':
+                    break
                 if self.current_char == '\x03' or self.current_char == '\n':
                     raise LexerError(
                         f"Unterminated string literal", self.start_position)
-                elif len(builder) == self.STRING_MAX_LENGTH:
+                elif length == self.STRING_MAX_LENGTH:
                     raise ValueError(f"String length exceeds the maximum limit of {self.STRING_MAX_LENGTH} characters")
 
-                builder.append(self.handle_escaped_character())
+                # only strings with a backslash get here
+                parts.append(self.handle_escaped_character())
+                length += 1
                 self.advance()
 
             self.advance()
 
-            return Token(TokenType.STRING, self.start_position, ''.join(builder))
+            return Token(TokenType.STRING, self.start_offset, self.lines, sys.intern(''.join(parts)))
         return None
 
     def handle_escaped_character(self):
@@ -1,19 +1,100 @@
 import argparse
+import functools
 import os
+import sys
+import time
 from io import StringIO
 
+from compiler.transpiler import TranspiledInterpreter
+from compiler.vm import VirtualMachine
 from errors.interpreter_errors import InterpreterError
+from interpreter.closures import ClosureInterpreter
 from errors.lexer_errors import LexerError
 from errors.parser_errors import ParserError
+from interpreter.folding import fold_constants
 from interpreter.interpreter import Interpreter
-from lexer.lexer import CharacterReader, Lexer
+from interpreter.specialization import specialize_types
+from lexer.lexer import CharacterReader, Lexer, MmapSource
+from parser.cache import ProgramCache, source_digest, default_cache_dir
+from parser.incremental import IncrementalParser
+from parser.parallel import parse_parallel
 from parser.parser import Parser
 
 
+WATCH_INTERVAL = 0.05
+
+ENGINES = {'tree': Interpreter, 'closure': ClosureInterpreter, 'vm': VirtualMachine,
+           'python': TranspiledInterpreter}
+
+
+def read_source(path):
+    with open(path, 'rb') as file:
+        source = MmapSource(file)
+        try:
+            return source.read()
+        finally:
+            source.close()
+
+
+def watch(path, engine):
+    # runs the file again on every save; only the top-level statements that changed are parsed again
+    incremental = IncrementalParser()
+    modified = None
+    while True:
+        try:
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        if stamp is not None and stamp != modified:
+            modified = stamp
+            try:
+                engine(incremental.update(read_source(path))).interpret()
+            except (LexerError, ParserError, InterpreterError) as e:
+                print(e)
+            sys.stdout.flush()
+        time.sleep(WATCH_INTERVAL)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Interpreter")
     parser.add_argument('source', nargs='?', help='Source code file (.xd) or leave empty for interactive mode')
+    parser.add_argument('--cache-dir',
+                        help='Keep parsed programs (.xdc) here (default: $XDG_CACHE_HOME/xd or ~/.cache/xd)')
+    parser.add_argument('--cache-next-to-source', action='store_true',
+                        help='Keep parsed programs (.xdc) next to the source file instead; only for '
+                             'directories no one else can write to')
+    parser.add_argument('--no-cache', action='store_true', help='Always lex and parse the source file')
+    parser.add_argument('--stream', action='store_true',
+                        help='Run each top-level statement as soon as it is parsed (no cache; statements before '
+                             'a syntax error still run)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Parse top-level function definitions in this many processes')
+    parser.add_argument('--lazy', action='store_true',
+                        help='Parse a function body only when the function is first called (no cache; syntax '
+                             'errors in functions that are never called go unreported)')
+    parser.add_argument('--check', action='store_true',
+                        help='Parse the whole source file, report syntax errors and do not run it')
+    parser.add_argument('--no-fold', action='store_true',
+                        help='Do not fold expressions of literals into constants before running')
+    parser.add_argument('--no-specialize', action='store_true',
+                        help='Do not specialize operations on values of types known before running')
+    parser.add_argument('--watch', action='store_true',
+                        help='Run the source file again whenever it changes, reparsing only what was edited')
+    parser.add_argument('--engine', choices=ENGINES, default='tree',
+                        help='Walk the syntax tree, compile it to Python closures (closure), compile it to '
+                             'bytecode for a virtual machine (vm), or translate it to Python source (python)')
+    parser.add_argument('--dump-python', action='store_true',
+                        help='Write the Python source of each program and function to stderr as it is translated '
+                             '(with --engine=python)')
     args = parser.parse_args()
+    if args.cache_dir and args.cache_next_to_source:
+        parser.error('--cache-dir and --cache-next-to-source cannot be used together')
+    engine = ENGINES[args.engine]
+    if args.dump_python:
+        if engine is not TranspiledInterpreter:
+            parser.error('--dump-python needs --engine=python')
+        engine = functools.partial(TranspiledInterpreter, dump=sys.stderr)
 
     try:
         if args.source:
@@ -21,23 +102,73 @@ def main():
                 print("Only .xd files are supported")
                 return
 
-            if os.path.isfile(args.source):
-                with open(args.source, 'r') as file:
-                    code = file.read()
-            else:
+            if not os.path.isfile(args.source):
                 print("File not found")
                 return
 
-            reader = CharacterReader(StringIO(code))
-            lexer = Lexer(reader)
-            parser = Parser(lexer)
-            program = parser.parse_program()
+            if args.watch:
+                try:
+                    watch(args.source, engine)
+                except KeyboardInterrupt:
+                    pass
+                return
+
+            if args.stream:
+                with open(args.source, 'rb') as file:
+                    source = MmapSource(file)
+                    try:
+                        engine(None).interpret_stream(Parser(Lexer(CharacterReader(source))))
+                    finally:
+                        source.close()
+                return
+
+            if args.check or args.lazy:
+                text = read_source(args.source)
+                if args.check:
+                    Parser(Lexer(CharacterReader.from_string(text))).parse_program()
+                    print("No syntax errors")
+                    return
+                program = Parser(Lexer(CharacterReader.from_string(text)), lazy_source=text).parse_program()
+                if not args.no_fold:
+                    fold_constants(program)
+                if not args.no_specialize:
+                    specialize_types(program)
+                engine(program).interpret()
+                return
+
+            if args.no_cache:
+                cache = None
+            elif args.cache_next_to_source:
+                cache = ProgramCache()
+            else:
+                cache = ProgramCache(args.cache_dir or default_cache_dir())
+            with open(args.source, 'rb') as file:
+                source = MmapSource(file)
+                try:
+                    digest = source_digest(source)
+                    program = cache.load(args.source, digest) if cache else None
+                    if program is None:
+                        if args.jobs > 1:
+                            program = parse_parallel(source.read(), args.jobs)
+                        else:
+                            reader = CharacterReader(source)
+                            lexer = Lexer(reader)
+                            parser = Parser(lexer)
+                            program = parser.parse_program()
+                        if cache:
+                            cache.store(args.source, digest, program)
+                finally:
+                    source.close()
 
-            interpreter = Interpreter(program)
+            if not args.no_fold:
+                fold_constants(program)
+            if not args.no_specialize:
+                specialize_types(program)
+            interpreter = engine(program)
             interpreter.interpret()
         else:
             print("Enter /exit to finish:")
-            interpreter = Interpreter(None)
+            interpreter = engine(None)
             while True:
                 try:
                     line = input(">>> ")
@@ -0,0 +1,124 @@
+import gc
+import hashlib
+import io
+import os
+import pickle
+import struct
+import zlib
+
+# bump whenever the lexer, parser or parser.models change what a parsed program looks like
+INTERPRETER_VERSION = '1.1'
+FORMAT_VERSION = 1
+CACHE_SUFFIX = '.xdc'
+
+MAGIC = b'XDC\x00'
+# magic, format version, sha256 of the source, length of the interpreter version that follows
+HEADER = struct.Struct('<4sH32sH')
+# payload length and crc32, after the interpreter version
+PAYLOAD_HEADER = struct.Struct('<QI')
+
+# what a parsed program is made of besides the classes of parser.models
+PROGRAM_CLASSES = {
+    ('parser.parser', 'LazyBlock'), ('parser.parser', 'Operators'),
+    ('lexer.lexer', 'Position'), ('lexer.lexer', 'SourcePosition'), ('lexer.lexer', 'LineIndex'),
+}
+
+
+def default_cache_dir():
+    # $XDG_CACHE_HOME/xd, or ~/.cache/xd
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'xd')
+
+
+def source_digest(source):
+    # source is an MmapSource; an empty file is not mapped at all
+    return hashlib.sha256(source.map if source.map is not None else b'').digest()
+
+
+class ProgramUnpickler(pickle.Unpickler):
+    # an entry next to the source can be written by anyone who can write the source, and the checksum does
+    # not stop a crafted one; only the classes of a parsed program are loaded, never any other callable
+    def find_class(self, module, name):
+        if (module, name) in PROGRAM_CLASSES or module == 'parser.models':
+            found = super().find_class(module, name)
+            if (module, name) in PROGRAM_CLASSES or isinstance(found, type) and found.__module__ == module:
+                return found
+        raise pickle.UnpicklingError(f'{module}.{name} is not part of a parsed program')
+
+
+class ProgramCache:
+    # parsed Program trees pickled into .xdc files, in cache_dir or, without one, next to the script;
+    # an entry only counts when its source hash and interpreter version match, anything else is rebuilt
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+
+    def path_for(self, source_path, digest):
+        if self.cache_dir is None:
+            return os.path.splitext(source_path)[0] + CACHE_SUFFIX
+        key = hashlib.sha256(digest + INTERPRETER_VERSION.encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def load(self, source_path, digest):
+        try:
+            with open(self.path_for(source_path, digest), 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        return self.decode(data, digest)
+
+    def store(self, source_path, digest, program):
+        path = self.path_for(source_path, digest)
+        gc.disable()
+        try:
+            data = self.encode(program, digest)
+        except (RecursionError, pickle.PicklingError):
+            return False
+        finally:
+            gc.enable()
+        temporary = f'{path}.{os.getpid()}.tmp'
+        try:
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temporary, 'wb') as file:
+                file.write(data)
+            # readers never see a half-written entry
+            os.replace(temporary, path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return False
+        return True
+
+    @staticmethod
+    def encode(program, digest):
+        payload = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+        version = INTERPRETER_VERSION.encode()
+        return b''.join([
+            HEADER.pack(MAGIC, FORMAT_VERSION, digest, len(version)),
+            version,
+            PAYLOAD_HEADER.pack(len(payload), zlib.crc32(payload)),
+            payload,
+        ])
+
+    @staticmethod
+    def decode(data, digest):
+        # None for a stale entry (other source, interpreter or format) as well as for a corrupt one
+        if len(data) < HEADER.size:
+            return None
+        magic, format_version, source_hash, version_length = HEADER.unpack_from(data)
+        if magic != MAGIC or format_version != FORMAT_VERSION or source_hash != digest:
+            return None
+        start = HEADER.size + version_length
+        if data[HEADER.size:start] != INTERPRETER_VERSION.encode() or len(data) < start + PAYLOAD_HEADER.size:
+            return None
+        length, checksum = PAYLOAD_HEADER.unpack_from(data, start)
+        payload = data[start + PAYLOAD_HEADER.size:]
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            return None
+        # hundreds of thousands of new nodes would otherwise trigger a collection every few hundred of them
+        gc.disable()
+        try:
+            return ProgramUnpickler(io.BytesIO(payload)).load()
+        except Exception:
+            return None
+        finally:
+            gc.enable()
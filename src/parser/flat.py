@@ -0,0 +1,215 @@
+from array import array
+from enum import IntEnum, auto
+
+from lexer.lexer import SourcePosition
+from parser.models import FunctionDefinition, Block, VariableDeclaration, FunctionCall, Assignment, Identifier, \
+    BinaryOperation, SpecializedBinaryOperation, UnaryOperation, IntLiteral, FloatLiteral, BoolLiteral, \
+    StringLiteral, NullLiteral, ReturnStatement, IfStatement, WhileStatement, ForeachStatement
+from parser.parser import Operators, LazyBlock
+
+NONE = -1
+
+
+class NodeKind(IntEnum):
+    # columns used by each kind; lists are runs in FlatProgram.children: [count, row, row, ...]
+    FUNCTION_DEFINITION = auto()  # value: name, left: parameter list, right: block
+    BLOCK = auto()  # left: statement list
+    VARIABLE_DECLARATION = auto()  # value: name, left: expression or NONE
+    FUNCTION_CALL = auto()  # value: name, left: argument list, right: parent or NONE
+    ASSIGNMENT = auto()  # value: name, left: expression
+    IDENTIFIER = auto()  # value: name, right: parent or NONE
+    BINARY_OPERATION = auto()  # operator, left, right
+    UNARY_OPERATION = auto()  # operator, right
+    INT_LITERAL = auto()  # value: constant
+    FLOAT_LITERAL = auto()
+    BOOL_LITERAL = auto()
+    STRING_LITERAL = auto()
+    NULL_LITERAL = auto()
+    RETURN_STATEMENT = auto()  # left: expression or NONE
+    IF_STATEMENT = auto()  # left: condition, right: block
+    WHILE_STATEMENT = auto()  # left: condition, right: block
+    FOREACH_STATEMENT = auto()  # value: variable name, left: iterable, right: block
+
+
+OPERATOR_CODES = {operator: operator.value for operator in Operators}
+CODE_OPERATORS = {operator.value: operator for operator in Operators}
+
+
+class FlatProgram:
+    # the AST as parallel columns indexed by row; names and literal values live in one constant pool
+    def __init__(self):
+        self.kinds = array('B')
+        self.operators = array('B')
+        self.values = array('i')
+        self.lefts = array('i')
+        self.rights = array('i')
+        self.offsets = array('q')
+        self.children = array('i')
+        self.constants = []
+        self.constant_rows = {}
+        self.lines = None
+        # positions that are not offsets into the source, e.g. of hand-built trees
+        self.positions = {}
+        self.statements = NONE
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def add(self, kind, position, operator=0, value=NONE, left=NONE, right=NONE):
+        row = len(self.kinds)
+        self.kinds.append(kind)
+        self.operators.append(operator)
+        self.values.append(value)
+        self.lefts.append(left)
+        self.rights.append(right)
+        if isinstance(position, SourcePosition):
+            self.lines = position.lines
+            self.offsets.append(position.offset)
+        else:
+            self.offsets.append(NONE)
+            if position is not None:
+                self.positions[row] = position
+        return row
+
+    def add_list(self, rows):
+        start = len(self.children)
+        self.children.append(len(rows))
+        self.children.extend(rows)
+        return start
+
+    def list_at(self, start):
+        count = self.children[start]
+        return self.children[start + 1:start + 1 + count]
+
+    def constant(self, value):
+        # 1, 1.0 and True are equal dict keys, so the pool is keyed on the type as well
+        key = (type(value), value)
+        if (index := self.constant_rows.get(key)) is None:
+            index = self.constant_rows[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def position(self, row):
+        if (offset := self.offsets[row]) != NONE:
+            return SourcePosition(offset, self.lines)
+        return self.positions.get(row)
+
+    def nbytes(self):
+        columns = (self.kinds, self.operators, self.values, self.lefts, self.rights, self.offsets, self.children)
+        return sum(column.itemsize * len(column) for column in columns)
+
+
+LITERAL_KINDS = {
+    IntLiteral: NodeKind.INT_LITERAL,
+    FloatLiteral: NodeKind.FLOAT_LITERAL,
+    BoolLiteral: NodeKind.BOOL_LITERAL,
+    StringLiteral: NodeKind.STRING_LITERAL,
+    NullLiteral: NodeKind.NULL_LITERAL,
+}
+
+
+class Lowering:
+    def __init__(self):
+        self.flat = FlatProgram()
+        self.lowerings = {
+            FunctionDefinition: self.lower_function_definition,
+            Block: self.lower_block,
+            VariableDeclaration: self.lower_variable_declaration,
+            FunctionCall: self.lower_function_call,
+            Assignment: self.lower_assignment,
+            Identifier: self.lower_identifier,
+            BinaryOperation: self.lower_binary_operation,
+            SpecializedBinaryOperation: self.lower_binary_operation,
+            UnaryOperation: self.lower_unary_operation,
+            ReturnStatement: self.lower_return_statement,
+            IfStatement: self.lower_if_statement,
+            WhileStatement: self.lower_while_statement,
+            ForeachStatement: self.lower_foreach_statement,
+            LazyBlock: self.lower_lazy_block,
+            **{literal_class: self.lower_literal for literal_class in LITERAL_KINDS},
+        }
+
+    def lower_program(self, program):
+        self.flat.statements = self.lower_list(program.statements)
+        return self.flat
+
+    def lower_statements(self, parser):
+        # lowers each top-level statement as soon as it is parsed, so the object tree never exists as a whole
+        rows = [self.lower(statement) for statement in parser.parse_statements()]
+        self.flat.statements = self.flat.add_list(rows)
+        return self.flat
+
+    def lower(self, node):
+        if node is None:
+            return NONE
+        return self.lowerings[type(node)](node)
+
+    def lower_list(self, nodes):
+        return self.flat.add_list([self.lower(node) for node in nodes])
+
+    def lower_function_definition(self, node):
+        parameters = self.lower_list(node.parameters)
+        block = self.lower(node.block)
+        return self.flat.add(NodeKind.FUNCTION_DEFINITION, node.position, value=self.flat.constant(node.name),
+                             left=parameters, right=block)
+
+    def lower_block(self, node):
+        return self.flat.add(NodeKind.BLOCK, node.position, left=self.lower_list(node.statements))
+
+    def lower_lazy_block(self, node):
+        return self.lower_block(node.parse())
+
+    def lower_variable_declaration(self, node):
+        return self.flat.add(NodeKind.VARIABLE_DECLARATION, node.position, value=self.flat.constant(node.name),
+                             left=self.lower(node.value_expr))
+
+    def lower_function_call(self, node):
+        parent = self.lower(node.parent)
+        args = self.lower_list(node.args)
+        return self.flat.add(NodeKind.FUNCTION_CALL, node.position, value=self.flat.constant(node.name),
+                             left=args, right=parent)
+
+    def lower_assignment(self, node):
+        return self.flat.add(NodeKind.ASSIGNMENT, node.position, value=self.flat.constant(node.name),
+                             left=self.lower(node.value_expr))
+
+    def lower_identifier(self, node):
+        return self.flat.add(NodeKind.IDENTIFIER, node.position, value=self.flat.constant(node.name),
+                             right=self.lower(node.parent))
+
+    def lower_binary_operation(self, node):
+        left = self.lower(node.left)
+        right = self.lower(node.right)
+        return self.flat.add(NodeKind.BINARY_OPERATION, node.position, operator=OPERATOR_CODES[node.operator],
+                             left=left, right=right)
+
+    def lower_unary_operation(self, node):
+        return self.flat.add(NodeKind.UNARY_OPERATION, node.position, operator=OPERATOR_CODES[node.operator],
+                             right=self.lower(node.right))
+
+    def lower_literal(self, node):
+        return self.flat.add(LITERAL_KINDS[type(node)], node.position, value=self.flat.constant(node.value))
+
+    def lower_return_statement(self, node):
+        return self.flat.add(NodeKind.RETURN_STATEMENT, node.position, left=self.lower(node.value_expr))
+
+    def lower_if_statement(self, node):
+        condition = self.lower(node.condition)
+        return self.flat.add(NodeKind.IF_STATEMENT, node.position, left=condition, right=self.lower(node.block))
+
+    def lower_while_statement(self, node):
+        condition = self.lower(node.condition)
+        return self.flat.add(NodeKind.WHILE_STATEMENT, node.position, left=condition, right=self.lower(node.block))
+
+    def lower_foreach_statement(self, node):
+        iterable = self.lower(node.iterable)
+        return self.flat.add(NodeKind.FOREACH_STATEMENT, node.position, value=self.flat.constant(node.variable),
+                             left=iterable, right=self.lower(node.block))
+
+
+def lower_program(program):
+    return Lowering().lower_program(program)
+
+
+def parse_flat(parser):
+    return Lowering().lower_statements(parser)
@@ -0,0 +1,132 @@
+from bisect import bisect_left
+
+from lexer.lexer import CharacterReader, Lexer, LineIndex, SourcePosition
+from parser.models import Program, Statement, slot_names
+from parser.parser import Parser
+
+
+class SegmentLines:
+    # positions inside one top-level statement count from where it starts, so moving the statement after an
+    # edit earlier in the source only moves start
+    __slots__ = ('lines', 'start')
+
+    def __init__(self, lines, start):
+        self.lines = lines
+        self.start = start
+
+    def line_of(self, offset):
+        return self.lines.line_of(self.start + offset)
+
+    def column_of(self, offset):
+        return self.lines.column_of(self.start + offset)
+
+
+def common_prefix(a, b):
+    # binary search over slice comparisons, which run in C; only the undecided range is compared
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix(a, b, limit):
+    low, high = 0, min(len(a), len(b), limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def rebase(statement, lines):
+    # moves the positions of a statement parsed from the whole source onto its own SegmentLines;
+    # nodes built from the same token share a position, which must move only once
+    moved = set()
+    stack = [statement]
+    while stack:
+        node = stack.pop()
+        for name in slot_names(type(node)):
+            value = getattr(node, name)
+            if isinstance(value, SourcePosition):
+                if id(value) not in moved:
+                    moved.add(id(value))
+                    value.offset -= lines.start
+                    value.lines = lines
+            elif isinstance(value, Statement):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(item for item in value if isinstance(item, Statement))
+
+
+class IncrementalParser:
+    # the parsed program of a source that changes as a whole, e.g. a file saved from an editor; update()
+    # reparses only the top-level statements that the change touches and keeps the others
+    def __init__(self, source=''):
+        self.source = ''
+        self.lines = LineIndex()
+        self.statements = []
+        self.segment_lines = []
+        self.program = Program(self.statements)
+        self.reparsed = 0
+        self.update(source)
+
+    def update(self, source):
+        # returns the program for the new source; on a syntax error the previous source and program are kept
+        old_source = self.source
+        if source == old_source and self.statements:
+            self.reparsed = 0
+            return self.program
+        prefix = common_prefix(old_source, source)
+        suffix = common_suffix(old_source, source, min(len(old_source), len(source)) - prefix)
+        delta = len(source) - len(old_source)
+        edit_end = len(source) - suffix
+
+        # restart at the last statement that begins strictly before the change: a change right at the start
+        # of a statement may just as well extend the one before it
+        starts = [lines.start for lines in self.segment_lines]
+        first = max(bisect_left(starts, prefix) - 1, 0)
+        offset = starts[first] if starts and starts[first] < prefix else 0
+
+        self.lines.reset(source)
+        reparsed = []
+        resync = len(self.statements)
+        try:
+            parser = Parser(Lexer(CharacterReader.from_string(source, offset, self.lines)))
+            statements = parser.parse_statements()
+            while True:
+                start = parser.token.offset
+                # past the change, a statement that started at the same place before the edit is unchanged,
+                # and so is everything after it
+                if start >= edit_end:
+                    index = bisect_left(starts, start - delta)
+                    if index < len(starts) and starts[index] == start - delta:
+                        resync = index
+                        break
+                if (statement := next(statements, None)) is None:
+                    break
+                reparsed.append((start, statement))
+        except Exception as error:
+            if isinstance(getattr(error, 'position', None), SourcePosition):
+                error.position = self.lines.position(error.position.offset)
+            self.lines.reset(old_source)
+            raise
+
+        segment_lines = []
+        for start, statement in reparsed:
+            lines = SegmentLines(self.lines, start)
+            rebase(statement, lines)
+            segment_lines.append(lines)
+        if delta:
+            for lines in self.segment_lines[resync:]:
+                lines.start += delta
+        self.statements[first:resync] = [statement for _, statement in reparsed]
+        self.segment_lines[first:resync] = segment_lines
+        self.source = source
+        self.reparsed = len(reparsed)
+        return self.program
@@ -0,0 +1,154 @@
+import gc
+from array import array
+
+from lexer.lexer import SourcePosition
+from parser.models import Block
+from parser.parser import MAX_RECURSIVE_DEPTH
+from parser.walk import is_node, child_names, children, rewrite
+
+NO_OFFSET = -1
+
+
+def expressions(statement):
+    # every expression node below a statement, preorder, without descending into its blocks; the offsets
+    # in ExpressionTable.offsets follow this order
+    stack = [value for value in reversed(children(statement)) if type(value) is not Block]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children(node)))
+
+
+class ExpressionPosition:
+    # the position of an interned expression; it may occur in many places, and the statement that was
+    # running when something went wrong tells which one (see ExpressionTable.locate)
+    __slots__ = ('table', 'node', 'first')
+
+    def __init__(self, table, node, first):
+        self.table = table
+        self.node = node
+        self.first = first
+
+    @property
+    def line(self):
+        return self.first.line
+
+    @property
+    def column(self):
+        return self.first.column
+
+    def locate(self, statement):
+        return self.table.locate(statement, self) or self.first
+
+    def __str__(self):
+        return str(self.first)
+
+
+class ExpressionTable:
+    # hash-consing of expression subtrees: structurally equal expressions, whatever their positions, become
+    # one node, so the canonical node (position.node, also for the copies the resolver makes) is a stable key
+    # for anything cached per expression. Statements are not shared; the source offsets of each one's
+    # expressions go into one side table instead of position objects
+    def __init__(self):
+        self.expressions = {}
+        self.offsets = array('q')
+        self.statement_offsets = {}
+        self.lines = None
+        self.occurrences = 0
+
+    def __len__(self):
+        return len(self.expressions)
+
+    def intern_program(self, program):
+        # the collector would otherwise run over the whole tree every few hundred keys
+        gc.disable()
+        try:
+            self.intern_statements(program.statements)
+        finally:
+            gc.enable()
+        return program
+
+    def intern_statements(self, statements):
+        stack = [statements]
+        while stack:
+            for statement in stack.pop():
+                self.record_offsets(statement)
+                for name in child_names(type(statement)):
+                    value = getattr(statement, name)
+                    if type(value) is Block:
+                        stack.append(value.statements)
+                    elif type(value) is list:
+                        setattr(statement, name, [self.intern(item) if is_node(type(item)) else item
+                                                  for item in value])
+                    elif is_node(type(value)):
+                        setattr(statement, name, self.intern(value))
+
+    def record_offsets(self, statement):
+        start = len(self.offsets)
+        for node in expressions(statement):
+            position = node.position
+            if isinstance(position, SourcePosition):
+                self.lines = position.lines
+                self.offsets.append(position.offset)
+            else:
+                self.offsets.append(NO_OFFSET)
+        if len(self.offsets) > start:
+            self.statement_offsets[id(statement)] = start
+
+    def locate(self, statement, position):
+        # the source position of the first expression in statement with this ExpressionPosition, if there is
+        # one; copies of the interned node that interpreter.resolver puts in its place share it
+        start = self.statement_offsets.get(id(statement))
+        if start is None:
+            return None
+        for index, expression in enumerate(expressions(statement), start):
+            if expression.position is position:
+                return SourcePosition(self.offsets[index], self.lines) if self.offsets[index] != NO_OFFSET else None
+        return None
+
+    def release_keys(self):
+        # the structural keys are only needed to intern more code into the same table
+        self.expressions.clear()
+
+    def intern(self, node, depth=0):
+        # returns the canonical node for node's subtree, interning its children first
+        if depth >= MAX_RECURSIVE_DEPTH:
+            return self.intern_on_stack(node)
+        key = [type(node)]
+        for name in child_names(type(node)):
+            value = getattr(node, name)
+            if type(value) is list:
+                value = tuple([self.intern(item, depth + 1) if is_node(type(item)) else item for item in value])
+                setattr(node, name, list(value))
+            elif is_node(type(value)):
+                value = self.intern(value, depth + 1)
+                setattr(node, name, value)
+            key.append(value)
+        return self.canonical(tuple(key), node)
+
+    def intern_on_stack(self, root):
+        # the same for expressions nested deeper than the Python stack allows
+        return rewrite(root, self.intern_node)
+
+    def intern_node(self, node):
+        # node's children are canonical already
+        key = [type(node)]
+        for name in child_names(type(node)):
+            value = getattr(node, name)
+            key.append(tuple(value) if type(value) is list else value)
+        return self.canonical(tuple(key), node)
+
+    def canonical(self, key, node):
+        self.occurrences += 1
+        if (canonical := self.expressions.get(key)) is None:
+            canonical = self.expressions[key] = node
+            if node.position is not None:
+                node.position = ExpressionPosition(self, node, node.position)
+        return canonical
+
+
+def intern_program(program):
+    table = ExpressionTable()
+    table.intern_program(program)
+    table.release_keys()
+    return program
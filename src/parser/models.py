@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from functools import cache
 
 
 # class Node:
@@ -26,26 +27,47 @@ class Program:
         visitor.visit_program(self)
 
 
+@cache
+def slot_names(cls):
+    return tuple(name for base in reversed(cls.__mro__) for name in base.__dict__.get('__slots__', ()))
+
+
 class Statement(ABC):
+    __slots__ = ('position',)
+
     def __init__(self, position):
         self.position = position
 
+    def __getstate__(self):
+        # slot values in declaration order, so pickled programs (parser/cache.py) carry no field names
+        return tuple(getattr(self, name) for name in slot_names(type(self)))
+
+    def __setstate__(self, state):
+        for name, value in zip(slot_names(type(self)), state):
+            setattr(self, name, value)
+
     def accept(self, visitor):
         pass
 
 
 class FunctionDefinition(Statement):
+    # frame_size and the depth/slot fields below are filled in by interpreter.resolver
+    __slots__ = ('name', 'parameters', 'block', 'frame_size')
+
     def __init__(self, name, parameters, block, position):
         super().__init__(position)
         self.name = name
         self.parameters = parameters
         self.block = block
+        self.frame_size = None
 
     def accept(self, visitor):
         visitor.visit_function_definition(self)
 
 
 class Block(Statement):
+    __slots__ = ('statements',)
+
     def __init__(self, statements):
         super().__init__(None)
         self.statements = statements
@@ -55,16 +77,22 @@ class Block(Statement):
 
 
 class VariableDeclaration(Statement):
+    __slots__ = ('name', 'value_expr', 'depth', 'slot')
+
     def __init__(self, name, value_expr, position):
         super().__init__(position)
         self.name = name
         self.value_expr = value_expr
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         visitor.visit_variable_declaration(self)
 
 
 class FunctionCall(Statement):
+    __slots__ = ('name', 'args', 'parent')
+
     def __init__(self, name, args, position, parent):
         super().__init__(position)
         self.name = name
@@ -76,26 +104,37 @@ class FunctionCall(Statement):
 
 
 class Assignment(Statement):
+    __slots__ = ('name', 'value_expr', 'depth', 'slot')
+
     def __init__(self, name, value_expr, position):
         super().__init__(position)
         self.name = name
         self.value_expr = value_expr
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         visitor.visit_assignment(self)
 
 
 class Identifier(Statement):
+    __slots__ = ('name', 'parent', 'depth', 'slot', 'global_slot')
+
     def __init__(self, name, position, parent):
         super().__init__(position)
         self.name = name
         self.parent = parent
+        self.depth = None
+        self.slot = None
+        self.global_slot = None
 
     def accept(self, visitor):
         visitor.visit_identifier(self)
 
 
 class BinaryOperation(Statement):
+    __slots__ = ('operator', 'left', 'right')
+
     def __init__(self, operator, left, right, position):
         super().__init__(position)
         self.operator = operator
@@ -106,7 +145,22 @@ class BinaryOperation(Statement):
         visitor.visit_binary_operation(self)
 
 
+class SpecializedBinaryOperation(BinaryOperation):
+    # a binary operation on operands whose types interpreter.specialization proved ahead of running;
+    # operation is the Python function that does it without any of the runtime's type checks
+    __slots__ = ('operation',)
+
+    def __init__(self, operator, left, right, position, operation):
+        super().__init__(operator, left, right, position)
+        self.operation = operation
+
+    def accept(self, visitor):
+        visitor.visit_specialized_binary_operation(self)
+
+
 class UnaryOperation(Statement):
+    __slots__ = ('operator', 'right')
+
     def __init__(self, operator, right, position):
         super().__init__(position)
         self.operator = operator
@@ -117,12 +171,16 @@ class UnaryOperation(Statement):
 
 
 class Literal(Statement):
+    __slots__ = ('value',)
+
     def __init__(self, value, position):
         super().__init__(position)
         self.value = value
 
 
 class IntLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, value, position):
         super().__init__(value, position)
 
@@ -131,6 +189,8 @@ class IntLiteral(Literal):
 
 
 class FloatLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, value, position):
         super().__init__(value, position)
 
@@ -139,6 +199,8 @@ class FloatLiteral(Literal):
 
 
 class BoolLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, value, position):
         super().__init__(value, position)
 
@@ -147,6 +209,8 @@ class BoolLiteral(Literal):
 
 
 class StringLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, value, position):
         super().__init__(value, position)
 
@@ -155,6 +219,8 @@ class StringLiteral(Literal):
 
 
 class NullLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, value, position):
         super().__init__(value, position)
 
@@ -163,6 +229,8 @@ class NullLiteral(Literal):
 
 
 class ReturnStatement(Statement):
+    __slots__ = ('value_expr',)
+
     def __init__(self, value_expr, position):
         super().__init__(position)
         self.value_expr = value_expr
@@ -172,6 +240,8 @@ class ReturnStatement(Statement):
 
 
 class IfStatement(Statement):
+    __slots__ = ('condition', 'block')
+
     def __init__(self, condition, block, position):
         super().__init__(position)
         self.condition = condition
@@ -182,6 +252,8 @@ class IfStatement(Statement):
 
 
 class WhileStatement(Statement):
+    __slots__ = ('condition', 'block')
+
     def __init__(self, condition, block, position):
         super().__init__(position)
         self.condition = condition
@@ -192,11 +264,16 @@ class WhileStatement(Statement):
 
 
 class ForeachStatement(Statement):
+    __slots__ = ('variable', 'iterable', 'block', 'depth', 'slot', 'global_slot')
+
     def __init__(self, variable, iterable, block, position):
         super().__init__(position)
         self.variable = variable
         self.iterable = iterable
         self.block = block
+        self.depth = None
+        self.slot = None
+        self.global_slot = None
 
     def accept(self, visitor):
         visitor.visit_foreach_statement(self)
@@ -247,6 +324,10 @@ class Visitor(ABC):
     def visit_binary_operation(self, node):
         pass
 
+    def visit_specialized_binary_operation(self, node):
+        # a visitor that has no use for the proven types takes it as any other binary operation
+        self.visit_binary_operation(node)
+
     @abstractmethod
     def visit_unary_operation(self, node):
         pass
@@ -0,0 +1,88 @@
+import gc
+import os
+import pickle
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer.lexer import CharacterReader, Lexer, LineIndex
+from parser.models import Program
+from parser.parser import Parser
+
+# what the pre-scan has to see: strings and comments (to skip them), braces, and the function keyword
+BOUNDARY_PATTERN = re.compile(r'"(?:[^"\\\n]|\\.)*"?|#[^\n]*|[{}]|(?<!\w)function(?!\w)')
+
+CHUNKS_PER_WORKER = 4
+
+
+def function_boundaries(text):
+    # offsets of the `function` keywords at brace depth 0; a cheap scan, not a lexer, so a source it
+    # gets wrong is one that does not parse anyway
+    boundaries = []
+    depth = 0
+    for match in BOUNDARY_PATTERN.finditer(text):
+        lexeme = match.group()
+        if lexeme == '{':
+            depth += 1
+        elif lexeme == '}':
+            depth -= 1
+        elif lexeme == 'function' and depth == 0:
+            boundaries.append(match.start())
+    return boundaries
+
+
+def split_source(text, pieces):
+    # cuts at function boundaries into at most `pieces` runs of roughly equal length
+    boundaries = function_boundaries(text)
+    starts = [0]
+    target = len(text) / pieces
+    for boundary in boundaries:
+        if boundary - starts[-1] >= target:
+            starts.append(boundary)
+    ends = starts[1:] + [len(text)]
+    return [(start, text[start:end]) for start, end in zip(starts, ends)]
+
+
+def parse_chunk(start, text):
+    # runs in a worker; positions come back as offsets and are tied to the whole source by the caller
+    lines = LineIndex()
+    reader = CharacterReader.from_string(text, lines=lines, source_offset=start)
+    try:
+        statements = list(Parser(Lexer(reader)).parse_statements())
+    except Exception:
+        return None
+    lines.line_starts = []
+    # pickled here rather than by the pool, so that the caller can unpickle with the collector paused
+    return pickle.dumps((statements, lines), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def parse_serial(text):
+    return Parser(Lexer(CharacterReader.from_string(text))).parse_program()
+
+
+def parse_parallel(text, workers=None):
+    # parses the chunks between top-level function definitions in separate processes; if any chunk fails,
+    # the whole source is parsed serially so that the error is the one the serial parser reports
+    workers = workers or os.cpu_count()
+    chunks = split_source(text, workers * CHUNKS_PER_WORKER) if '\x03' not in text else []
+    if workers < 2 or len(chunks) < 2:
+        return parse_serial(text)
+
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(parse_chunk, *zip(*chunks)))
+    if None in results:
+        return parse_serial(text)
+
+    lines = LineIndex()
+    lines.reset(text)
+    lines.scan_pending()
+    statements = []
+    gc.disable()
+    try:
+        results = [pickle.loads(result) for result in results]
+    finally:
+        gc.enable()
+    for chunk_statements, chunk_lines in results:
+        # every position of the chunk refers to chunk_lines, so this one assignment fixes them all
+        chunk_lines.line_starts = lines.line_starts
+        statements.extend(chunk_statements)
+    return Program(statements)
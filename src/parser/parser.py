@@ -6,10 +6,14 @@ from errors.parser_errors import ExpectedFunctionNameError, ParserError, Expecte
     ExpectedArgumentAfterCommaError, ExpectedRightParentAfterExpression, ExpectedIdentifierAfterDotError, \
     UnexpectedTokenError
 from enum import Enum, auto
+from functools import wraps
 from parser.models import *
 
 
 class Operators(Enum):
+    # members are singletons compared by identity; skips Enum's hash of the member name
+    __hash__ = object.__hash__
+
     OR_OPERATOR = auto()
     AND_OPERATOR = auto()
     EQUALS = auto()
@@ -41,11 +45,104 @@ OPERATORS = {
     TokenType.NEG: Operators.NEG,
 }
 
+# higher binds tighter, following the precedence table in README.md
+BINDING_POWERS = {
+    Operators.OR_OPERATOR: 1,
+    Operators.AND_OPERATOR: 2,
+    Operators.EQUALS: 3,
+    Operators.NOT_EQUALS: 3,
+    Operators.LESS: 4,
+    Operators.GREATER: 4,
+    Operators.LESS_THAN_OR_EQUAL: 4,
+    Operators.GREATER_THAN_OR_EQUAL: 4,
+    Operators.ADD_OPERATOR: 5,
+    Operators.MINUS_OPERATOR: 5,
+    Operators.MULT_OPERATOR: 6,
+    Operators.DIV_OPERATOR: 6,
+}
+
+MAX_BINDING_POWER = max(BINDING_POWERS.values())
+
+# nesting of blocks, parentheses and call arguments parsed on the Python stack; deeper than this the
+# parser goes on with the deep_parse_* generators and an explicit stack (see run_on_stack)
+MAX_RECURSIVE_DEPTH = 40
+
+# a == b == c is not an expression
+NON_ASSOCIATIVE = {Operators.EQUALS, Operators.NOT_EQUALS}
+
+BINARY_OPERATORS = {
+    token_type: (operator, BINDING_POWERS[operator])
+    for token_type, operator in OPERATORS.items() if operator in BINDING_POWERS
+}
+
+UNARY_OPERATORS = {
+    TokenType.MINUS_OPERATOR: Operators.MINUS_OPERATOR,
+    TokenType.NEG: Operators.NEG,
+}
+
+LITERALS = {
+    TokenType.INT_CONST: IntLiteral,
+    TokenType.FLOAT_CONST: FloatLiteral,
+    TokenType.TRUE_CONST: BoolLiteral,
+    TokenType.FALSE_CONST: BoolLiteral,
+    TokenType.NULL: NullLiteral,
+    TokenType.STRING: StringLiteral,
+}
+
+
+def nesting(parse):
+    # a rule that blocks, parentheses or call arguments nest through; past MAX_RECURSIVE_DEPTH of them its
+    # deep_parse_* generator goes on with an explicit stack
+    deep_name = 'deep_' + parse.__name__
+
+    @wraps(parse)
+    def nested(self, *args):
+        if self.depth >= MAX_RECURSIVE_DEPTH:
+            return self.run_on_stack(getattr(self, deep_name)(*args))
+        self.depth += 1
+        try:
+            return parse(self, *args)
+        finally:
+            self.depth -= 1
+    return nested
+
+
+class LazyBlock:
+    # a function body that was only brace-matched; parse() builds the Block from the source text on demand
+    __slots__ = ('source', 'offset', 'lines')
+
+    def __init__(self, source, offset, lines):
+        self.source = source
+        self.offset = offset
+        self.lines = lines
+
+    def parse(self):
+        return Parser(Lexer(CharacterReader.from_string(self.source, self.offset, self.lines))).parse_block()
+
 
 class Parser:
-    def __init__(self, lexer):
-        self.lexer = lexer
-        self.token = self.lexer.get_next_token()
+    def __init__(self, tokens, lazy_source=None):
+        # tokens is a Lexer or any iterable of tokens ending with ETX, e.g. a replayed list.
+        # with lazy_source, the text the tokens come from, function bodies are skipped and left as LazyBlocks
+        self.tokens = iter(tokens.tokens() if isinstance(tokens, Lexer) else tokens)
+        self.lazy_source = lazy_source
+        self.token = None
+        self.depth = 0
+        # statements are recognized by their leading token
+        self.block_statement_parsers = {
+            TokenType.VALUE: self.parse_variable_declaration,
+            TokenType.IF: self.parse_if_statement,
+            TokenType.WHILE: self.parse_while_statement,
+            TokenType.FOREACH: self.parse_foreach_statement,
+            TokenType.RETURN: self.parse_return_statement,
+            TokenType.IDENTIFIER: self.parse_assignment_or_function_call,
+        }
+        self.statement_parsers = {TokenType.FUNCTION: self.parse_function_definition, **self.block_statement_parsers}
+        self.deep_block_statement_parsers = {
+            token_type: getattr(self, 'deep_' + parse.__name__)
+            for token_type, parse in self.block_statement_parsers.items()
+        }
+        self.advance()
 
     def maybe(self, expected_type):
         if self.token.type != expected_type:
@@ -62,31 +159,28 @@ class Parser:
         return value
 
     def parse_program(self):
-        statements = []
+        return Program(list(self.parse_statements()))
+
+    def parse_statements(self):
+        # top-level statements one at a time, for callers that use each one before the next is parsed
         while statement := self.parse_statement():
-            statements.append(statement)
+            yield statement
 
         self.must_be_(TokenType.ETX, UnexpectedTokenError(self.token.position))
-        return Program(statements)
 
     def parse_block_statement(self):
         # var_declaration | if | while | foreach |
         # identifier_or_call, [ "=" , expression ] | return ;
-        return (
-                self.parse_variable_declaration() or self.parse_if_statement()
-                or self.parse_while_statement() or self.parse_foreach_statement()
-                or self.parse_return_statement() or self.parse_assignment_or_function_call()
-        )
+        if parse := self.block_statement_parsers.get(self.token.type):
+            return parse()
+        return None
 
     def parse_statement(self):
         # function_definition | var_declaration | if | while | foreach |
         # identifier_or_call, [ "=" , expression ] | return ;
-        return (
-                self.parse_function_definition() or self.parse_variable_declaration() or
-                self.parse_if_statement() or self.parse_while_statement() or
-                self.parse_foreach_statement() or self.parse_return_statement() or
-                self.parse_assignment_or_function_call()
-        )
+        if parse := self.statement_parsers.get(self.token.type):
+            return parse()
+        return None
 
     def parse_function_definition(self):
         # function_definition = "function" , identifier , "(" , parameters , ")" , block ;
@@ -99,10 +193,26 @@ class Parser:
         parameters = self.parse_parameters()
         self.must_be_(TokenType.RIGHT_PARENT, ExpectedRightParentAfterFun(self.token.position))
         position = self.token.position
-        if block := self.parse_block():
+        if block := (self.skip_block() if self.lazy_source is not None else self.parse_block()):
             return FunctionDefinition(token.value, parameters, block, position)
         raise ExpectedBlockError(position)
 
+    def skip_block(self):
+        # brace-matches a block without parsing it; syntax errors inside wait until LazyBlock.parse()
+        start = self.token
+        if not self.maybe(TokenType.LEFT_BRACE):
+            return None
+        depth = 1
+        while depth:
+            if self.token.type == TokenType.ETX:
+                raise ExpectedRightBraceError(self.token.position)
+            if self.token.type == TokenType.LEFT_BRACE:
+                depth += 1
+            elif self.token.type == TokenType.RIGHT_BRACE:
+                depth -= 1
+            self.advance()
+        return LazyBlock(self.lazy_source, start.offset, start.lines)
+
     def parse_parameters(self):
         # parameters = [ identifier , { "," , identifier } ]
         params = []
@@ -122,6 +232,7 @@ class Parser:
             return Identifier(param.value, position, None)
         return None
 
+    @nesting
     def parse_block(self):
         # block = "{", {statement}, "}";
         position = self.token.position
@@ -213,6 +324,7 @@ class Parser:
 
         return FunctionCall(name, args, position, parent)
 
+    @nesting
     def parse_arguments(self):
         # args =  [ expression , { "," , expression } ] ;
         args = []
@@ -235,168 +347,307 @@ class Parser:
             return Assignment(expression_identifier, value_expr, position)
         raise ExpectedExpressionError(self.token.position)
 
-    def parse_expression(self):
-        return self.parse_logical_or()
-
-    def parse_logical_or(self):
-        # expression = conjuction, { logical_or , conjuction } ;
-        # position = self.token.position
-        if not (left_expr := self.parse_logical_and()):
+    def parse_expression(self, min_power=1):
+        # precedence climbing: operators at least as strong as min_power extend the left operand;
+        # all operators of one level share the position of the first of them, as in the grammar levels
+        if not (left_expr := self.parse_unary()):
             return None
-        position = self.token.position
-        while operator := self.maybe(TokenType.OR_OPERATOR):
-            # operator = self.token.value
+        if not (operator := BINARY_OPERATORS.get(self.token.type)) or operator[1] < min_power:
+            return left_expr
+        max_power = MAX_BINDING_POWER
+        positions = {}
+        while operator and min_power <= operator[1] <= max_power:
+            operator, power = operator
+            position = positions.setdefault(power, self.token.position)
+            self.advance()
+            if not (right_expr := self.parse_expression(power + 1)):
+                raise ExpectedExpressionError(self.token.position)
+            left_expr = BinaryOperation(operator, left_expr, right_expr, position)
+            # anything stronger left over after the right operand was refused by a non-associative operator
+            max_power = power - 1 if operator in NON_ASSOCIATIVE else power
+            operator = BINARY_OPERATORS.get(self.token.type)
+
+        return left_expr
 
-            if not (right_expr := self.parse_logical_and()):
+    def parse_unary(self):
+        # factor = ["!" | "-"], (number | string | bool | attr_method | "(", expression, ")");
+        token = self.token
+        if operator := UNARY_OPERATORS.get(token.type):
+            self.advance()
+            right = self.parse_primary()
+            if not right:
                 raise ExpectedExpressionError(self.token.position)
 
-            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr,
-                                        position)  # enumerator zamiast operator
+            return UnaryOperation(operator, right, token.position)
+        return self.parse_primary()
 
-        return left_expr
+    def parse_primary(self):
+        if self.token.type == TokenType.IDENTIFIER:
+            return self.parse_identifier_or_fun_call()
+        if self.token.type == TokenType.LEFT_PARENT:
+            return self.parse_parenthesized_expression()
+        return self.parse_literal()
 
-    def parse_logical_and(self):
-        #  conjuction = equality, { logical_and , equality} ;
-        if not (left_expr := self.parse_equality()):
-            return None
+    def parse_dot_chain(self, parent):
+        if self.token.type != TokenType.DOT:
+            return parent
         position = self.token.position
-        while operator := self.maybe(TokenType.AND_OPERATOR):
-            if not (right_expr := self.parse_equality()):
-                raise ExpectedExpressionError(self.token.position)
-            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+        while self.maybe(TokenType.DOT):
+            token = self.must_be_(TokenType.IDENTIFIER, ExpectedIdentifierAfterDotError(self.token.position))
+            if not (item := self.parse_function_call(token.value, position, parent)):
+                item = Identifier(token.value, position, parent)
+            parent = item
+        return parent
 
-        return left_expr
+    def parse_identifier_or_fun_call(self):
+        position = self.token.position
+        if not (token := self.maybe(TokenType.IDENTIFIER)):
+            return None
+
+        if not (item := self.parse_function_call(token.value, position, None)):
+            item = Identifier(token.value, position, None)
+
+        # while self.maybe(TokenType.DOT):
+        #     token = self.must_be_(TokenType.IDENTIFIER, f'Expected identifier or function call after "." {self.token.position}')
+        #     if not (item := self.parse_function_call(token.value, position, item)):
+        #         item = Identifier(token.value, position, item)
+
+        return self.parse_dot_chain(item)
+
+    # a.b.c
+    # c -> b -> a
 
-    def parse_equality(self):
-        if not (left_expr := self.parse_relational()):
+    def parse_literal(self):
+        token = self.token
+        if not (literal_class := LITERALS.get(token.type)):
             return None
+        self.advance()
+        literal = literal_class(token.value, token.position)
+        if literal_class is StringLiteral:
+            return self.parse_dot_chain(literal)
+        return literal
+
+    @nesting
+    def parse_parenthesized_expression(self):
         position = self.token.position
-        if operator := self.maybe(TokenType.EQUALS) or self.maybe(TokenType.NOT_EQUALS):
+        if not self.maybe(TokenType.LEFT_PARENT):
+            return None
+        if not (expression := self.parse_expression()):
+            raise ExpectedExpressionError(self.token.position)
+        self.must_be_(TokenType.RIGHT_PARENT, ExpectedRightParentAfterExpression(self.token.position))
+        return expression
 
-            if not (right_expr := self.parse_relational()):
-                raise ExpectedExpressionError(self.token.position)
-            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+    @staticmethod
+    def run_on_stack(parse):
+        # drives a deep_parse_* generator: each one yields the generator of a sub-parse it needs and is sent
+        # back its result, so nesting grows this list instead of the Python stack
+        stack = [parse]
+        result = None
+        while stack:
+            try:
+                sub_parse = stack[-1].send(result)
+            except StopIteration as finished:
+                stack.pop()
+                result = finished.value
+                continue
+            stack.append(sub_parse)
+            result = None
+        return result
+
+    # the deep_parse_* generators below are the parse_* methods above, with `yield` where those recurse;
+    # a change to a rule goes into both (test_deep_rules_parse_the_same compares them)
+
+    def deep_parse_block(self):
+        position = self.token.position
+        if not self.maybe(TokenType.LEFT_BRACE):
+            return None
+        statements = []
+        while statement := (yield self.deep_parse_block_statement()):
+            statements.append(statement)
+        self.must_be_(TokenType.RIGHT_BRACE, ExpectedRightBraceError(self.token.position))
+        return Block(statements)
 
-        return left_expr
+    def deep_parse_block_statement(self):
+        if parse := self.deep_block_statement_parsers.get(self.token.type):
+            return (yield parse())
+        return None
 
-    def parse_relational(self):
-        if not (left_expr := self.parse_additive()):
-            return None
+    def deep_parse_foreach_statement(self):
         position = self.token.position
-        while operator := self.maybe(TokenType.LESS) or \
-                          self.maybe(TokenType.GREATER) or \
-                          self.maybe(TokenType.LESS_THAN_OR_EQUAL) or \
-                          self.maybe(TokenType.GREATER_THAN_OR_EQUAL):
+        if not self.maybe(TokenType.FOREACH):
+            return None
+        loop_variable = self.must_be_(TokenType.IDENTIFIER, ExpectedLoopVariableError(self.token.position))
+        self.must_be_(TokenType.IN, ExpectedInError(self.token.position))
+        if not (iterable_expr := (yield self.deep_parse_expression())):
+            raise ExpectedExpressionError(self.token.position)
 
-            if not (right_expr := self.parse_additive()):
-                raise ExpectedExpressionError(self.token.position)
-            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+        if block := (yield self.deep_parse_block()):
+            return ForeachStatement(loop_variable.value, iterable_expr, block, position)
+        raise ExpectedBlockError(position)
 
-        return left_expr
+    def deep_parse_return_statement(self):
+        position = self.token.position
+        if not self.maybe(TokenType.RETURN):
+            return None
+        value_expr = yield self.deep_parse_expression()
+        return ReturnStatement(value_expr, position)
+
+    def deep_parse_if_statement(self):
+        position = self.token.position
+        if not self.maybe(TokenType.IF):
+            return None
+        if not (condition := (yield self.deep_parse_expression())):
+            raise ExpectedConditionError(self.token.position)
+        if block := (yield self.deep_parse_block()):
+            return IfStatement(condition, block, position)
+        raise ExpectedBlockError(position)
 
-    def parse_additive(self):
-        # additive_expression = term , { add_sub_operator , term } ;
-        if not (left_expr := self.parse_multiplicative()):
+    def deep_parse_while_statement(self):
+        position = self.token.position
+        if not self.maybe(TokenType.WHILE):
             return None
+        if not (condition := (yield self.deep_parse_expression())):
+            raise ExpectedConditionError(self.token.position)
+        if block := (yield self.deep_parse_block()):
+            return WhileStatement(condition, block, position)
+        raise ExpectedBlockError(position)
+
+    def deep_parse_variable_declaration(self):
         position = self.token.position
-        while operator := self.maybe(TokenType.ADD_OPERATOR) or \
-                          self.maybe(TokenType.MINUS_OPERATOR):
 
-            if not (right_expr := self.parse_multiplicative()):
-                raise ExpectedExpressionError(self.token.position)
-            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+        if not self.maybe(TokenType.VALUE):
+            return None
 
-        return left_expr
+        token = self.must_be_(TokenType.IDENTIFIER, ExpectedVariableNameError(self.token.position))
+        if self.maybe(TokenType.EQUAL):
+            if not (value_expr := (yield self.deep_parse_expression())):
+                raise SyntaxError(f'Expected expression in variable at {self.token.position}')
+        else:
+            value_expr = None
+        return VariableDeclaration(token.value, value_expr, position)
 
-    def parse_multiplicative(self):
-        # term = factor , { mul_div_operator , factor } ;
-        if not (left_expr := self.parse_unary()):
+    def deep_parse_assignment_or_function_call(self):
+        position = self.token.position
+        if not (token := self.maybe(TokenType.IDENTIFIER)):
+            return None
+        if fun_call := (yield self.deep_parse_function_call(token.value, position, None)):
+            return fun_call
+        if assignment := (yield self.deep_parse_assignment(token.value)):
+            return assignment
+
+        raise ExpectedAssignmentOrFunctionCall(self.token.position)
+
+    def deep_parse_function_call(self, name, position, parent):
+        if not self.maybe(TokenType.LEFT_PARENT):
             return None
+        args = yield self.deep_parse_arguments()
+        self.must_be_(TokenType.RIGHT_PARENT, ExpectedRightParentAfterFunCall(self.token.position))
+
+        return FunctionCall(name, args, position, parent)
+
+    def deep_parse_arguments(self):
+        args = []
+
+        if not (arg := (yield self.deep_parse_expression())):
+            return args
+        args.append(arg)
+        while self.maybe(TokenType.COMMA):
+            if not (arg := (yield self.deep_parse_expression())):
+                raise ExpectedArgumentAfterCommaError(self.token.position)
+            args.append(arg)
+        return args
+
+    def deep_parse_assignment(self, expression_identifier):
         position = self.token.position
-        while operator := self.maybe(TokenType.MULT_OPERATOR) or \
-                          self.maybe(TokenType.DIV_OPERATOR):
-            if not (right_expr := self.parse_unary()):
+        if not self.maybe(TokenType.EQUAL):
+            return None
+        if value_expr := (yield self.deep_parse_expression()):
+            return Assignment(expression_identifier, value_expr, position)
+        raise ExpectedExpressionError(self.token.position)
+
+    def deep_parse_expression(self, min_power=1):
+        if not (left_expr := (yield self.deep_parse_unary())):
+            return None
+        if not (operator := BINARY_OPERATORS.get(self.token.type)) or operator[1] < min_power:
+            return left_expr
+        max_power = MAX_BINDING_POWER
+        positions = {}
+        while operator and min_power <= operator[1] <= max_power:
+            operator, power = operator
+            position = positions.setdefault(power, self.token.position)
+            self.advance()
+            if not (right_expr := (yield self.deep_parse_expression(power + 1))):
                 raise ExpectedExpressionError(self.token.position)
-            left_expr = BinaryOperation(OPERATORS[operator.type], left_expr, right_expr, position)
+            left_expr = BinaryOperation(operator, left_expr, right_expr, position)
+            max_power = power - 1 if operator in NON_ASSOCIATIVE else power
+            operator = BINARY_OPERATORS.get(self.token.type)
 
         return left_expr
 
-    def parse_unary(self):
-        # factor = ["!" | "-"], (number | string | bool | attr_method | "(", expression, ")");
-        position = self.token.position
-        if operator := self.maybe(TokenType.MINUS_OPERATOR) or \
-                       self.maybe(TokenType.NEG):
-            right = self.parse_primary()
+    def deep_parse_unary(self):
+        token = self.token
+        if operator := UNARY_OPERATORS.get(token.type):
+            self.advance()
+            right = yield self.deep_parse_primary()
             if not right:
                 raise ExpectedExpressionError(self.token.position)
 
-            return UnaryOperation(OPERATORS[operator.type], right, position)
-        return self.parse_primary()
+            return UnaryOperation(operator, right, token.position)
+        return (yield self.deep_parse_primary())
 
-    def parse_primary(self):
-        return (
-            self.parse_identifier_or_fun_call() or self.parse_literal() or self.parse_parenthesized_expression()
-        )
+    def deep_parse_primary(self):
+        if self.token.type == TokenType.IDENTIFIER:
+            return (yield self.deep_parse_identifier_or_fun_call())
+        if self.token.type == TokenType.LEFT_PARENT:
+            return (yield self.deep_parse_parenthesized_expression())
+        return (yield self.deep_parse_literal())
 
-    def parse_dot_chain(self, parent):
+    def deep_parse_dot_chain(self, parent):
+        if self.token.type != TokenType.DOT:
+            return parent
         position = self.token.position
         while self.maybe(TokenType.DOT):
             token = self.must_be_(TokenType.IDENTIFIER, ExpectedIdentifierAfterDotError(self.token.position))
-            if not (item := self.parse_function_call(token.value, position, parent)):
+            if not (item := (yield self.deep_parse_function_call(token.value, position, parent))):
                 item = Identifier(token.value, position, parent)
             parent = item
         return parent
 
-    def parse_identifier_or_fun_call(self):
+    def deep_parse_identifier_or_fun_call(self):
         position = self.token.position
         if not (token := self.maybe(TokenType.IDENTIFIER)):
             return None
 
-        if not (item := self.parse_function_call(token.value, position, None)):
+        if not (item := (yield self.deep_parse_function_call(token.value, position, None))):
             item = Identifier(token.value, position, None)
 
-        # while self.maybe(TokenType.DOT):
-        #     token = self.must_be_(TokenType.IDENTIFIER, f'Expected identifier or function call after "." {self.token.position}')
-        #     if not (item := self.parse_function_call(token.value, position, item)):
-        #         item = Identifier(token.value, position, item)
-
-        return self.parse_dot_chain(item)
-
-    # a.b.c
-    # c -> b -> a
-
-    def parse_literal(self):
-        value = self.token.value
-        position = self.token.position
+        return (yield self.deep_parse_dot_chain(item))
 
-        if self.maybe(TokenType.INT_CONST):
-            return IntLiteral(value, position)
-        if self.maybe(TokenType.FLOAT_CONST):
-            return FloatLiteral(value, position)
-        if self.maybe(TokenType.TRUE_CONST):
-            return BoolLiteral(value, position)
-        if self.maybe(TokenType.FALSE_CONST):
-            return BoolLiteral(value, position)
-        if self.maybe(TokenType.NULL):
-            return NullLiteral(value, position)
-        if self.maybe(TokenType.STRING):
-            literal = StringLiteral(value, position)
-            return self.parse_dot_chain(literal)
-        return None
+    def deep_parse_literal(self):
+        token = self.token
+        if not (literal_class := LITERALS.get(token.type)):
+            return None
+        self.advance()
+        literal = literal_class(token.value, token.position)
+        if literal_class is StringLiteral:
+            return (yield self.deep_parse_dot_chain(literal))
+        return literal
 
-    def parse_parenthesized_expression(self):
+    def deep_parse_parenthesized_expression(self):
         position = self.token.position
         if not self.maybe(TokenType.LEFT_PARENT):
             return None
-        if not (expression := self.parse_expression()):
+        if not (expression := (yield self.deep_parse_expression())):
             raise ExpectedExpressionError(self.token.position)
         self.must_be_(TokenType.RIGHT_PARENT, ExpectedRightParentAfterExpression(self.token.position))
         return expression
 
     def advance(self):
-        self.token = self.lexer.get_next_token()
-        if self.token.type == TokenType.COMMENT:
-            self.advance()
+        # COMMENT tokens only come from replayed get_next_token() streams
+        for token in self.tokens:
+            if token.type != TokenType.COMMENT:
+                self.token = token
+                return
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+from copy import copy
+from functools import cache
+
+from parser.models import Statement, slot_names
+
+
+@cache
+def is_node(cls):
+    # isinstance() against the Statement ABC is slow enough to dominate a walk over the whole tree
+    return issubclass(cls, Statement)
+
+
+@cache
+def child_names(cls):
+    return tuple(name for name in slot_names(cls) if name != 'position')
+
+
+def children(node):
+    # child nodes in a fixed order, flattening argument lists
+    result = []
+    for name in child_names(type(node)):
+        value = getattr(node, name)
+        if type(value) is list:
+            result.extend(item for item in value if is_node(type(item)))
+        elif is_node(type(value)):
+            result.append(value)
+    return result
+
+
+def rewrite(root, rewrite_node):
+    # post-order on an explicit stack, so any depth works: each node's children are replaced by what
+    # rewrite_node returned for them, then rewrite_node(node) gives what replaces the node itself
+    stack = [(root, False)]
+    rewritten = []
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children(node)))
+            continue
+        count = len(children(node))
+        replace_children(node, rewritten[len(rewritten) - count:])
+        del rewritten[len(rewritten) - count:]
+        rewritten.append(rewrite_node(node))
+    return rewritten[0]
+
+
+def rewrite_shared(root, rewrite_node, copies):
+    # the same for trees whose nodes may occur in many places (parser.interning), which are never changed:
+    # a node whose children are replaced becomes a copy with the new children. copies keeps the copy made
+    # for each node and set of children, so equal rewrites still give one node
+    stack = [(root, False)]
+    rewritten = []
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children(node)))
+            continue
+        old_children = children(node)
+        new_children = rewritten[len(rewritten) - len(old_children):]
+        del rewritten[len(rewritten) - len(old_children):]
+        if any(new is not old for new, old in zip(new_children, old_children)):
+            key = (node, *new_children)
+            if (replaced := copies.get(key)) is None:
+                replaced = copies[key] = copy(node)
+                replace_children(replaced, new_children)
+            node = replaced
+        rewritten.append(rewrite_node(node))
+    return rewritten[0]
+
+
+def replace_children(node, replacements):
+    # replacements in the order of children(node)
+    replacements = iter(replacements)
+    for name in child_names(type(node)):
+        value = getattr(node, name)
+        if type(value) is list:
+            setattr(node, name, [next(replacements) if is_node(type(item)) else item for item in value])
+        elif is_node(type(value)):
+            setattr(node, name, next(replacements))
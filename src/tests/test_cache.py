@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from lexer.lexer import CharacterReader, Lexer, MmapSource
+from parser import cache as cache_module
+from parser.cache import ProgramCache, source_digest, default_cache_dir
+from parser.models import FunctionCall, BinaryOperation
+from parser.parser import Parser
+
+
+class TestProgramCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.directory.name, 'script.xd')
+        self.write_source("value x = 2\nprint(x * 3)")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_source(self, code):
+        with open(self.source_path, 'w') as file:
+            file.write(code)
+
+    def parse(self):
+        with open(self.source_path, 'rb') as file:
+            source = MmapSource(file)
+            try:
+                return source_digest(source), Parser(Lexer(CharacterReader(source))).parse_program()
+            finally:
+                source.close()
+
+    def test_store_and_load_next_to_source(self):
+        cache = ProgramCache()
+        digest, program = self.parse()
+        self.assertTrue(cache.store(self.source_path, digest, program))
+        self.assertTrue(os.path.isfile(os.path.join(self.directory.name, 'script.xdc')))
+        loaded = cache.load(self.source_path, digest)
+        call = loaded.statements[1]
+        self.assertIsInstance(call, FunctionCall)
+        self.assertIsInstance(call.args[0], BinaryOperation)
+        self.assertEqual((call.args[0].position.line, call.args[0].position.column), (2, 9))
+
+    def test_cache_dir(self):
+        cache = ProgramCache(os.path.join(self.directory.name, 'cache'))
+        digest, program = self.parse()
+        cache.store(self.source_path, digest, program)
+        self.assertEqual(len(os.listdir(cache.cache_dir)), 1)
+        self.assertIsNotNone(cache.load(self.source_path, digest))
+
+    def test_default_cache_dir(self):
+        with unittest.mock.patch.dict(os.environ, {'XDG_CACHE_HOME': self.directory.name}):
+            self.assertEqual(default_cache_dir(), os.path.join(self.directory.name, 'xd'))
+        with unittest.mock.patch.dict(os.environ, {'XDG_CACHE_HOME': '', 'HOME': self.directory.name}):
+            self.assertEqual(default_cache_dir(), os.path.join(self.directory.name, '.cache', 'xd'))
+
+    def test_stale_source(self):
+        cache = ProgramCache()
+        digest, program = self.parse()
+        cache.store(self.source_path, digest, program)
+        self.write_source("print(1)")
+        new_digest, _ = self.parse()
+        self.assertIsNone(cache.load(self.source_path, new_digest))
+
+    def test_stale_interpreter_version(self):
+        cache = ProgramCache()
+        digest, program = self.parse()
+        cache.store(self.source_path, digest, program)
+        version = cache_module.INTERPRETER_VERSION
+        cache_module.INTERPRETER_VERSION = version + '-next'
+        try:
+            self.assertIsNone(cache.load(self.source_path, digest))
+        finally:
+            cache_module.INTERPRETER_VERSION = version
+
+    def test_corrupt_entries(self):
+        cache = ProgramCache()
+        digest, program = self.parse()
+        cache.store(self.source_path, digest, program)
+        path = cache.path_for(self.source_path, digest)
+        with open(path, 'rb') as file:
+            data = file.read()
+        for broken in (data[:-1], data[:10], data[:-5] + bytes(5), b''):
+            with open(path, 'wb') as file:
+                file.write(broken)
+            self.assertIsNone(cache.load(self.source_path, digest))
+
+    def test_only_program_classes_load(self):
+        # a crafted entry with a valid header and checksum must not run anything
+        cache = ProgramCache()
+        digest, program = self.parse()
+        for payload in (os.system, ('echo', print), [FunctionCall, cache_module.ProgramCache]):
+            with open(cache.path_for(self.source_path, digest), 'wb') as file:
+                file.write(cache.encode(payload, digest))
+            self.assertIsNone(cache.load(self.source_path, digest))
+
+    def test_empty_source(self):
+        self.write_source("")
+        cache = ProgramCache()
+        digest, program = self.parse()
+        cache.store(self.source_path, digest, program)
+        self.assertEqual(cache.load(self.source_path, digest).statements, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from errors.interpreter_errors import UndefinedVarError, RecursionLimitError, UnexpectedAttributeError
+from interpreter.closures import ClosureInterpreter
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.interning import intern_program
+from parser.parser import Parser
+from tests import test_interpreter, test_interpreter_integration
+
+
+def parse(code):
+    return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+
+def run(engine, program):
+    f = io.StringIO()
+    with redirect_stdout(f):
+        engine(program).interpret()
+    return f.getvalue().strip()
+
+
+class TestClosureInterpreterMethods(test_interpreter.TestInterpreter):
+    def setUp(self):
+        super().setUp()
+        self.interpreter = ClosureInterpreter(None)
+        self.interpreter.env = self.env
+
+
+class TestClosureInterpreter(test_interpreter_integration.TestInterpreter):
+    @staticmethod
+    def interpret_code(code):
+        return run(ClosureInterpreter, parse(code))
+
+    @staticmethod
+    def stream_code(code):
+        f = io.StringIO()
+        with redirect_stdout(f):
+            ClosureInterpreter(None).interpret_stream(Parser(Lexer(CharacterReader.from_string(code))))
+        return f.getvalue().strip()
+
+    @staticmethod
+    def lazy_code(code):
+        program = Parser(Lexer(CharacterReader.from_string(code)), lazy_source=code).parse_program()
+        return run(ClosureInterpreter, program)
+
+    def test_function_compiled_once(self):
+        code = 'function f(a) { return a + 1 }\nprint(f(1), f(2))'
+        interpreter = ClosureInterpreter(parse(code))
+        with redirect_stdout(io.StringIO()):
+            interpreter.interpret()
+        body = interpreter.functions['f'].body
+        with redirect_stdout(io.StringIO()):
+            interpreter.program = parse('print(f(3))')
+            interpreter.interpret()
+        self.assertIs(interpreter.functions['f'].body, body)
+
+    def test_error_positions(self):
+        with self.assertRaises(UndefinedVarError) as context:
+            self.interpret_code('function f(a) {\n    return a + missing\n}\nprint(f(1))')
+        self.assertEqual((context.exception.position.line, context.exception.position.column), (2, 16))
+
+    def test_interned_error_position(self):
+        # both `b.length` are one node after interning; the second fails, on line 4
+        program = intern_program(parse('value b = "x"\nprint(b.length)\nb = 5\nprint(b.length)'))
+        with self.assertRaises(UnexpectedAttributeError) as context:
+            run(ClosureInterpreter, program)
+        self.assertEqual(context.exception.position.line, 4)
+
+    def test_while_iteration_limit(self):
+        with self.assertRaises(RecursionLimitError):
+            self.interpret_code('value i = 0\nwhile i < 81 { i = i + 1 }')
+
+    def test_function_without_return(self):
+        code = """
+        function five() { return 5 }
+        function last() { value a = five() }
+        function cleared() {
+            five()
+            print("x")
+        }
+        print(last(), cleared())
+        """
+        self.assertEqual(self.interpret_code(code), run(Interpreter, parse(code)))
+
+
+if __name__ == '__main__':
+    unittest.main()
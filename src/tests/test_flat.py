@@ -0,0 +1,94 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from errors.interpreter_errors import UndefinedVarError, TypeUnaryError, DuplicateVarDeclarationError
+from errors.parser_errors import UnexpectedTokenError
+from interpreter.flat_interpreter import FlatInterpreter
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.flat import lower_program, parse_flat, NodeKind, NONE
+from parser.parser import Parser, Operators
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples_code')
+
+
+class TestFlatProgram(unittest.TestCase):
+    @staticmethod
+    def parse(code):
+        return Parser(Lexer(CharacterReader(StringIO(code)))).parse_program()
+
+    @staticmethod
+    def output(interpreter):
+        f = io.StringIO()
+        with redirect_stdout(f):
+            interpreter.interpret()
+        return f.getvalue()
+
+    def test_lower_expression(self):
+        flat = lower_program(self.parse("value x = a * 2"))
+        [declaration] = flat.list_at(flat.statements)
+        self.assertEqual(flat.kinds[declaration], NodeKind.VARIABLE_DECLARATION)
+        self.assertEqual(flat.constants[flat.values[declaration]], "x")
+        product = flat.lefts[declaration]
+        self.assertEqual(flat.kinds[product], NodeKind.BINARY_OPERATION)
+        self.assertEqual(flat.operators[product], Operators.MULT_OPERATOR.value)
+        self.assertEqual(flat.kinds[flat.lefts[product]], NodeKind.IDENTIFIER)
+        self.assertEqual(flat.rights[flat.lefts[product]], NONE)
+        self.assertEqual(flat.constants[flat.values[flat.rights[product]]], 2)
+        self.assertEqual(flat.position(product).column, 13)
+
+    def test_constants_are_pooled_by_type(self):
+        flat = lower_program(self.parse("print(1, 1.0, true, 1, \"1\")"))
+        [call] = flat.list_at(flat.statements)
+        values = [flat.values[arg] for arg in flat.list_at(flat.lefts[call])]
+        self.assertEqual(values[0], values[3])
+        self.assertEqual(len(set(values)), 4)
+
+    def test_lowered_while_parsing_matches_lowered_program(self):
+        code = "function f(a) { return a }\nvalue x = f(2) + 3\nprint(x)"
+        streamed = parse_flat(Parser(Lexer(CharacterReader(StringIO(code)))))
+        lowered = lower_program(self.parse(code))
+        for column in ('kinds', 'operators', 'values', 'lefts', 'rights', 'offsets'):
+            self.assertEqual(sorted(getattr(streamed, column)), sorted(getattr(lowered, column)))
+        self.assertEqual(len(streamed), len(lowered))
+
+    def test_lowered_while_parsing_syntax_error(self):
+        with self.assertRaises(UnexpectedTokenError):
+            parse_flat(Parser(Lexer(CharacterReader(StringIO("value x = 1 }")))))
+
+    def test_examples_run_like_object_tree(self):
+        for name in sorted(os.listdir(EXAMPLES_DIR)):
+            with open(os.path.join(EXAMPLES_DIR, name)) as file:
+                code = file.read()
+            expected = self.output(Interpreter(self.parse(code)))
+            self.assertEqual(self.output(FlatInterpreter(lower_program(self.parse(code)))), expected)
+
+    def test_function_call_and_return(self):
+        code = """
+        function add(a, b) {
+            if a > b {
+                return a
+            }
+            return a + b
+        }
+        foreach c in "ab" {
+            print(c, add(3, 1), -add(1, 2))
+        }
+        """
+        self.assertEqual(self.output(FlatInterpreter(lower_program(self.parse(code)))), "a 3 -3\nb 3 -3\n")
+
+    def test_errors_keep_positions(self):
+        with self.assertRaises(UndefinedVarError) as context:
+            FlatInterpreter(lower_program(self.parse("value x = 1\nprint(y)"))).interpret()
+        self.assertEqual((context.exception.position.line, context.exception.position.column), (2, 7))
+        with self.assertRaises(TypeUnaryError):
+            FlatInterpreter(lower_program(self.parse('value x = -"a"'))).interpret()
+        with self.assertRaises(DuplicateVarDeclarationError):
+            FlatInterpreter(lower_program(self.parse("value x = 1\nvalue x = 2"))).interpret()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from errors.interpreter_errors import InterpreterError, DivisionByZeroError
+from interpreter.folding import ConstantFolder, fold_constants
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.models import FloatLiteral, IntLiteral, StringLiteral, BinaryOperation
+from parser.parser import Parser
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples_code')
+
+EXPRESSIONS = [
+    '4 * 3 / (2 + 1)', '"shoes".length', '"TeSt".toLower()', '"TeSt".toUpper()', '"a" + 1', '1 + "a"',
+    '"true" + 1', 'true + 1', 'true + true', 'false * 3', '"ab" * 3', '3 * "ab"', '"ab" * "c"', '1 - "a"',
+    '1 / 0', '1.5 / 0', '"a" / 2', 'null + 1', '"x" + null', '-"a"', '-(2 + 3)', '!true', '!"false"', '!0',
+    '1 < 2', '"a" == "a"', '"a" < "b"', '1 == "1"', 'true && "x"', '0 || 2.5', '"a" && ""', 'int("5") + 1',
+    'float("2.5") * 2', 'str(12) + 3', 'int("x")', 'int(1, 2)', '"abc".size', '"a".toUpper(1)',
+    '1.0 + 1', '"" + 1.0 / 3', '(1 + 2) * (3 - x)', '"n" + 2 * 3 + 1', '"-" * 100000',
+]
+
+
+class TestConstantFolding(unittest.TestCase):
+    @staticmethod
+    def parse(code):
+        return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+    @staticmethod
+    def run_program(program):
+        f = io.StringIO()
+        try:
+            with redirect_stdout(f):
+                Interpreter(program).interpret()
+        except InterpreterError as error:
+            return f.getvalue(), type(error), error.position and (error.position.line, error.position.column)
+        except TypeError as error:
+            # int(1, 2) fails in Python rather than in the interpreter, folded or not
+            return f.getvalue(), type(error), None
+        return f.getvalue(), None, None
+
+    def assert_same(self, code):
+        self.assertEqual(self.run_program(fold_constants(self.parse(code))), self.run_program(self.parse(code)),
+                         code)
+
+    def test_expressions_match_runtime(self):
+        for expression in EXPRESSIONS:
+            self.assert_same(f'value x = 2\nprint({expression})')
+            self.assert_same(f'value x = 2\nvalue y = {expression}\nprint(y + 1, "s" + y)')
+            self.assert_same(f'value x = 2\nforeach c in str({expression}) {{ print(c) }}')
+
+    def test_folded_literals(self):
+        program = fold_constants(self.parse('value a = 4 * 3 / (2 + 1)\nvalue b = "shoes".length\n'
+                                            'value c = "TeSt".toLower() + 1\nvalue d = (1 + 2) * (3 - x)'))
+        a, b, c, d = (statement.value_expr for statement in program.statements)
+        self.assertIsInstance(a, FloatLiteral)
+        self.assertEqual(a.value, 4.0)
+        self.assertIsInstance(b, IntLiteral)
+        self.assertIsInstance(c, StringLiteral)
+        self.assertEqual(c.value, "test1")
+        self.assertIsInstance(d, BinaryOperation)
+        self.assertIsInstance(d.left, IntLiteral)
+        self.assertEqual((a.position.line, a.position.column), (1, 13))
+
+    def test_booleans_are_not_folded(self):
+        folder = ConstantFolder()
+        program = folder.fold_program(self.parse('print(1 < 2, !true)'))
+        self.assertEqual(folder.folded, 0)
+        self.assertIsInstance(program.statements[0].args[0], BinaryOperation)
+
+    def test_division_by_zero_waits_for_runtime(self):
+        code = 'function never() {\n    return 1 / 0\n}\nprint("ok")'
+        self.assertEqual(self.run_program(fold_constants(self.parse(code))), ("ok\n", None, None))
+        self.assertEqual(self.run_program(fold_constants(self.parse('print(1)\nprint(2 + 1 / 0)')))[:2],
+                         ("1\n", DivisionByZeroError))
+
+    def test_examples_run_the_same(self):
+        for name in sorted(os.listdir(EXAMPLES_DIR)):
+            with open(os.path.join(EXAMPLES_DIR, name)) as file:
+                self.assert_same(file.read())
+
+    def test_deep_expression(self):
+        program = fold_constants(self.parse('value a = ' + '(' * 20000 + '1' + ')' * 20000 + ' + 1'))
+        self.assertIsInstance(program.statements[0].value_expr, IntLiteral)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from errors.parser_errors import ParserError, UnexpectedTokenError
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.incremental import IncrementalParser, common_prefix, common_suffix
+from parser.models import FunctionDefinition
+from parser.parser import Parser
+
+
+def library(count):
+    return '\n'.join(f'function f{index}(a) {{\n    return a * {index}\n}}\nvalue v{index} = f{index}(2)'
+                     for index in range(count)) + '\nprint(v3, v9)\n'
+
+
+def positions(program):
+    # (line, column) of each statement and of the first expression below it, enough to see a stale offset
+    result = []
+    for statement in program.statements:
+        inner = statement.block.statements[0].value_expr if isinstance(statement, FunctionDefinition) \
+            else getattr(statement, 'value_expr', None)
+        result.append((statement.position.line, statement.position.column,
+                       inner and (inner.position.line, inner.position.column)))
+    return result
+
+
+class TestIncrementalParser(unittest.TestCase):
+    @staticmethod
+    def parse(code):
+        return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+    @staticmethod
+    def output(program):
+        f = io.StringIO()
+        with redirect_stdout(f):
+            Interpreter(program).interpret()
+        return f.getvalue()
+
+    def test_common_prefix_and_suffix(self):
+        self.assertEqual(common_prefix('abcdef', 'abcxef'), 3)
+        self.assertEqual(common_suffix('abcdef', 'abcxef', 3), 2)
+        self.assertEqual(common_prefix('abc', 'abcd'), 3)
+        self.assertEqual(common_suffix('abc', 'abcc', 0), 0)
+
+    def test_function_edit_reparses_one_statement(self):
+        code = library(10)
+        incremental = IncrementalParser(code)
+        edited = code.replace('a * 3', 'a * 3 + 100')
+        program = incremental.update(edited)
+        self.assertEqual(incremental.reparsed, 1)
+        self.assertEqual(self.output(program), "106 18\n")
+        self.assertEqual(positions(program), positions(self.parse(edited)))
+
+    def test_edits_match_full_parse(self):
+        code = library(10)
+        incremental = IncrementalParser(code)
+        edits = [
+            ('value v2 = f2(2)', 'value v2 = f2(2)\nvalue extra = 1\n\n'),
+            ('function f5(a) {', '# a comment\nfunction f5(a) {'),
+            ('v9 = f9(2)', 'v9 = f9(2) + f1(1)'),
+            ('function f0', '\n\nfunction f0'),
+            ('\nprint(v3, v9)\n', '\nprint(v3, v9) print(extra)'),
+        ]
+        for old, new in edits:
+            code = code.replace(old, new, 1)
+            program = incremental.update(code)
+            self.assertEqual(positions(program), positions(self.parse(code)))
+            self.assertEqual(self.output(program), self.output(self.parse(code)))
+
+    def test_syntax_error_keeps_previous_program(self):
+        code = library(10)
+        incremental = IncrementalParser(code)
+        with self.assertRaises(ParserError) as context:
+            incremental.update(code.replace('return a * 7', 'return a *'))
+        self.assertEqual(context.exception.position.line, 31)
+        self.assertEqual(incremental.source, code)
+        self.assertEqual(positions(incremental.program), positions(self.parse(code)))
+        program = incremental.update(code.replace('print(v3, v9)', 'print(v3, v7)'))
+        self.assertEqual(self.output(program), "6 14\n")
+
+    def test_unchanged_source(self):
+        incremental = IncrementalParser(library(3))
+        incremental.update(library(3))
+        self.assertEqual(incremental.reparsed, 0)
+
+    def test_edit_that_joins_statements(self):
+        incremental = IncrementalParser('value x = 1\nprint(x)\n')
+        with self.assertRaises(UnexpectedTokenError):
+            incremental.update('value x = 1 }\nprint(x)\n')
+        self.assertEqual(self.output(incremental.update('value x = 1 + \n2\nprint(x)\n')), "3\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
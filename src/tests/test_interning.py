@@ -0,0 +1,97 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from compiler.transpiler import TranspiledInterpreter
+from compiler.vm import VirtualMachine
+from errors.interpreter_errors import UndefinedVarError, UnexpectedTypeError
+from interpreter.closures import ClosureInterpreter
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.interning import ExpressionTable, ExpressionPosition, intern_program
+from parser.parser import Parser
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples_code')
+
+
+class TestInterning(unittest.TestCase):
+    @staticmethod
+    def parse(code):
+        return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+    @staticmethod
+    def output(program, engine=Interpreter):
+        f = io.StringIO()
+        with redirect_stdout(f):
+            engine(program).interpret()
+        return f.getvalue()
+
+    def test_identical_expressions_are_one_node(self):
+        program = intern_program(self.parse('value a = x - 1\nvalue b = (x - 1) * 2\nprint(x - 1, x + 1)'))
+        first = program.statements[0].value_expr
+        self.assertIs(program.statements[1].value_expr.left, first)
+        self.assertIs(program.statements[2].args[0], first)
+        self.assertIsNot(program.statements[2].args[1], first)
+        self.assertIs(program.statements[2].args[1].left, first.left)
+
+    def test_literal_types_stay_apart(self):
+        program = intern_program(self.parse('print(1, 1.0, true, "1", 1)'))
+        args = program.statements[0].args
+        self.assertEqual(len({id(arg) for arg in args}), 4)
+        self.assertIs(args[0], args[4])
+
+    def test_table_counts(self):
+        table = ExpressionTable()
+        table.intern_program(self.parse('value a = x - 1\nvalue b = x - 1'))
+        self.assertEqual((len(table), table.occurrences), (3, 6))
+
+    def test_positions_of_shared_expressions(self):
+        program = intern_program(self.parse('value a = y + 1\nprint(a)\nvalue b = y + 1'))
+        shared = program.statements[0].value_expr
+        self.assertIsInstance(shared.position, ExpressionPosition)
+        self.assertEqual((shared.position.line, shared.position.column), (1, 13))
+        self.assertEqual(shared.position.locate(program.statements[2]).line, 3)
+
+    def test_error_reports_failing_occurrence(self):
+        code = 'function f() {\n    return 1 + w\n}\nvalue a = 2\nif a > 1 {\n    print(1 + w)\n}'
+        with self.assertRaises(UndefinedVarError) as context:
+            Interpreter(intern_program(self.parse(code))).interpret()
+        self.assertEqual((context.exception.position.line, context.exception.position.column), (6, 15))
+        code = 'function f() {\n    return z\n}\nprint(1)\nprint(z)'
+        with self.assertRaises(UndefinedVarError) as context:
+            Interpreter(intern_program(self.parse(code))).interpret()
+        self.assertEqual((context.exception.position.line, context.exception.position.column), (5, 7))
+
+    def test_scopes_resolve_shared_identifiers_apart(self):
+        # `a + 1` is one node, local in f and global at the top level; resolving one must not change the other
+        code = 'value a = 100\nfunction f() {\n    value a = 1\n    print(a + 1)\n}\nprint(a + 1)\nf()'
+        for engine in (Interpreter, ClosureInterpreter, VirtualMachine, TranspiledInterpreter):
+            program = intern_program(self.parse(code))
+            shared = program.statements[2].args[0]
+            self.assertEqual(self.output(program, engine), '101\n2\n', engine.__name__)
+            self.assertIsNone(shared.left.slot)
+
+    def test_error_position_after_resolution(self):
+        # f resolves the shared `a` first, as a local; both top-level occurrences get one global copy of it,
+        # and the error is on the second of them
+        code = 'function f() {\n    value a = "x"\n    print(a)\n}\nvalue a = 5\nprint(a)\nforeach b in a {\n}'
+        for engine in (Interpreter, ClosureInterpreter, VirtualMachine, TranspiledInterpreter):
+            with self.assertRaises(UnexpectedTypeError) as context:
+                self.output(intern_program(self.parse(code)), engine)
+            position = context.exception.position
+            self.assertEqual((position.line, position.column), (7, 14), engine.__name__)
+
+    def test_examples_run_the_same(self):
+        for name in sorted(os.listdir(EXAMPLES_DIR)):
+            with open(os.path.join(EXAMPLES_DIR, name)) as file:
+                code = file.read()
+            self.assertEqual(self.output(intern_program(self.parse(code))), self.output(self.parse(code)))
+
+    def test_deep_expression(self):
+        program = intern_program(self.parse('value a = ' + '(' * 20000 + '1' + ')' * 20000))
+        self.assertEqual(self.output(program), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
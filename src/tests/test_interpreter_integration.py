@@ -5,6 +5,7 @@ from io import StringIO
 
 from errors.interpreter_errors import DivisionByZeroError, TypeBinaryError, UnexpectedTypeError, \
     UndefinedFunctionError, UndefinedVarError, UnexpectedMethodError
+from errors.parser_errors import ParserError
 from interpreter.interpreter import Interpreter
 from lexer.lexer import CharacterReader, Lexer
 from parser.parser import Parser
@@ -26,6 +27,22 @@ class TestInterpreter(unittest.TestCase):
         output = f.getvalue().strip()
         return output
 
+    @staticmethod
+    def stream_code(code):
+        interpreter = Interpreter(None)
+        f = io.StringIO()
+        with redirect_stdout(f):
+            interpreter.interpret_stream(Parser(Lexer(CharacterReader(StringIO(code)))))
+        return f.getvalue().strip()
+
+    @staticmethod
+    def lazy_code(code):
+        program = Parser(Lexer(CharacterReader.from_string(code)), lazy_source=code).parse_program()
+        f = io.StringIO()
+        with redirect_stdout(f):
+            Interpreter(program).interpret()
+        return f.getvalue().strip()
+
     def test_var_declarations_and_assignment(self):
         code = """
         value x = 5
@@ -64,6 +81,41 @@ class TestInterpreter(unittest.TestCase):
         expected_output = "4"
         self.assertEqual(self.interpret_code(code), expected_output)
 
+    def test_call_in_return_value(self):
+        code = """
+        function count(n) {
+            if n > 0 {
+                return count(n - 1) + 1
+            }
+            return 0
+        }
+        print(count(5))
+        """
+        self.assertEqual(self.interpret_code(code), "5")
+
+    def test_print_as_value(self):
+        code = """
+        value a = print(1, 2)
+        value b = print()
+        print(a, b)
+        """
+        self.assertEqual(self.interpret_code(code), "1 2\n\n2 null")
+
+    def test_top_level_return(self):
+        # only the value is evaluated; the statements after it still run
+        code = """
+        function f() {
+            print("f")
+            return 1
+        }
+        return f()
+        if true {
+            print("a")
+            print("b")
+        }
+        """
+        self.assertEqual(self.interpret_code(code), "f\na\nb")
+
     def test_if_statement(self):
         code = """
         value x = 5
@@ -177,6 +229,62 @@ class TestInterpreter(unittest.TestCase):
         with self.assertRaises(UndefinedVarError):
             self.interpret_code(code)
 
+    def test_stream_hoists_functions(self):
+        code = """
+        print(twice(2))
+        value x = 3
+        function twice(a) {
+            return a * 2
+        }
+        print(x, later())
+        function later() {
+            return "done"
+        }
+        """
+        self.assertEqual(self.stream_code(code), "4\n3 done")
+        self.assertEqual(self.stream_code(code), self.interpret_code(code))
+
+    def test_stream_runs_statements_before_a_syntax_error(self):
+        f = io.StringIO()
+        with redirect_stdout(f), self.assertRaises(ParserError):
+            Interpreter(None).interpret_stream(Parser(Lexer(CharacterReader(StringIO('print(1)\nvalue = 2')))))
+        self.assertEqual(f.getvalue(), "1\n")
+
+    def test_stream_undefined_function(self):
+        with self.assertRaises(UndefinedFunctionError):
+            self.stream_code('value x = missing(1)\nfunction other() { return 1 }')
+
+    def test_lazy_function_bodies(self):
+        code = """
+        function twice(a) {
+            if a > 1 { return a * 2 }
+            return a
+        }
+        function broken() {
+            value = 1 +
+        }
+        print(twice(2), twice(1))
+        """
+        self.assertEqual(self.lazy_code(code), "4 1")
+
+    def test_lazy_function_body_errors_when_called(self):
+        code = 'function broken(a) {\n    return a +\n}\nprint(1)\nbroken(1)'
+        f = io.StringIO()
+        with redirect_stdout(f), self.assertRaises(ParserError) as context:
+            Interpreter(Parser(Lexer(CharacterReader.from_string(code)), lazy_source=code).parse_program()).interpret()
+        self.assertEqual(f.getvalue(), "1\n")
+        self.assertEqual(context.exception.position.line, 3)
+
+    def test_lazy_function_body_keeps_positions(self):
+        code = 'function f() {\n    return missing\n}\nf()'
+        with self.assertRaises(UndefinedVarError) as context:
+            self.lazy_code(code)
+        self.assertEqual((context.exception.position.line, context.exception.position.column), (2, 12))
+
+    def test_lazy_unclosed_function_body(self):
+        with self.assertRaises(ParserError):
+            self.lazy_code('function f() {\n    return 1\n')
+
 
 if __name__ == '__main__':
     unittest.main()
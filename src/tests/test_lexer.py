@@ -1,7 +1,10 @@
 import io
+import os
+import tempfile
 
 from errors.lexer_errors import LexerError
-from src.lexer.lexer import Lexer, CharacterReader, TokenType
+from src.lexer.lexer import Lexer, CharacterReader, TokenType, MmapSource
+from lexer.incremental import IncrementalLexer
 import unittest
 from sys import maxsize
 
@@ -354,6 +357,142 @@ class TestLexer(unittest.TestCase):
         self.assertEqual(token.position.line, 3)
         self.assertEqual(token.position.column, 11)
 
+    def test_non_ascii_identifier_and_digits(self):
+        lexer = Lexer(CharacterReader(io.StringIO('zażółć ١٢ & ')))
+        token = lexer.get_next_token()
+        self.assertEqual((token.type, token.value), (TokenType.IDENTIFIER, 'zażółć'))
+        token = lexer.get_next_token()
+        self.assertEqual((token.type, token.value), (TokenType.INT_CONST, 12))
+        with self.assertRaises(LexerError):
+            lexer.get_next_token()
+
+    def test_token_offsets_and_lazy_positions(self):
+        code = io.StringIO('x\n\n  value y\n"abc')
+        lexer = Lexer(CharacterReader(code, 2))
+        self.assertEqual(lexer.get_next_token().offset, 0)
+        token = lexer.get_next_token()
+        self.assertEqual(token.offset, 5)
+        self.assertEqual((token.position.line, token.position.column), (3, 3))
+        self.assertEqual(lexer.get_next_token().offset, 11)
+        with self.assertRaises(LexerError) as error:
+            lexer.get_next_token()
+        self.assertEqual(str(error.exception), 'Unterminated string literal at Line: 4, Column: 1')
+        self.assertEqual(str(lexer.lines.position(14)), 'Line: 4, Column: 2')
+
+    def test_identifiers_and_strings_are_interned(self):
+        lexer = Lexer(CharacterReader(io.StringIO('counter "ab" ' + 'count' + 'er "a" + "b"')))
+        first, first_string, second, _, _, _ = [lexer.get_next_token() for _ in range(6)]
+        self.assertIs(first.value, second.value)
+        self.assertIs(first_string.value, 'ab')
+        self.assertFalse(hasattr(first, '__dict__'))
+
+    def test_chunk_boundaries_keep_positions(self):
+        code = 'value x = "a b"\n  # comment\nx = x + 10.25\n'
+
+        def tokens(chunk_size):
+            lexer = Lexer(CharacterReader(io.StringIO(code), chunk_size))
+            result = []
+            while (token := lexer.get_next_token()).type != TokenType.ETX:
+                result.append((token.type, token.value, token.position.line, token.position.column))
+            return result
+
+        expected = tokens(65536)
+        for chunk_size in (1, 2, 3, 7):
+            self.assertEqual(tokens(chunk_size), expected)
+
+    def test_lexemes_spanning_chunks(self):
+        code = 'long_identifier_name "say \\"hi\\"\\tnow" 1234567.125 # a comment\nnext'
+        for chunk_size in (1, 4, 5, 9):
+            lexer = Lexer(CharacterReader(io.StringIO(code), chunk_size))
+            values = [lexer.get_next_token().value for _ in range(5)]
+            self.assertEqual(values, ['long_identifier_name', 'say "hi"\tnow', 1234567.125, ' a comment', 'next'])
+
+    def test_lexeme_limits(self):
+        lexer = Lexer(CharacterReader(io.StringIO('"' + 'a' * 5 + '"'), 2), string_max_length=4)
+        with self.assertRaises(ValueError):
+            lexer.get_next_token()
+        lexer = Lexer(CharacterReader(io.StringIO('"' + 'a' * 4 + '\n'), 2), string_max_length=4)
+        with self.assertRaises(LexerError):
+            lexer.get_next_token()
+        lexer = Lexer(CharacterReader(io.StringIO('0' * 40 + '7 1.' + '5' * 17), 3))
+        self.assertEqual(lexer.get_next_token().value, 7)
+        with self.assertRaises(LexerError):
+            lexer.get_next_token()
+
+    def test_mmap_source(self):
+        with tempfile.NamedTemporaryFile('wb', suffix='.xd', delete=False) as file:
+            file.write('value ż = "ąę"\r\nprint(ż)'.encode())
+        try:
+            with open(file.name, 'rb') as binary:
+                source = MmapSource(binary)
+                lexer = Lexer(CharacterReader(source, 4))
+                tokens = [lexer.get_next_token() for _ in range(9)]
+                source.close()
+        finally:
+            os.unlink(file.name)
+        self.assertEqual(tokens[1].value, 'ż')
+        self.assertEqual(tokens[3].value, 'ąę')
+        self.assertEqual(tokens[4].position.line, 2)
+        self.assertEqual(tokens[4].position.column, 1)
+        self.assertEqual(tokens[8].type, TokenType.ETX)
+
+    def test_mmap_small_chunks(self):
+        # chunks of one or two bytes hold only part of a character, or a \r the decoder waits on
+        code = 'value ż = "ąę€"\r\nprint(ż)\r'
+        with tempfile.NamedTemporaryFile('wb', suffix='.xd', delete=False) as file:
+            file.write(code.encode())
+        try:
+            for chunk_size in (1, 2, 3):
+                with open(file.name, 'rb') as binary:
+                    source = MmapSource(binary)
+                    tokens = list(Lexer(CharacterReader(source, chunk_size)).tokens())
+                    source.close()
+                expected = list(Lexer(CharacterReader(io.StringIO(code.replace('\r\n', '\n')))).tokens())
+                self.assertEqual([(t.type, t.value) for t in tokens], [(t.type, t.value) for t in expected])
+                self.assertEqual(tokens[4].position.line, 2)
+        finally:
+            os.unlink(file.name)
+
+    def test_mmap_empty_file(self):
+        with tempfile.NamedTemporaryFile('wb', suffix='.xd', delete=False) as file:
+            pass
+        try:
+            with open(file.name, 'rb') as binary:
+                lexer = Lexer(CharacterReader(MmapSource(binary)))
+                self.assertEqual(lexer.get_next_token().type, TokenType.ETX)
+        finally:
+            os.unlink(file.name)
+
+    def test_comment_trivia(self):
+        code = '# first\nvalue x # second\n\n#third'
+        tokens = list(Lexer(CharacterReader(io.StringIO(code))).tokens())
+        self.assertEqual([t.type for t in tokens], [TokenType.VALUE, TokenType.IDENTIFIER, TokenType.ETX])
+
+        trivia = []
+        tokens = list(Lexer(CharacterReader(io.StringIO(code)), trivia=trivia).tokens())
+        self.assertEqual(len(tokens), 3)
+        self.assertEqual([(t.value, t.position.line, t.position.column) for t in trivia],
+                         [(' first', 1, 1), (' second', 2, 9), ('third', 4, 1)])
+
+    def test_incremental_edit_matches_full_lex(self):
+        source = 'value x = 1\nvalue y = x + 2  # sum\nprint(y)\n' * 20
+        incremental = IncrementalLexer(source, checkpoint_interval=4)
+        edits = [(12, 17, 'value'), (18, 18, 'yy'), (0, 0, '# start\n'), (40, 41, ''), (60, 62, '=='),
+                 (len(incremental.source), len(incremental.source), 'x')]
+        for start, end, text in edits:
+            tokens = incremental.edit(start, end, text)
+            expected = list(Lexer(CharacterReader(io.StringIO(incremental.source))).tokens())
+            self.assertEqual([(t.type.name, t.value, t.offset, t.position.line, t.position.column) for t in tokens],
+                             [(t.type.name, t.value, t.offset, t.position.line, t.position.column) for t in expected])
+
+    def test_incremental_edit_error_keeps_previous_source(self):
+        incremental = IncrementalLexer('value x = "a"\nprint(x)')
+        tokens = list(incremental.tokens)
+        with self.assertRaises(LexerError):
+            incremental.edit(10, 11, '')
+        self.assertEqual(incremental.source, 'value x = "a"\nprint(x)')
+        self.assertEqual(incremental.tokens, tokens)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from errors.parser_errors import ExpectedFunctionNameError
+from parser.models import FunctionDefinition, VariableDeclaration
+from parser.parallel import function_boundaries, split_source, parse_parallel
+
+
+def library(count):
+    return '\n'.join(f'function f{index}(a) {{\n    return a * {index}\n}}\nvalue v{index} = f{index}(2)'
+                     for index in range(count))
+
+
+class TestParallelParser(unittest.TestCase):
+    def test_function_boundaries(self):
+        code = 'value s = "function {"\n# function\nfunction f() { if x { function } }\nfunctions()\nfunction g() {}'
+        self.assertEqual(function_boundaries(code), [code.index('function f'), code.index('function g')])
+
+    def test_split_source(self):
+        code = library(20)
+        chunks = split_source(code, 4)
+        self.assertEqual(''.join(text for _, text in chunks), code)
+        self.assertEqual([start for start, _ in chunks][0], 0)
+        for start, text in chunks[1:]:
+            self.assertTrue(text.startswith('function'))
+
+    def test_parse_parallel_positions(self):
+        code = library(40)
+        program = parse_parallel(code, 2)
+        self.assertEqual(len(program.statements), 80)
+        definition, declaration = program.statements[78:]
+        self.assertIsInstance(definition, FunctionDefinition)
+        self.assertEqual(definition.name, 'f39')
+        self.assertIsInstance(declaration, VariableDeclaration)
+        self.assertEqual((declaration.position.line, declaration.position.column), (160, 1))
+        product = definition.block.statements[0].value_expr
+        self.assertEqual((product.position.line, product.position.column), (158, 14))
+
+    def test_parse_parallel_error_position(self):
+        code = library(40).replace('function f30', 'function (', 1)
+        with self.assertRaises(ExpectedFunctionNameError) as context:
+            parse_parallel(code, 2)
+        self.assertEqual((context.exception.position.line, context.exception.position.column), (121, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
-from parser.parser import Parser
-from lexer.lexer import CharacterReader, StringIO, Lexer
+from parser.parser import Parser, Operators
+from lexer.lexer import CharacterReader, StringIO, Lexer, TokenType
+from errors.lexer_errors import LexerError
 from errors.parser_errors import *
 from parser.models import *
 
@@ -373,6 +374,144 @@ class TestParser(unittest.TestCase):
         with self.assertRaises(ExpectedIdentifierAfterDotError):
             parser_with_error.parse_program()
 
+    def test_parse_expression_precedence_and_associativity(self):
+        code = "value x = a - b - c * d / e || f && g"
+        expression = Parser(Lexer(CharacterReader(StringIO(code)))).parse_program().statements[0].value_expr
+        self.assertEqual(expression.operator, Operators.OR_OPERATOR)
+        self.assertEqual(expression.right.operator, Operators.AND_OPERATOR)
+        difference = expression.left
+        self.assertEqual(difference.operator, Operators.MINUS_OPERATOR)
+        self.assertEqual(difference.left.operator, Operators.MINUS_OPERATOR)
+        self.assertEqual(difference.left.left.name, "a")
+        self.assertEqual(difference.right.operator, Operators.DIV_OPERATOR)
+        self.assertEqual(difference.right.left.operator, Operators.MULT_OPERATOR)
+        # operators of one level share the position of the first of them
+        self.assertEqual(difference.position.column, 13)
+        self.assertEqual(difference.left.position.column, 13)
+        self.assertEqual(difference.right.position.column, 21)
+
+    def test_syntax_error_chained_equality(self):
+        code = "value x = a == b == c"
+        parser_with_error = Parser(Lexer(CharacterReader(StringIO(code))))
+        with self.assertRaises(UnexpectedTokenError):
+            parser_with_error.parse_program()
+
+    def test_nodes_are_slotted_with_offset_positions(self):
+        code = "value x = a + 1\nprint(x)"
+        program = Parser(Lexer(CharacterReader(StringIO(code)))).parse_program()
+        declaration, call = program.statements
+        for node in [declaration, declaration.value_expr, declaration.value_expr.right, call, call.args[0]]:
+            self.assertFalse(hasattr(node, '__dict__'))
+        self.assertEqual((call.position.line, call.position.column), (2, 1))
+        self.assertEqual((call.args[0].position.line, call.args[0].position.column), (2, 7))
+        self.assertEqual(str(declaration.position), "Line: 1, Column: 1")
+
+    def test_parse_deeply_nested_parentheses_and_calls(self):
+        depth = 100_000
+        code = "value x = " + "(" * depth + "a + 1" + ")" * depth + "\nprint(" + "f(" * depth + "y" + ")" * depth + ")"
+        declaration, call = Parser(Lexer(CharacterReader(StringIO(code)))).parse_program().statements
+        self.assertIsInstance(declaration.value_expr, BinaryOperation)
+        self.assertEqual(declaration.value_expr.position.column, 10 + depth + 3)
+        nesting = 0
+        while isinstance(call, FunctionCall):
+            [call] = call.args
+            nesting += 1
+        self.assertEqual(nesting, depth + 1)
+        self.assertEqual((call.name, call.position.line), ("y", 2))
+
+    def test_parse_deeply_nested_blocks(self):
+        depth = 100_000
+        code = "if x {\n" * depth + "print(x)\n" + "}\n" * depth
+        [statement] = Parser(Lexer(CharacterReader(StringIO(code)))).parse_program().statements
+        nesting = 0
+        while isinstance(statement, IfStatement):
+            [statement] = statement.block.statements
+            nesting += 1
+        self.assertEqual(nesting, depth)
+        self.assertEqual(statement.position.line, depth + 1)
+
+    def test_syntax_error_deeply_nested(self):
+        depth = 20_000
+        code = "value x = " + "(" * depth + "a" + ")" * (depth - 1)
+        with self.assertRaises(ExpectedRightParentAfterExpression):
+            Parser(Lexer(CharacterReader(StringIO(code)))).parse_program()
+        code = "while x {" * depth + "}" * (depth - 1)
+        with self.assertRaises(ExpectedRightBraceError):
+            Parser(Lexer(CharacterReader(StringIO(code)))).parse_program()
+
+    def test_deep_rules_parse_the_same(self):
+        # the deep_parse_* generators mirror the rules: same tree, same positions, same errors
+        def dump(node):
+            if isinstance(node, list):
+                return [dump(item) for item in node]
+            if not hasattr(type(node), '__slots__'):
+                return node
+            if hasattr(node, 'line'):
+                return node.line, node.column
+            return type(node).__name__, [dump(getattr(node, name)) for name in slot_names(type(node))]
+
+        def parse(code, deep):
+            parser = Parser(Lexer(CharacterReader(StringIO(code))))
+            return parser.run_on_stack(parser.deep_parse_block()) if deep else parser.parse_block()
+
+        code = ('{\n    value a = -(1 + 2) * 3 <= 4 && !b || "x".length == c.d.toUpper()\n'
+                '    if f(a, (b), g()) {\n        a = 1\n    }\n    while a < 3 {\n        return a - 1 / 2\n    }\n'
+                '    foreach e in "abc" {\n        print(e)\n    }\n    return\n}')
+        self.assertEqual(dump(parse(code, True)), dump(parse(code, False)))
+        for code in ['{ value a = (1 + }', '{ if a { print(1, ) }', '{ foreach e a {} }', '{ x 1 }',
+                     '{ a = 1 == 2 == 3 }', '{ value = 1 }', '{ while {} }', '{ a = - }', '{ f(a.) }',
+                     '{ return (a }', '{ if a print(a) }', '{ f(1 }', '{ a = }']:
+            errors = []
+            for deep in (False, True):
+                with self.assertRaises(ParserError) as context:
+                    parse(code, deep)
+                errors.append((type(context.exception), str(context.exception)))
+            self.assertEqual(errors[1], errors[0])
+
+    def test_parse_replayed_token_list(self):
+        code = """
+        value x = 10  # comment
+        print(x + 1)
+        """
+        tokens = list(Lexer(CharacterReader(StringIO(code))).tokens())
+        for _ in range(2):
+            program = Parser(tokens).parse_program()
+            self.assertEqual(len(program.statements), 2)
+            self.assertIsInstance(program.statements[1], FunctionCall)
+
+    def test_parse_long_comment_block(self):
+        code = "value x = 1\n" + "# comment\n" * 5000 + "print(x)"
+        lexer = Lexer(CharacterReader(StringIO(code)))
+        tokens = []
+        while (token := lexer.get_next_token()).type != TokenType.ETX:
+            tokens.append(token)
+        tokens.append(token)
+        program = Parser(tokens).parse_program()
+        self.assertEqual(len(program.statements), 2)
+        program = Parser(Lexer(CharacterReader(StringIO(code)))).parse_program()
+        self.assertEqual(program.statements[1].position.line, 5002)
+
+    def test_parse_pipelined_tokens(self):
+        code = "value x = 1\n" * 50
+        lexer = Lexer(CharacterReader(StringIO(code)))
+        program = Parser(lexer.pipelined_tokens(batch_size=7, max_batches=2)).parse_program()
+        self.assertEqual(len(program.statements), 50)
+        self.assertEqual(program.statements[49].position.line, 50)
+
+    def test_pipelined_tokens_positions(self):
+        # positions are asked for while the producer thread is still feeding the line index
+        code = "value x = 1\n" * 3000
+        lexer = Lexer(CharacterReader(StringIO(code), chunk_size=64))
+        program = Parser(lexer.pipelined_tokens(batch_size=5, max_batches=1)).parse_program()
+        self.assertEqual([statement.position.line for statement in program.statements], list(range(1, 3001)))
+
+    def test_pipelined_tokens_lexer_error(self):
+        code = "value x = 1\n" * 20 + "value y = $"
+        lexer = Lexer(CharacterReader(StringIO(code)))
+        parser = Parser(lexer.pipelined_tokens(batch_size=4))
+        with self.assertRaises(LexerError):
+            parser.parse_program()
+
 
 if __name__ == '__main__':
     unittest.main()
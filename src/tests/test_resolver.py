@@ -0,0 +1,134 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from errors.interpreter_errors import DuplicateVarDeclarationError, UndefinedVarError
+from interpreter.interpreter import Interpreter
+from interpreter.resolver import Resolver, GLOBAL, LOCAL
+from lexer.lexer import CharacterReader, Lexer
+from parser.interning import intern_program
+from parser.parser import Parser
+
+
+def parse(code):
+    return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+
+def run(program):
+    f = io.StringIO()
+    with redirect_stdout(f):
+        Interpreter(program).interpret()
+    return f.getvalue().strip()
+
+
+class TestResolver(unittest.TestCase):
+    def test_global_slots(self):
+        program = parse('value a = 1\nvalue b = a + 2\nb = a')
+        resolver = Resolver()
+        for statement in program.statements:
+            resolver.resolve_statement(statement)
+        first, second, assignment = program.statements
+        self.assertEqual((first.depth, first.slot), (GLOBAL, 0))
+        self.assertEqual((second.depth, second.slot), (GLOBAL, 1))
+        self.assertEqual((second.value_expr.left.depth, second.value_expr.left.slot), (GLOBAL, 0))
+        self.assertEqual((assignment.depth, assignment.slot), (GLOBAL, 1))
+
+    def test_function_slots(self):
+        program = parse('function f(a, b) {\n    value c = a\n    foreach d in "xy" { c = d }\n    return g\n}')
+        function = program.statements[0]
+        Resolver().resolve_function(function)
+        declaration, foreach, ret = function.block.statements
+        self.assertEqual(function.frame_size, 4)
+        self.assertEqual([parameter.slot for parameter in function.parameters], [0, 1])
+        self.assertEqual((declaration.depth, declaration.slot), (LOCAL, 2))
+        self.assertEqual((declaration.value_expr.depth, declaration.value_expr.slot), (LOCAL, 0))
+        self.assertEqual((foreach.depth, foreach.slot), (LOCAL, 3))
+        self.assertEqual(foreach.block.statements[0].slot, 2)
+        self.assertEqual(ret.value_expr.depth, GLOBAL)
+
+    def test_assignment_to_undeclared_name_in_function(self):
+        program = parse('function f() { x = 1 }')
+        Resolver().resolve_function(program.statements[0])
+        self.assertEqual(program.statements[0].block.statements[0].slot, -1)
+
+    def test_shared_identifier_resolved_apart(self):
+        # after interning, the `a` below is one node in the function and at the top level
+        program = intern_program(parse('function f(a) { return a }\nvalue a = 5\nprint(f(a + 1), a)'))
+        self.assertEqual(run(program), '6 5')
+
+
+class TestFrames(unittest.TestCase):
+    def test_read_before_local_declaration_falls_back_to_global(self):
+        code = '''
+value x = "global"
+function f() {
+    print(x)
+    value x = "local"
+    print(x)
+}
+f()
+print(x)
+'''
+        self.assertEqual(run(parse(code)), 'global\nlocal\nglobal')
+
+    def test_global_cannot_be_assigned_in_function(self):
+        with self.assertRaises(UndefinedVarError):
+            run(parse('value x = 1\nfunction f() { x = 2 }\nf()'))
+
+    def test_duplicate_declaration_in_loop(self):
+        with self.assertRaises(DuplicateVarDeclarationError):
+            run(parse('value i = 0\nwhile i < 2 {\n    value y = i\n    i = i + 1\n}'))
+
+    def test_duplicate_declaration_in_function(self):
+        with self.assertRaises(DuplicateVarDeclarationError):
+            run(parse('function f(a) { value a = 1 }\nf(2)'))
+
+    def test_foreach_in_function(self):
+        code = '''
+function reverse(text) {
+    value result = ""
+    foreach c in text {
+        result = c + result
+    }
+    return result
+}
+print(reverse("abc"), reverse("xy"))
+'''
+        self.assertEqual(run(parse(code)), 'cba yx')
+
+    def test_foreach_over_global_in_function(self):
+        with self.assertRaises(UndefinedVarError):
+            run(parse('value c = ""\nfunction f() { foreach c in "ab" { print(c) } }\nf()'))
+
+    def test_recursion_keeps_frames_apart(self):
+        code = '''
+function fact(n) {
+    value result = 1
+    if n > 1 {
+        result = n * fact(n - 1)
+    }
+    return result
+}
+print(fact(6))
+'''
+        self.assertEqual(run(parse(code)), '720')
+
+    def test_caller_frame_restored_after_error(self):
+        interpreter = Interpreter(parse('function f() { return 1 / 0 }\nvalue a = 1\nf()'))
+        with self.assertRaises(Exception):
+            interpreter.interpret()
+        self.assertIsNone(interpreter.frame)
+
+    def test_globals_kept_across_programs(self):
+        # one Interpreter over several programs, as in a REPL
+        interpreter = Interpreter(None)
+        f = io.StringIO()
+        with redirect_stdout(f):
+            for code in ('value a = 2', 'function double(n) { return n * 2 }', 'value b = double(a)', 'print(a, b)'):
+                interpreter.program = parse(code)
+                interpreter.interpret()
+        self.assertEqual(f.getvalue().strip(), '2 4')
+
+
+if __name__ == '__main__':
+    unittest.main()
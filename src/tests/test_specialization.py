@@ -0,0 +1,135 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from compiler.transpiler import TranspiledInterpreter
+from compiler.vm import VirtualMachine
+from errors.interpreter_errors import InterpreterError
+from interpreter.closures import ClosureInterpreter
+from interpreter.interpreter import Interpreter
+from interpreter.specialization import specialize_types, TypeSpecializer
+from lexer.lexer import CharacterReader, Lexer
+from parser.interning import intern_program
+from parser.models import BinaryOperation, SpecializedBinaryOperation, VariableDeclaration
+from parser.parser import Parser
+
+PROGRAMS = [
+    'value i = 0\nvalue t = 0\nwhile i < 10 {\n    t = t + i * 2\n    i = i + 1\n}\n'
+    'print(t, i, t / 2, i != 3 && t > 1)',
+    'value a = "tr"\nvalue b = a + "ue"\nprint(b + 1, a + "x" == "trx", b == "true")',
+    'value s = ""\nforeach c in "abc" { s = s + c }\nprint(s, s.length + 1, s == "abc")',
+    'value x = 1\nx = 2.5\nprint(x * 2, x / 2, x - 1 < 3)',
+    'value x = 1\nif x > 0 { x = "a" }\nprint(x + 1)',
+    'value x = 1\nwhile x < 5 {\n    x = x + 1\n    if x == 3 { x = "3" }\n}\nprint(x)',
+    'function f(n) {\n    value i = 0\n    value t = 0\n    while i < n {\n        t = t + i\n'
+    '        i = i + 1\n    }\n    return t\n}\nprint(f(10), f(2.5))',
+    'value x = 5\nfunction g() {\n    value y = x + 1\n    value x = 2\n    return x + y\n}\nprint(g())',
+    'value b = 1 < 2\nvalue c = 2 < 1\nprint(b && c, b || c, b == c, !b, b + 1)',
+    'value x = int("4")\nvalue y = float("2")\nprint(x + y, x * 3, y / 0)',
+    'value x = 4\nprint(x / 2, -x + 1, !x, x / 0)',
+    'value n = 7\nprint(n * "ab", "ab" * n)',
+    'value q = "a".toUpper()\nprint(q + "b", q.length * 2)',
+]
+
+
+def parse(code):
+    return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+
+def run(engine, program):
+    f = io.StringIO()
+    try:
+        with redirect_stdout(f):
+            engine(program).interpret()
+    except InterpreterError as error:
+        return f.getvalue(), type(error)
+    return f.getvalue(), None
+
+
+def operations(program):
+    # the value of each top-level declaration, by name
+    return {statement.name: statement.value_expr for statement in program.statements
+            if type(statement) is VariableDeclaration}
+
+
+class TestTypeSpecialization(unittest.TestCase):
+    def test_programs_match_runtime(self):
+        for code in PROGRAMS:
+            expected = run(Interpreter, parse(code))
+            for engine in (Interpreter, ClosureInterpreter, VirtualMachine, TranspiledInterpreter):
+                self.assertEqual(run(engine, specialize_types(parse(code))), expected, (engine.__name__, code))
+
+    def test_known_types(self):
+        program = specialize_types(parse('value i = 1\nvalue f = 2.5\nvalue s = "ab"\nvalue b = i < 2\n'
+                                         'value a = i + f\nvalue c = s == "x"\nvalue d = b && b\n'
+                                         'value e = s.length * 3\nvalue g = f / 2'))
+        for name in 'abcdeg':
+            self.assertIs(type(operations(program)[name]), SpecializedBinaryOperation, name)
+
+    def test_unknown_types(self):
+        # "true" and "false" turn into booleans; a string made by + may be one of them; division by a
+        # variable may be by zero; null, parameters and calls are not known
+        program = specialize_types(parse('value t = "true" + 1\nvalue s = "tr" + "ue"\nvalue u = s + "x"\n'
+                                         'value i = 4\nvalue d = 1 / i\nvalue n = null + 1\n'
+                                         'value m = "ab" * i\nvalue c = f() + 1\nfunction f() { return 1 }'))
+        for name in 'tudnmc':
+            self.assertIs(type(operations(program)[name]), BinaryOperation, name)
+
+    def test_loops_join_types(self):
+        # the type at the top of the loop holds in every iteration
+        program = specialize_types(parse('value i = 0\nvalue x = 0\nwhile i < 3 {\n    x = x + 1\n'
+                                         '    i = i + 1\n    if i == 2 { x = "a" }\n}'))
+        loop = program.statements[2]
+        self.assertIs(type(loop.condition), SpecializedBinaryOperation)
+        self.assertIs(type(loop.block.statements[0].value_expr), BinaryOperation)
+        self.assertIs(type(loop.block.statements[1].value_expr), SpecializedBinaryOperation)
+
+    def test_nested_loops_linear(self):
+        # each loop's fixpoint is found once for the types before it, however deeply it nests
+        class CountingSpecializer(TypeSpecializer):
+            iterations = 0
+
+            def iteration(self, *args):
+                self.iterations += 1
+                return super().iteration(*args)
+
+        depth = 40
+        code = 'value i = 0\nvalue x = 1\n' + 'while i < 1 {\n' * depth + 'x = x + 0.5\ni = i + 1\n' + '}\n' * depth
+        specializer = CountingSpecializer()
+        program = specializer.specialize_program(parse(code))
+        self.assertLess(specializer.iterations, 5 * depth)
+        loop = program.statements[2]
+        for _ in range(depth - 1):
+            self.assertIs(type(loop.condition), SpecializedBinaryOperation)
+            [loop] = loop.block.statements
+        self.assertIs(type(loop.block.statements[0].value_expr), SpecializedBinaryOperation)
+
+    def test_functions(self):
+        # locals once declared; parameters and globals are not known inside a function
+        program = specialize_types(parse('value g = 1\nfunction f(n) {\n    value a = g + 1\n    value b = n + 1\n'
+                                         '    value i = 0\n    value c = i + 1\n}'))
+        a, b, i, c = (statement.value_expr for statement in program.statements[1].block.statements)
+        self.assertIs(type(a), BinaryOperation)
+        self.assertIs(type(b), BinaryOperation)
+        self.assertIs(type(c), SpecializedBinaryOperation)
+
+    def test_local_read_before_declaration(self):
+        # until the declaration has run, x is the global
+        program = specialize_types(parse('function f() {\n    value y = x + 1\n    value x = 2\n'
+                                         '    value z = x + 1\n}'))
+        y, x, z = (statement.value_expr for statement in program.statements[0].block.statements)
+        self.assertIs(type(y), BinaryOperation)
+        self.assertIs(type(z), SpecializedBinaryOperation)
+
+    def test_interned_expressions_stay(self):
+        # one node shared by both statements
+        code = 'value i = 1\nvalue a = i + 1\ni = "x"\nvalue b = i + 1'
+        program = intern_program(parse(code))
+        specializer = TypeSpecializer()
+        specializer.specialize_program(program)
+        self.assertEqual(specializer.specialized, 0)
+        self.assertEqual(run(Interpreter, program), run(Interpreter, parse(code)))
+
+
+if __name__ == '__main__':
+    unittest.main()
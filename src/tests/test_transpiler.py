@@ -0,0 +1,136 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from compiler.transpiler import TranspiledInterpreter
+from errors.interpreter_errors import UndefinedVarError, RecursionLimitError, UnexpectedAttributeError, \
+    TypeBinaryError, DivisionByZeroError
+from interpreter.interpreter import Interpreter
+from lexer.lexer import CharacterReader, Lexer
+from parser.interning import intern_program
+from parser.parser import Parser
+from tests import test_interpreter, test_interpreter_integration
+
+
+def parse(code):
+    return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+
+def run(engine, program):
+    f = io.StringIO()
+    with redirect_stdout(f):
+        engine(program).interpret()
+    return f.getvalue().strip()
+
+
+class TestTranspiledInterpreterMethods(test_interpreter.TestInterpreter):
+    def setUp(self):
+        super().setUp()
+        self.interpreter = TranspiledInterpreter(None)
+        self.interpreter.env = self.env
+
+
+class TestTranspiledInterpreter(test_interpreter_integration.TestInterpreter):
+    @staticmethod
+    def interpret_code(code):
+        return run(TranspiledInterpreter, parse(code))
+
+    @staticmethod
+    def stream_code(code):
+        f = io.StringIO()
+        with redirect_stdout(f):
+            TranspiledInterpreter(None).interpret_stream(Parser(Lexer(CharacterReader.from_string(code))))
+        return f.getvalue().strip()
+
+    @staticmethod
+    def lazy_code(code):
+        program = Parser(Lexer(CharacterReader.from_string(code)), lazy_source=code).parse_program()
+        return run(TranspiledInterpreter, program)
+
+    def test_function_compiled_once(self):
+        code = 'function f(a) { return a + 1 }\nprint(f(1), f(2))'
+        interpreter = TranspiledInterpreter(parse(code))
+        with redirect_stdout(io.StringIO()):
+            interpreter.interpret()
+        body = interpreter.functions['f'].body
+        with redirect_stdout(io.StringIO()):
+            interpreter.program = parse('print(f(3))')
+            interpreter.interpret()
+        self.assertIs(interpreter.functions['f'].body, body)
+
+    def test_error_positions(self):
+        with self.assertRaises(UndefinedVarError) as context:
+            self.interpret_code('function f(a) {\n    return a + missing\n}\nprint(f(1))')
+        self.assertEqual((context.exception.position.line, context.exception.position.column), (2, 16))
+
+    def test_errors_without_position(self):
+        # reported as the other engines report them
+        programs = [('value a = 1\nvalue b = a - "x"', TypeBinaryError),
+                    ('function f(a) {\n    value b = 1\n    return b / a\n}\nprint(f(0))', DivisionByZeroError)]
+        for code, error in programs:
+            with self.assertRaises(error) as context:
+                self.interpret_code(code)
+            with self.assertRaises(error) as expected:
+                run(Interpreter, parse(code))
+            self.assertIsNone(context.exception.position)
+            self.assertEqual(str(context.exception), str(expected.exception))
+
+    def test_interned_error_position(self):
+        # both `b.length` are one node after interning; the second fails, on line 4
+        program = intern_program(parse('value b = "x"\nprint(b.length)\nb = 5\nprint(b.length)'))
+        with self.assertRaises(UnexpectedAttributeError) as context:
+            run(TranspiledInterpreter, program)
+        self.assertEqual(context.exception.position.line, 4)
+
+    def test_while_iteration_limit(self):
+        with self.assertRaises(RecursionLimitError):
+            self.interpret_code('value i = 0\nwhile i < 81 { i = i + 1 }')
+
+    def test_function_without_return(self):
+        code = """
+        function five() { return 5 }
+        function last() { value a = five() }
+        function cleared() {
+            five()
+            print("x")
+        }
+        print(last(), cleared())
+        """
+        self.assertEqual(self.interpret_code(code), run(Interpreter, parse(code)))
+
+    def test_names_of_the_runtime(self):
+        code = 'function add(call, item) { return call + item }\nvalue U = 1\nprint(add(U, 2))'
+        self.assertEqual(self.interpret_code(code), '3')
+
+    def test_repeated_parameter(self):
+        self.assertEqual(self.interpret_code('function f(a, a) { return a }\nprint(f(1, 2))'),
+                         run(Interpreter, parse('function f(a, a) { return a }\nprint(f(1, 2))')))
+
+    def test_deep_expression(self):
+        # nested too deeply for CPython's parser, so computed into temporaries, in the order of evaluation
+        code = 'value x = 1\nfunction f(a) {\n    print(a)\n    return a\n}\nprint(f(0) + ' \
+               + ' + '.join(['x'] * 3000) + ' + f(2))'
+        self.assertEqual(self.interpret_code(code), '0\n2\n3002')
+
+    def test_block_without_lines(self):
+        # a top-level return writes nothing, so the if needs a pass
+        self.assertEqual(self.interpret_code('value x = 1\nif x { return }\nprint(x)'), '1')
+
+    def test_deeply_nested_blocks(self):
+        # past the 20 loops and 100 levels of indentation compile() takes, a program or function runs as closures
+        loops = 'value i = 0\n' + 'while i < 1 {\n' * 25 + 'i = i + 1\n' + '}\n' * 25
+        blocks = 'if true {\n' * 110 + 'print(i)\n' + '}\n' * 110
+        code = loops + blocks + 'function f() {\n' + loops + blocks + 'return i\n}\nprint(f())'
+        self.assertEqual(self.interpret_code(code), run(Interpreter, parse(code)))
+        self.assertEqual(self.interpret_code(code), '1\n1\n1')
+
+    def test_dump(self):
+        dump = io.StringIO()
+        with redirect_stdout(io.StringIO()):
+            TranspiledInterpreter(parse('function f(a) { return a }\nprint(f(1))'), dump=dump).interpret()
+        self.assertIn('def program():', dump.getvalue())
+        self.assertIn('    1 | def f_f(l_a):', dump.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
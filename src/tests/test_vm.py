@@ -0,0 +1,133 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from compiler.bytecode import Opcode, disassemble
+from compiler.compiler import compile_program
+from compiler.vm import VirtualMachine
+from errors.interpreter_errors import UndefinedVarError, InvalidArgsCountError, RecursionLimitError
+from interpreter.interpreter import Interpreter
+from interpreter.resolver import Resolver
+from lexer.lexer import CharacterReader, Lexer
+from parser.parser import Parser
+from tests import test_interpreter, test_interpreter_integration
+
+
+def parse(code):
+    return Parser(Lexer(CharacterReader.from_string(code))).parse_program()
+
+
+def run(engine, code):
+    f = io.StringIO()
+    with redirect_stdout(f):
+        engine(parse(code)).interpret()
+    return f.getvalue().strip()
+
+
+def compile_code(code, resolver=None):
+    statements = parse(code).statements
+    resolver = resolver or Resolver()
+    for statement in statements:
+        resolver.resolve_statement(statement)
+    return compile_program(statements)
+
+
+class TestVirtualMachineMethods(test_interpreter.TestInterpreter):
+    def setUp(self):
+        super().setUp()
+        self.interpreter = VirtualMachine(None)
+        self.interpreter.env = self.env
+
+
+class TestVirtualMachine(test_interpreter_integration.TestInterpreter):
+    @staticmethod
+    def interpret_code(code):
+        return run(VirtualMachine, code)
+
+    @staticmethod
+    def stream_code(code):
+        f = io.StringIO()
+        with redirect_stdout(f):
+            VirtualMachine(None).interpret_stream(Parser(Lexer(CharacterReader.from_string(code))))
+        return f.getvalue().strip()
+
+    @staticmethod
+    def lazy_code(code):
+        program = Parser(Lexer(CharacterReader.from_string(code)), lazy_source=code).parse_program()
+        f = io.StringIO()
+        with redirect_stdout(f):
+            VirtualMachine(program).interpret()
+        return f.getvalue().strip()
+
+    def test_error_positions(self):
+        code = 'function f(a) {\n    return a + missing\n}\nprint(f(1))'
+        with self.assertRaises(UndefinedVarError) as context:
+            self.interpret_code(code)
+        self.assertEqual((context.exception.position.line, context.exception.position.column), (2, 16))
+        with self.assertRaises(InvalidArgsCountError) as context:
+            self.interpret_code('function f(a) { return a }\n\nvalue x = f(1, 2)')
+        self.assertEqual(context.exception.position.line, 3)
+
+    def test_while_iteration_limit(self):
+        self.assertEqual(self.interpret_code('value i = 0\nwhile i < 80 { i = i + 1 }\nprint(i)'), "80")
+        with self.assertRaises(RecursionLimitError):
+            self.interpret_code('value i = 0\nwhile i < 81 { i = i + 1 }')
+
+    def test_function_without_return(self):
+        # like the tree-walking interpreter, it gives the return value of the last call it made
+        code = """
+        function five() { return 5 }
+        function last() { value a = five() }
+        function cleared() {
+            five()
+            print("x")
+        }
+        print(last(), cleared())
+        """
+        self.assertEqual(self.interpret_code(code), run(Interpreter, code))
+
+    def test_weak_typing_like_tree(self):
+        code = 'print("true" + "x", "a" + 1, true + 1, 2 && 0, "a" || 0, -2.5, !"false", "ab" * 2, 7 / 2)'
+        self.assertEqual(self.interpret_code(code), run(Interpreter, code))
+
+    def test_globals_kept_across_programs(self):
+        vm = VirtualMachine(None)
+        f = io.StringIO()
+        with redirect_stdout(f):
+            for code in ('value a = 2', 'function double(n) { return n * a }', 'print(double(21))'):
+                vm.program = parse(code)
+                vm.interpret()
+        self.assertEqual(f.getvalue().strip(), "42")
+
+
+class TestCompiler(unittest.TestCase):
+    def test_constant_pool(self):
+        code = compile_code('value a = 1 + 1\nvalue b = 1.0 + "x"\nvalue c = "x"')
+        self.assertEqual(code.constants, [1, 1.0, "x"])
+
+    def test_jumps(self):
+        code = compile_code('value i = 0\nwhile i < 3 {\n    i = i + 1\n}\nprint(i)')
+        opcodes = [Opcode(opcode) for opcode, _ in code.instructions]
+        loop = opcodes.index(Opcode.LOOP)
+        jump = opcodes.index(Opcode.JUMP_IF_FALSE)
+        self.assertEqual(code.instructions[jump][1], loop + 1)
+        self.assertEqual(code.instructions[loop][1], opcodes.index(Opcode.START_WHILE) + 1)
+
+    def test_line_table(self):
+        code = compile_code('value a = 1\n\nprint(a.size)')
+        [pc] = [pc for pc, (opcode, _) in enumerate(code.instructions) if opcode == Opcode.GET_ATTRIBUTE]
+        self.assertEqual(code.position(pc).line, 3)
+        self.assertIn('GET_ATTRIBUTE', disassemble(code))
+
+    def test_deep_expression(self):
+        depth = 3000
+        vm = VirtualMachine(None)
+        code = compile_code('value a = ' + '(' * depth + '1' + ' + 1)' * depth, vm.resolver)
+        self.assertEqual(len(code), 2 * depth + 3)
+        vm.grow_globals()
+        vm.execute(code, None)
+        self.assertEqual(vm.globals[0], depth + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()